@@ -244,6 +244,8 @@ CREATE TABLE IF NOT EXISTS trading_system_models (
     UNIQUE(trading_system_id, instrument_id)
 );
 
+ALTER TABLE trading_system_models ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
+
 CREATE UNIQUE INDEX unique_ts_model_with_null_instrument_id
 ON trading_system_models (trading_system_id)
 WHERE instrument_id IS NULL;
\ No newline at end of file
@@ -28,5 +28,25 @@ func initPgPool() (*pgxpool.Pool, error) {
 		return nil, errors.New("pgPool is nil")
 	}
 
+	if err = migratePgDb(pgPool); err != nil {
+		return nil, err
+	}
+
 	return pgPool, nil
 }
+
+// Schema changes of databases initialized from dumps of older schemas,
+// Postgres only runs the init dump on an empty volume
+var migrations = []string{
+	"ALTER TABLE IF EXISTS trading_system_models ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1",
+}
+
+func migratePgDb(pgPool *pgxpool.Pool) error {
+	for _, migration := range migrations {
+		if _, err := pgPool.Exec(context.Background(), migration); err != nil {
+			return fmt.Errorf("migration %q failed: %w", migration, err)
+		}
+	}
+
+	return nil
+}
@@ -578,6 +578,56 @@ func (s *server) GetTradingSystemPositions(req *pb.GetBy, stream pb.TradingSyste
 	return nil
 }
 
+func (s *server) GetTradingSystemInstrumentsPositions(req *pb.GetBy, stream pb.TradingSystemsService_GetTradingSystemInstrumentsPositionsServer) error {
+	ctx, cancel := context.WithTimeout(stream.Context(), DB_TIMEOUT)
+	defer cancel()
+
+	query, err := s.pgPool.Query(
+		ctx,
+		`
+			SELECT id, instrument_id, trading_system_id, date_time, position_data, serialized_position
+			FROM positions
+			WHERE trading_system_id = $1
+			AND position_data ? 'active'
+			AND (position_data ->> 'active')::boolean = false
+			ORDER BY instrument_id, date_time DESC
+		`,
+		req.GetStrIdentifier(),
+	)
+	if err != nil {
+		s.errorLog.Println(err)
+		return err
+	}
+	defer query.Close()
+
+	for query.Next() {
+		var position pb.Position
+		var dateTime time.Time
+		err = query.Scan(
+			&position.Id,
+			&position.InstrumentId,
+			&position.TradingSystemId,
+			&dateTime,
+			&position.PositionData,
+			&position.SerializedPosition,
+		)
+		if err != nil {
+			s.errorLog.Println(err)
+			continue
+		}
+
+		position.DateTime = &pb.DateTime{
+			DateTime: dateTime.Format(DATE_TIME_FORMAT),
+		}
+		if err := stream.Send(&position); err != nil {
+			s.errorLog.Println(err)
+			return err
+		}
+	}
+
+	return nil
+}
+
 func (s *server) InsertTradingSystemModel(ctx context.Context, req *pb.TradingSystemModel) (*pb.CUD, error) {
 	ctx, cancel := context.WithTimeout(ctx, DB_TIMEOUT)
 	defer cancel()
@@ -589,7 +639,8 @@ func (s *server) InsertTradingSystemModel(ctx context.Context, req *pb.TradingSy
 			INSERT INTO trading_system_models(trading_system_id, instrument_id, serialized_model)
 			VALUES($1, $2, $3)
 			ON CONFLICT(trading_system_id, instrument_id) DO UPDATE
-			SET serialized_model = EXCLUDED.serialized_model
+			SET serialized_model = EXCLUDED.serialized_model,
+			version = trading_system_models.version + 1
 		`
 		queryArgs = []interface{}{req.TradingSystemId, req.OptionalIdentifier, req.SerializedModel}
 	} else {
@@ -597,7 +648,8 @@ func (s *server) InsertTradingSystemModel(ctx context.Context, req *pb.TradingSy
 			INSERT INTO trading_system_models(trading_system_id, serialized_model)
 			VALUES($1, $2)
 			ON CONFLICT (trading_system_id) WHERE instrument_id IS NULL DO UPDATE
-			SET serialized_model = EXCLUDED.serialized_model
+			SET serialized_model = EXCLUDED.serialized_model,
+			version = trading_system_models.version + 1
 		`
 		queryArgs = []interface{}{req.TradingSystemId, req.SerializedModel}
 	}
@@ -626,14 +678,14 @@ func (s *server) GetTradingSystemModel(ctx context.Context, req *pb.GetBy) (*pb.
 		query = s.pgPool.QueryRow(
 			ctx,
 			`
-				SELECT trading_system_id, instrument_id, serialized_model
+				SELECT trading_system_id, instrument_id, serialized_model, version
 				FROM trading_system_models
 				WHERE trading_system_id = $1
 				AND instrument_id = $2
 			`,
 			req.GetStrIdentifier(), req.GetAltStrIdentifier(),
 		)
-		if err := query.Scan(&res.TradingSystemId, &res.OptionalIdentifier, &res.SerializedModel); err != nil {
+		if err := query.Scan(&res.TradingSystemId, &res.OptionalIdentifier, &res.SerializedModel, &res.Version); err != nil {
 			s.errorLog.Println(err)
 			return nil, err
 		}
@@ -641,13 +693,14 @@ func (s *server) GetTradingSystemModel(ctx context.Context, req *pb.GetBy) (*pb.
 		query = s.pgPool.QueryRow(
 			ctx,
 			`
-				SELECT trading_system_id, serialized_model
+				SELECT trading_system_id, serialized_model, version
 				FROM trading_system_models
 				WHERE trading_system_id = $1
+				AND instrument_id IS NULL
 			`,
 			req.GetStrIdentifier(),
 		)
-		if err := query.Scan(&res.TradingSystemId, &res.SerializedModel); err != nil {
+		if err := query.Scan(&res.TradingSystemId, &res.SerializedModel, &res.Version); err != nil {
 			s.errorLog.Println(err)
 			return nil, err
 		}
@@ -655,3 +708,84 @@ func (s *server) GetTradingSystemModel(ctx context.Context, req *pb.GetBy) (*pb.
 
 	return res, nil
 }
+
+func (s *server) GetTradingSystemModels(req *pb.GetBy, stream pb.TradingSystemsService_GetTradingSystemModelsServer) error {
+	ctx, cancel := context.WithTimeout(stream.Context(), DB_TIMEOUT)
+	defer cancel()
+
+	query, err := s.pgPool.Query(
+		ctx,
+		`
+			SELECT trading_system_id, COALESCE(instrument_id::text, ''), serialized_model, version
+			FROM trading_system_models
+			WHERE trading_system_id = $1
+		`,
+		req.GetStrIdentifier(),
+	)
+	if err != nil {
+		s.errorLog.Println(err)
+		return err
+	}
+	defer query.Close()
+
+	for query.Next() {
+		var model pb.TradingSystemModel
+		err = query.Scan(
+			&model.TradingSystemId,
+			&model.OptionalIdentifier,
+			&model.SerializedModel,
+			&model.Version,
+		)
+		if err != nil {
+			s.errorLog.Println(err)
+			continue
+		}
+
+		if err := stream.Send(&model); err != nil {
+			s.errorLog.Println(err)
+			return err
+		}
+	}
+
+	return nil
+}
+
+func (s *server) GetTradingSystemModelVersions(req *pb.GetBy, stream pb.TradingSystemsService_GetTradingSystemModelVersionsServer) error {
+	ctx, cancel := context.WithTimeout(stream.Context(), DB_TIMEOUT)
+	defer cancel()
+
+	query, err := s.pgPool.Query(
+		ctx,
+		`
+			SELECT trading_system_id, COALESCE(instrument_id::text, ''), version
+			FROM trading_system_models
+			WHERE trading_system_id = $1
+		`,
+		req.GetStrIdentifier(),
+	)
+	if err != nil {
+		s.errorLog.Println(err)
+		return err
+	}
+	defer query.Close()
+
+	for query.Next() {
+		var model pb.TradingSystemModel
+		err = query.Scan(
+			&model.TradingSystemId,
+			&model.OptionalIdentifier,
+			&model.Version,
+		)
+		if err != nil {
+			s.errorLog.Println(err)
+			continue
+		}
+
+		if err := stream.Send(&model); err != nil {
+			s.errorLog.Println(err)
+			return err
+		}
+	}
+
+	return nil
+}
@@ -61,6 +61,10 @@ class TradingSystemsPersisterBase(metaclass=ABCMeta):
     def get_trading_system_positions(self):
         ...
 
+    @abstractmethod
+    def get_trading_system_instruments_positions(self):
+        ...
+
     @abstractmethod
     def remove_trading_system_relations(self):
         ...
@@ -71,4 +75,16 @@ class TradingSystemsPersisterBase(metaclass=ABCMeta):
 
     @abstractmethod
     def get_trading_system_model(self):
-        ...
\ No newline at end of file
+        ...
+
+    @abstractmethod
+    def get_serialized_trading_system_model(self):
+        ...
+
+    @abstractmethod
+    def get_serialized_trading_system_models(self):
+        ...
+
+    @abstractmethod
+    def get_trading_system_model_versions(self):
+        ...
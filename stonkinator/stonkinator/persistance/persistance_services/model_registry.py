@@ -0,0 +1,232 @@
+import os
+import pickle
+from collections import OrderedDict
+
+from persistance.persistance_meta_classes.trading_systems_persister import TradingSystemsPersisterBase
+
+
+class ModelRegistry:
+    """
+    Sits in front of the model methods of a TradingSystemsPersisterBase
+    object. Serialized models are cached on disk keyed by
+    (trading_system_id, instrument_id, version), and deserialized
+    models are kept in an in-memory LRU cache, so that repeated runs
+    only fetch models that have changed.
+
+    The current model versions of a trading system are resolved by
+    prefetch, which fetches all of its changed models in one streamed
+    call. Models are deserialized lazily, when first requested. Every
+    other attribute is delegated to the persister, so the registry can
+    be passed in place of it.
+
+    Parameters
+    ----------
+    trading_systems_persister : 'TradingSystemsPersisterBase'
+        The persister the models are stored with.
+    dir_path : Keyword arg 'None/str'
+        The directory of the disk cache, models are only cached in
+        memory if None. Default value=None
+    max_models : Keyword arg 'int'
+        The maximum number of deserialized models kept in memory.
+        Default value=128
+    """
+
+    __NO_INSTRUMENT = '_'
+
+    def __init__(
+        self, trading_systems_persister: TradingSystemsPersisterBase,
+        dir_path=None, max_models=128
+    ):
+        self.__persister = trading_systems_persister
+        self.__dir_path = dir_path
+        self.__max_models = max_models
+        self.__versions: dict[tuple[str, str | None], int] = {}
+        self.__models: OrderedDict[tuple[str, str | None, int], object] = OrderedDict()
+        if dir_path is not None:
+            os.makedirs(dir_path, exist_ok=True)
+
+    def __getattr__(self, name):
+        if name.startswith('_ModelRegistry__'):
+            raise AttributeError(name)
+        return getattr(self.__persister, name)
+
+    @property
+    def trading_systems_persister(self) -> TradingSystemsPersisterBase:
+        return self.__persister
+
+    def _model_path(self, trading_system_id, instrument_id, version):
+        file_name = f'{instrument_id or self.__NO_INSTRUMENT}_{version}.pkl'
+        return os.path.join(self.__dir_path, trading_system_id, file_name)
+
+    def _read_serialized_model(self, trading_system_id, instrument_id, version) -> bytes | None:
+        if self.__dir_path is None:
+            return None
+        model_path = self._model_path(trading_system_id, instrument_id, version)
+        if not os.path.exists(model_path):
+            return None
+        with open(model_path, 'rb') as file:
+            return file.read()
+
+    def _write_serialized_model(self, trading_system_id, instrument_id, version, serialized_model):
+        if self.__dir_path is None:
+            return
+        model_path = self._model_path(trading_system_id, instrument_id, version)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        with open(f'{model_path}.tmp', 'wb') as file:
+            file.write(serialized_model)
+        os.replace(f'{model_path}.tmp', model_path)
+
+        # Remove the previous versions of the model
+        prefix = f'{instrument_id or self.__NO_INSTRUMENT}_'
+        for file_name in os.listdir(os.path.dirname(model_path)):
+            if file_name.startswith(prefix) and file_name.endswith('.pkl') and \
+                    file_name != os.path.basename(model_path):
+                os.remove(os.path.join(os.path.dirname(model_path), file_name))
+
+    def _cache_model(self, key, model):
+        self.__models[key] = model
+        self.__models.move_to_end(key)
+        while len(self.__models) > self.__max_models:
+            self.__models.popitem(last=False)
+
+    def _is_cached(self, trading_system_id, instrument_id, version):
+        key = (trading_system_id, instrument_id, version)
+        if key in self.__models:
+            return True
+        return self.__dir_path is not None and \
+            os.path.exists(self._model_path(trading_system_id, instrument_id, version))
+
+    def prefetch(self, trading_system_id: str) -> int:
+        """
+        Resolves the current versions of all models of a trading system
+        and fetches the models missing from the caches in one streamed
+        call, writing them to the disk cache.
+
+        Parameters
+        ----------
+        :param trading_system_id:
+            'str' : The id of the trading system.
+
+        :return:
+            'int' : The number of fetched models.
+        """
+
+        versions = self.__persister.get_trading_system_model_versions(trading_system_id)
+        if versions is None:
+            return 0
+
+        for instrument_id, version in versions.items():
+            self.__versions[(trading_system_id, instrument_id)] = version
+
+        missing = {
+            instrument_id for instrument_id, version in versions.items()
+            if not self._is_cached(trading_system_id, instrument_id, version)
+        }
+        if not missing:
+            return 0
+
+        serialized_models = self.__persister.get_serialized_trading_system_models(trading_system_id)
+        if serialized_models is None:
+            return 0
+
+        for instrument_id, (version, serialized_model) in serialized_models.items():
+            self.__versions[(trading_system_id, instrument_id)] = version
+            if instrument_id in missing:
+                if self.__dir_path is None:
+                    self._cache_model(
+                        (trading_system_id, instrument_id, version), pickle.loads(serialized_model)
+                    )
+                else:
+                    self._write_serialized_model(
+                        trading_system_id, instrument_id, version, serialized_model
+                    )
+        return len(missing)
+
+    def get_trading_system_model(
+        self, trading_system_id: str, instrument_id: str | None=None
+    ) -> object | None:
+        """
+        Returns a model of a trading system, from the in-memory cache,
+        the disk cache or the persister, in that order. The model is
+        fetched from the persister if its version has not been resolved
+        by prefetch.
+
+        Parameters
+        ----------
+        :param trading_system_id:
+            'str' : The id of the trading system.
+        :param instrument_id:
+            Keyword arg 'None/str' : The id of the instrument of the
+            model, None for a model of the whole trading system.
+            Default value=None
+
+        :return:
+            'object/None' : The deserialized model.
+        """
+
+        version = self.__versions.get((trading_system_id, instrument_id))
+        if version is not None:
+            key = (trading_system_id, instrument_id, version)
+            if key in self.__models:
+                self.__models.move_to_end(key)
+                return self.__models[key]
+
+            serialized_model = self._read_serialized_model(trading_system_id, instrument_id, version)
+            if serialized_model is not None:
+                model = pickle.loads(serialized_model)
+                self._cache_model(key, model)
+                return model
+
+        res = self.__persister.get_serialized_trading_system_model(trading_system_id, instrument_id)
+        if res is None:
+            return None
+
+        version, serialized_model = res
+        self.__versions[(trading_system_id, instrument_id)] = version
+        self._write_serialized_model(trading_system_id, instrument_id, version, serialized_model)
+        model = pickle.loads(serialized_model)
+        self._cache_model((trading_system_id, instrument_id, version), model)
+        return model
+
+    def insert_trading_system_model(
+        self, trading_system_id: str, model: object, optional_identifier: str=''
+    ):
+        """
+        Inserts a model with the persister. When the version of the
+        model has been resolved, the inserted model is cached as the
+        next version, which the persister assigns by incrementing it,
+        so that it is not fetched back right after the insert. The
+        cached version is invalidated otherwise, and resolved by the
+        next prefetch or get_trading_system_model call.
+
+        Parameters
+        ----------
+        :param trading_system_id:
+            'str' : The id of the trading system.
+        :param model:
+            'object' : The model to insert.
+        :param optional_identifier:
+            Keyword arg 'str' : The id of the instrument of the model.
+            Default value=''
+
+        :return:
+            'CUD' : The result of the insert.
+        """
+
+        res = self.__persister.insert_trading_system_model(
+            trading_system_id, model, optional_identifier=optional_identifier
+        )
+        instrument_id = optional_identifier or None
+        version = self.__versions.pop((trading_system_id, instrument_id), None)
+        if res is None or not res.num_affected or version is None:
+            return res
+
+        self.__models.pop((trading_system_id, instrument_id, version), None)
+        version += 1
+        self.__versions[(trading_system_id, instrument_id)] = version
+        self._cache_model((trading_system_id, instrument_id, version), model)
+        if self.__dir_path is not None:
+            self._write_serialized_model(
+                trading_system_id, instrument_id, version, pickle.dumps(model)
+            )
+        return res
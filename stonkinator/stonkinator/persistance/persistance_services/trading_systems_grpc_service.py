@@ -207,6 +207,18 @@ class TradingSystemsGRPCService(TradingSystemsPersisterBase):
         ]
         return positions
 
+    @grpc_error_handler(logger, default_return=None)
+    def get_trading_system_instruments_positions(
+        self, trading_system_id: str
+    ) -> dict[str, list[PositionClass]] | None:
+        req = GetBy(str_identifier=trading_system_id)
+        positions = {}
+        for position in self.__client.GetTradingSystemInstrumentsPositions(req):
+            positions.setdefault(position.instrument_id, []).append(
+                pickle.loads(position.serialized_position)
+            )
+        return positions
+
     @grpc_error_handler(logger, default_return=None)
     def insert_trading_system_model(
         self, trading_system_id: str, model: SKModel, optional_identifier: str=''
@@ -232,6 +244,42 @@ class TradingSystemsGRPCService(TradingSystemsPersisterBase):
         else:
             return None
 
+    @grpc_error_handler(logger, default_return=None)
+    def get_serialized_trading_system_model(
+        self, trading_system_id: str, instrument_id: str | None=None
+    ) -> tuple[int, bytes] | None:
+        if instrument_id is None:
+            req = GetBy(str_identifier=trading_system_id)
+        else:
+            req = GetBy(str_identifier=trading_system_id, alt_str_identifier=instrument_id)
+        res = self.__client.GetTradingSystemModel(req)
+        if res.serialized_model:
+            return res.version, res.serialized_model
+        else:
+            return None
+
+    @grpc_error_handler(logger, default_return=None)
+    def get_serialized_trading_system_models(
+        self, trading_system_id: str
+    ) -> dict[str | None, tuple[int, bytes]] | None:
+        req = GetBy(str_identifier=trading_system_id)
+        models = {
+            model.optional_identifier or None: (model.version, model.serialized_model)
+            for model in self.__client.GetTradingSystemModels(req)
+        }
+        return models
+
+    @grpc_error_handler(logger, default_return=None)
+    def get_trading_system_model_versions(
+        self, trading_system_id: str
+    ) -> dict[str | None, int] | None:
+        req = GetBy(str_identifier=trading_system_id)
+        versions = {
+            model.optional_identifier or None: model.version
+            for model in self.__client.GetTradingSystemModelVersions(req)
+        }
+        return versions
+
 
 if __name__ == '__main__':
     trading_systems_grpc_service = TradingSystemsGRPCService("rpc_service:5001")
@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+import numpy as np
+
+from trading.position.position import Position
+
+
+def max_equity_curve_len(positions: list[Position], num_of_positions):
+    """
+    Returns an upper bound of the length of an equity curve generated
+    from a sequence of num_of_positions positions drawn from the given
+    positions, with or without replacement.
+
+    Parameters
+    ----------
+    :param positions:
+        'list' : A collection of Position objects.
+    :param num_of_positions:
+        'int' : The number of positions in each sequence.
+
+    :return:
+        'int'
+    """
+
+    lengths = np.sort([max(1, len(pos.market_to_market_returns_list)) for pos in positions])[::-1]
+    if num_of_positions <= len(lengths):
+        return 1 + int(lengths[:num_of_positions].sum())
+    return 1 + int(lengths[0]) * num_of_positions
+
+
+class EquityCurveStore:
+    """
+    Stores simulated equity curves of varying length as rows of a
+    preallocated float32 matrix in a memory mapped .npy file, padded
+    with NaN. Rows are written as the simulations run and can be read
+    back one at a time, so the curves never have to be held in RAM.
+
+    Parameters
+    ----------
+    num_of_curves : 'int'
+        The number of curves to store.
+    max_len : 'int'
+        The maximum length of a curve.
+    path : Keyword arg 'None/str'
+        The file path of the .npy file. A temporary file, removed
+        when the store is closed, is used if None. Default value=None
+    """
+
+    def __init__(self, num_of_curves, max_len, path=None):
+        self.__remove_on_close = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix='.npy')
+            os.close(fd)
+        self.__path = path
+        self.__curves = np.lib.format.open_memmap(
+            path, mode='w+', dtype=np.float32, shape=(num_of_curves, max_len)
+        )
+        self.__curves[:] = np.nan
+        self.__num_of_curves = 0
+
+    @classmethod
+    def load(cls, path):
+        """
+        Opens the curves of a previously written store as a read only
+        memory mapped matrix.
+
+        Parameters
+        ----------
+        :param path:
+            'str' : The file path of the .npy file.
+
+        :return:
+            'numpy memmap'
+        """
+
+        return np.load(path, mmap_mode='r')
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def curves(self):
+        """
+        The memory mapped matrix of the stored curves, of shape
+        (curves, max length).
+
+        :return:
+            'numpy memmap'
+        """
+
+        return self.__curves[:self.__num_of_curves]
+
+    def __len__(self):
+        return self.__num_of_curves
+
+    def __iter__(self):
+        for row in self.curves:
+            yield row[~np.isnan(row)]
+
+    def append(self, equity_curve):
+        """
+        Writes an equity curve to the next row of the matrix.
+
+        Parameters
+        ----------
+        :param equity_curve:
+            'list/numpy array' : The equity curve.
+        """
+
+        equity_curve = np.asarray(equity_curve, dtype=np.float32)
+        self.__curves[self.__num_of_curves, :len(equity_curve)] = equity_curve
+        self.__num_of_curves += 1
+
+    def flush(self):
+        self.__curves.flush()
+
+    def close(self):
+        """
+        Flushes the curves to disk, removing the file if it is a
+        temporary file.
+        """
+
+        self.__curves.flush()
+        if self.__remove_on_close:
+            self.__curves = None
+            os.remove(self.__path)
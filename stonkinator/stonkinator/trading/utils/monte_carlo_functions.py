@@ -1,4 +1,4 @@
-import random
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 import numpy as np
@@ -11,13 +11,38 @@ from trading.data.metadata.trading_system_simulation_attributes import \
     TradingSystemSimulationAttributes
 from trading.position.position import Position
 from trading.position.position_manager import PositionManager
+from trading.utils.equity_curve_store import EquityCurveStore, max_equity_curve_len
 from trading.utils.metric_functions import calculate_cagr
+from trading.utils.quantile_sketches import QuantileSketch
+from trading.utils.resampling import ResamplingMethod, iter_resampled_indices, \
+    resample_indices, resample_mtm_returns, equity_curves_from_returns, max_drawdowns
+
+
+def max_dd_pctl_key(quantile):
+    """
+    Returns the key under which a streamed max drawdown quantile is
+    stored in the data of a Monte Carlo simulation, e.g. 'MAX_DD_PCTL80'
+    for the 0.8 quantile.
+
+    Parameters
+    ----------
+    :param quantile:
+        'float' : A quantile given as a float from 0.0 to 1.0.
+
+    :return:
+        'str'
+    """
+
+    return f'MAX_DD_PCTL{quantile * 100:g}'
 
 
 def monte_carlo_simulate_returns(
     positions, symbol, num_testing_periods, start_capital=10000, 
     capital_fraction=1.0, num_of_sims=1000, data_amount_used=0.25, 
-    print_dataframe=True, plot_fig=False, save_fig_to_path=None
+    print_dataframe=True, plot_fig=False, save_fig_to_path=None,
+    streaming_quantiles=False, max_dd_quantiles=(), plot_sample_size=100,
+    resampling_method=ResamplingMethod.SHUFFLE, block_len=None, rng=None,
+    retain_equity_curves=False, equity_curves_path=None
 ):
     """
     Simulates equity curves from a given sequence of Position objects.
@@ -42,7 +67,9 @@ def monte_carlo_simulate_returns(
         Default value=1000
     :param data_amount_used:
         Keyword arg 'float' : The fraction of historic positions to
-        use in the simulation output. Default value=0.25
+        use in the simulation output. Values above 1.0 simulate
+        horizons longer than the history and require one of the
+        bootstrap resampling methods. Default value=0.25
     :param print_dataframe:
         Keyword arg 'bool' : True/False decides whether to print
         the dataframe to console or not. Default value=True
@@ -52,19 +79,68 @@ def monte_carlo_simulate_returns(
     :param save_fig_to_path:
         Keyword arg 'None/str' : Provide a file path as a string
         to save the plot as a file. Default value=None
+    :param streaming_quantiles:
+        Keyword arg 'bool' : True/False decides whether to estimate
+        the final equity and max drawdown percentiles with streaming
+        quantile sketches instead of keeping the data of every
+        simulation. Only the data of the first 'plot_sample_size'
+        simulations are then retained and returned, with CAR25, CAR75
+        and the 'max_dd_quantiles' (keyed by max_dd_pctl_key) of all
+        simulations added to the last dict. Default value=False
+    :param max_dd_quantiles:
+        Keyword arg 'tuple' : Quantiles of the max drawdown distribution
+        to estimate when 'streaming_quantiles' is True.
+        Default value=()
+    :param plot_sample_size:
+        Keyword arg 'int' : The number of simulations to retain for
+        plotting when 'streaming_quantiles' is True. Default value=100
+    :param resampling_method:
+        Keyword arg 'ResamplingMethod/str' : How to resample the
+        sequence of positions, shuffling them without replacement or
+        drawing blocks of consecutive positions with the moving block
+        or stationary bootstrap. Default value=ResamplingMethod.SHUFFLE
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap resampling methods. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator
+        used to resample the positions. Default value=None
+    :param retain_equity_curves:
+        Keyword arg 'bool' : True/False decides whether to keep the
+        simulated equity curves in a float32 EquityCurveStore at
+        equity_curves_path, which is required if True.
+        Default value=False
+    :param equity_curves_path:
+        Keyword arg 'None/str' : A .npy file path to keep the retained
+        equity curves at, to be read back with EquityCurveStore.load.
+        When only plotting, the curves are written to a temporary file
+        that is removed after plotting if None. Default value=None
 
     :return:
         'list'
     """
 
+    if retain_equity_curves and equity_curves_path is None:
+        raise ValueError('equity_curves_path is required to retain equity curves')
     if not int(len(positions) * data_amount_used):
         return None
 
+    sequence_len = max(len(positions), int(len(positions) * data_amount_used))
+    equity_curves = None
+    if retain_equity_curves or plot_fig:
+        equity_curves = EquityCurveStore(
+            min(num_of_sims, plot_sample_size) if streaming_quantiles else num_of_sims,
+            max_equity_curve_len(positions, min(sequence_len, int(sequence_len * data_amount_used))),
+            path=equity_curves_path
+        )
+
     monte_carlo_sims_data = []
-    equity_curves_list = []
     final_equity_list = []
     max_drawdowns_list = []
     sim_positions = None
+    if streaming_quantiles:
+        final_equity_sketch = QuantileSketch((0.25, 0.75))
+        max_drawdown_sketch = QuantileSketch(max_dd_quantiles)
 
     def generate_pos_sequence(position_list, **kwargs):
         """
@@ -85,36 +161,56 @@ def monte_carlo_simulate_returns(
         for pos in position_list[:int(len(position_list) * data_amount_used)]:
             yield pos
 
-    for _ in range(num_of_sims):
+    sim_indices = iter_resampled_indices(
+        resampling_method, len(positions), num_of_sims,
+        length=sequence_len, block_len=block_len, rng=rng
+    )
+    for n, indices in enumerate(sim_indices):
         sim_positions = PositionManager(
             symbol, (num_testing_periods * data_amount_used), start_capital,
             capital_fraction
         )
 
-        pos_list = random.sample(positions, len(positions))
+        pos_list = [positions[i] for i in indices]
         sim_positions.generate_positions(generate_pos_sequence, pos_list)
-        monte_carlo_sims_data.append(sim_positions.metrics.summary_data_dict)
-        final_equity_list.append(float(sim_positions.metrics.equity_list[-1]))
+        final_equity = float(sim_positions.metrics.equity_list[-1])
+        max_drawdown = sim_positions.metrics.max_drawdown
 
-        max_drawdowns_list.append(sim_positions.metrics.max_drawdown)
+        if streaming_quantiles:
+            final_equity_sketch.update(final_equity)
+            max_drawdown_sketch.update(max_drawdown)
+            if n >= plot_sample_size:
+                continue
 
-        equity_curves_list.append(sim_positions.metrics.equity_list)
+        monte_carlo_sims_data.append(sim_positions.metrics.summary_data_dict)
+        final_equity_list.append(final_equity)
+        max_drawdowns_list.append(max_drawdown)
+        if equity_curves is not None:
+            equity_curves.append(sim_positions.metrics.equity_list)
 
     final_equity_list = sorted(final_equity_list)
 
+    if streaming_quantiles:
+        final_equity_pctl25 = final_equity_sketch[0.25]
+        final_equity_pctl75 = final_equity_sketch[0.75]
+    else:
+        final_equity_pctl25 = final_equity_list[(int(len(final_equity_list) * 0.25))]
+        final_equity_pctl75 = final_equity_list[(int(len(final_equity_list) * 0.75))]
+
     car25 = calculate_cagr(
-        sim_positions.metrics.start_capital, 
-        final_equity_list[(int(len(final_equity_list) * 0.25))],
+        sim_positions.metrics.start_capital, final_equity_pctl25,
         sim_positions.metrics.num_testing_periods
     )
     car75 = calculate_cagr(
-        sim_positions.metrics.start_capital,
-        final_equity_list[(int(len(final_equity_list) * 0.75))],
+        sim_positions.metrics.start_capital, final_equity_pctl75,
         sim_positions.metrics.num_testing_periods
     )
 
     monte_carlo_sims_data[-1]['CAR25'] = round(car25, 3)
     monte_carlo_sims_data[-1]['CAR75'] = round(car75, 3)
+    if streaming_quantiles:
+        for quantile, max_dd in max_drawdown_sketch.quantiles.items():
+            monte_carlo_sims_data[-1][max_dd_pctl_key(quantile)] = max_dd
 
     if print_dataframe:
         sim_data = pd.DataFrame(columns=list(monte_carlo_sims_data[-1].keys()))
@@ -124,9 +220,11 @@ def monte_carlo_simulate_returns(
 
     if plot_fig:
         monte_carlo_simulations_plot(
-            symbol, equity_curves_list, max_drawdowns_list, final_equity_list,
+            symbol, equity_curves, max_drawdowns_list, final_equity_list,
             capital_fraction, car25, car75, save_fig_to_path=save_fig_to_path
         )
+    if equity_curves is not None:
+        equity_curves.close()
 
     return monte_carlo_sims_data
 
@@ -145,7 +243,8 @@ def monte_carlo_simulations_plot(
     :param symbol:
         'str' : The symbol/ticker of an asset.
     :param simulated_equity_curves_list:
-        'list' : A list containing simulated equity curves.
+        'list/EquityCurveStore' : A collection of simulated equity
+        curves.
     :param max_drawdowns_list:
         'list' : A list containing the maximum drawdowns of
         the simulated equity curves.
@@ -294,7 +393,8 @@ def monte_carlo_simulation_summary_data(data_dicts_list):
 def monte_carlo_simulate_positions(
     positions, period_len, safe_f=1.0, forecast_positions=500, 
     forecast_data_fraction=0.5, capital=10000, num_of_sims=1000,
-    plot_fig=False, save_fig_to_path=None, print_dataframe=False
+    plot_fig=False, save_fig_to_path=None, print_dataframe=False,
+    streaming_quantiles=False, resampling_method=ResamplingMethod.SHUFFLE, block_len=None
 ):
     """
     Simulates randomized sequences of given positions and
@@ -332,6 +432,16 @@ def monte_carlo_simulate_positions(
     :param print_dataframe:
         Keyword arg 'bool' : True/False decides whether to print
         the dataframe to console or not. Default value=False
+    :param streaming_quantiles:
+        Keyword arg 'bool' : True/False decides whether to estimate
+        percentiles with streaming quantile sketches, see
+        monte_carlo_simulate_returns. Default value=False
+    :param resampling_method:
+        Keyword arg 'ResamplingMethod/str' : How to resample the
+        sequence of positions. Default value=ResamplingMethod.SHUFFLE
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap resampling methods. Default value=None
 
     :return:
         'Pandas DataFrame'
@@ -349,7 +459,9 @@ def monte_carlo_simulate_positions(
     monte_carlo_sims_dicts_list = monte_carlo_simulate_returns(
         positions[-(int(len(positions) * split_data_fraction)):], '', period_len, capital, safe_f,
         plot_fig=plot_fig, num_of_sims=num_of_sims, data_amount_used=forecast_data_fraction,
-        save_fig_to_path=save_fig_to_path, print_dataframe=print_dataframe
+        save_fig_to_path=save_fig_to_path, print_dataframe=print_dataframe,
+        streaming_quantiles=streaming_quantiles, resampling_method=resampling_method,
+        block_len=block_len
     )
 
     return monte_carlo_sims_dicts_list
@@ -359,7 +471,9 @@ def calculate_safe_f(
     positions: list[Position], period_len, tolerated_pct_max_dd, 
     max_dd_pctl_threshold,
     forecast_data_fraction=0.5, capital=10000, num_of_sims=2500, 
-    symbol='', print_dataframe=False
+    symbol='', print_dataframe=False, streaming_quantiles=False,
+    resampling_method=ResamplingMethod.SHUFFLE, block_len=None, resample_mtm=False,
+    rng=None
 ):
     """
     Calls method to simulate given sequence of positions and
@@ -399,6 +513,27 @@ def calculate_safe_f(
         Keyword arg 'bool' : True/False decides if the DataFrame
         with metrics and statistics should be printed to console.
         Default value=False
+    :param streaming_quantiles:
+        Keyword arg 'bool' : True/False decides whether to estimate
+        the max drawdown at the percentile threshold with a streaming
+        quantile sketch, keeping memory usage constant in the number
+        of simulations. Default value=False
+    :param resampling_method:
+        Keyword arg 'ResamplingMethod/str' : How to resample the
+        positions, or the market to market returns if resample_mtm
+        is True. Default value=ResamplingMethod.SHUFFLE
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap resampling methods. Default value=None
+    :param resample_mtm:
+        Keyword arg 'bool' : True/False decides whether to resample
+        the daily market to market returns of the positions instead
+        of the positions themselves. The drawdowns are then calculated
+        from equity curves compounded from the resampled returns.
+        Default value=False
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator
+        used for resampling. Default value=None
 
     :return:
         'float'
@@ -407,17 +542,307 @@ def calculate_safe_f(
     period_len = int(period_len * forecast_data_fraction)
     # sort positions on date
     positions.sort(key=lambda tr: tr.entry_dt)
+    positions = positions[-(int(len(positions) * forecast_data_fraction)):]
+
+    if resample_mtm:
+        mtm_returns = np.concatenate(
+            [pos.market_to_market_returns_list for pos in positions]
+        ).astype(float)
+        returns_matrix = resample_mtm_returns(
+            mtm_returns, num_of_sims, method=resampling_method,
+            length=int(len(mtm_returns) * forecast_data_fraction),
+            block_len=block_len, rng=rng
+        )
+        max_dds = np.sort(max_drawdowns(equity_curves_from_returns(returns_matrix, capital)))
+        dd_at_tolerated_threshold = max_dds[int(len(max_dds) * max_dd_pctl_threshold)]
+    else:
+        monte_carlo_sims_dicts_list = monte_carlo_simulate_returns(
+            positions, symbol, period_len,
+            start_capital=capital, num_of_sims=num_of_sims, data_amount_used=forecast_data_fraction,
+            print_dataframe=print_dataframe, streaming_quantiles=streaming_quantiles,
+            max_dd_quantiles=(max_dd_pctl_threshold,), resampling_method=resampling_method,
+            block_len=block_len, rng=rng
+        )
 
-    monte_carlo_sims_dicts_list = monte_carlo_simulate_returns(
-        positions[-(int(len(positions) * forecast_data_fraction)):], symbol, period_len,
-        start_capital=capital, num_of_sims=num_of_sims, data_amount_used=forecast_data_fraction,
-        print_dataframe=print_dataframe
-    )
-
-    max_dds = np.sort([dd[TradingSystemMetrics.MAX_DRAWDOWN] for dd in monte_carlo_sims_dicts_list])
-    dd_at_tolerated_threshold = max_dds[int(len(max_dds) * max_dd_pctl_threshold)]
+        if streaming_quantiles:
+            dd_at_tolerated_threshold = \
+                monte_carlo_sims_dicts_list[-1][max_dd_pctl_key(max_dd_pctl_threshold)]
+        else:
+            max_dds = np.sort([dd[TradingSystemMetrics.MAX_DRAWDOWN] for dd in monte_carlo_sims_dicts_list])
+            dd_at_tolerated_threshold = max_dds[int(len(max_dds) * max_dd_pctl_threshold)]
 
     if dd_at_tolerated_threshold <= 0: dd_at_tolerated_threshold = 1
     safe_f = tolerated_pct_max_dd / dd_at_tolerated_threshold
 
     return safe_f
+
+
+def position_equity_increments(positions: list[Position]):
+    """
+    Converts a collection of Position objects into the per period
+    changes in equity they contribute when traded in sequence, the
+    same way Metrics.calculate_metrics builds its equity curve. The
+    commission of a position is deducted in its last period.
+
+    Parameters
+    ----------
+    :param positions:
+        'list' : A collection of Position objects.
+
+    :return:
+        'tuple' : A flat float array with the equity increments of
+        all positions, and an int array with the number of periods
+        of each position.
+    """
+
+    increments_list = []
+    lengths = np.empty(len(positions), dtype=int)
+    for i, pos in enumerate(positions):
+        mtm_returns = np.asarray(pos.market_to_market_returns_list, dtype=float) / 100
+        if len(mtm_returns) == 0:
+            mtm_returns = np.zeros(1)
+        pos_values = float(pos.entry_price * pos.position_size) * \
+            np.concatenate(([1.0], np.cumprod(1 + mtm_returns[:-1])))
+        increments = pos_values * mtm_returns
+        increments[-1] -= float(pos.commission)
+        increments_list.append(increments)
+        lengths[i] = len(increments)
+
+    return np.concatenate(increments_list), lengths
+
+
+def _simulate_ragged_chunk(
+    increments, position_lengths, position_offsets, num_of_sim_positions,
+    start_capital, num_of_sims, rng, resampling_method, block_len
+):
+    """
+    Simulates num_of_sims sequences of positions for each instrument
+    and returns the final equity and max drawdown of every sequence
+    as arrays of shape (instruments, num_of_sims).
+    """
+
+    increment_starts = np.concatenate(([0], np.cumsum(position_lengths)[:-1]))
+
+    # global position ids of each simulated sequence, instrument major
+    sequences = [
+        position_offsets[i] + resample_indices(
+            resampling_method, position_offsets[i + 1] - position_offsets[i], num_of_sims,
+            length=num_of_sim_positions[i], block_len=block_len, rng=rng
+        ).ravel()
+        for i in range(len(num_of_sim_positions))
+    ]
+    sequence_ids = np.concatenate(sequences)
+    rows = np.repeat(
+        np.arange(len(num_of_sim_positions) * num_of_sims),
+        np.repeat(num_of_sim_positions, num_of_sims)
+    )
+
+    lens = position_lengths[sequence_ids]
+    num_of_elements = lens.sum()
+    elem_rows = np.repeat(rows, lens)
+    entry_starts = np.cumsum(lens) - lens
+    elem_index = np.repeat(increment_starts[sequence_ids] - entry_starts, lens) + np.arange(num_of_elements)
+
+    row_lengths = np.bincount(elem_rows, minlength=len(num_of_sim_positions) * num_of_sims)
+    row_starts = np.cumsum(row_lengths) - row_lengths
+    elem_cols = np.arange(num_of_elements) - row_starts[elem_rows]
+
+    # Accumulated in place into equity curves to avoid a second matrix
+    equity_curves = np.zeros((len(row_lengths), row_lengths.max() + 1))
+    equity_curves[elem_rows, elem_cols + 1] = increments[elem_index]
+    del elem_rows, elem_cols, elem_index
+    np.cumsum(equity_curves, axis=1, out=equity_curves)
+    equity_curves += start_capital
+
+    # Copied, a view would keep the matrix of the chunk alive
+    final_equity = equity_curves[:, -1].reshape(len(num_of_sim_positions), num_of_sims).copy()
+    max_dds = max_drawdowns(equity_curves).reshape(len(num_of_sim_positions), num_of_sims)
+    return final_equity, max_dds
+
+
+def monte_carlo_simulate_positions_batch(
+    positions_list: list[list[Position]], num_of_sim_positions, start_capital=10000,
+    num_of_sims=2500, resampling_method=ResamplingMethod.SHUFFLE, block_len=None,
+    rng=None, chunk_size=250, max_chunk_elements=2 ** 20, num_workers=4
+):
+    """
+    Simulates sequences of positions for many instruments in one
+    vectorized pass. The positions of all instruments are converted to
+    equity increments once, and each chunk of simulations resamples,
+    gathers and accumulates the ragged position sequences of every
+    instrument as rows of a single matrix. Chunks are run on a thread
+    pool with independent random streams spawned from rng. The number
+    of simulations per chunk is reduced as the number of instruments
+    grows, to keep the matrix of a chunk at about max_chunk_elements.
+
+    Parameters
+    ----------
+    :param positions_list:
+        'list' : A list with a collection of Position objects
+        per instrument.
+    :param num_of_sim_positions:
+        'list' : The number of positions to draw for each simulated
+        sequence, per instrument.
+    :param start_capital:
+        Keyword arg 'int/float' : The amount of starting capital.
+        Default value=10000
+    :param num_of_sims:
+        Keyword arg 'int' : The number of simulations per instrument.
+        Default value=2500
+    :param resampling_method:
+        Keyword arg 'ResamplingMethod/str' : How to resample the
+        sequences of positions. Default value=ResamplingMethod.SHUFFLE
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap resampling methods. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+    :param chunk_size:
+        Keyword arg 'int' : The maximum number of simulations per
+        instrument to run in each chunk. Default value=250
+    :param max_chunk_elements:
+        Keyword arg 'int' : The approximate number of elements of the
+        equity curve matrix of a chunk, each chunk allocates a few
+        float64 arrays of this size. Default value=2 ** 20
+    :param num_workers:
+        Keyword arg 'None/int' : The number of worker threads, passed
+        to ThreadPoolExecutor, each running a chunk at a time.
+        Default value=4
+
+    :return:
+        'tuple' : The final equity and the max drawdown of each
+        simulation, as float arrays of shape (instruments, num_of_sims).
+    """
+
+    rng = np.random.default_rng() if rng is None else rng
+    increments_list, lengths_list = zip(
+        *[position_equity_increments(positions) for positions in positions_list]
+    )
+    increments = np.concatenate(increments_list)
+    position_lengths = np.concatenate(lengths_list)
+    position_offsets = np.concatenate(([0], np.cumsum([len(lengths) for lengths in lengths_list])))
+    num_of_sim_positions = np.asarray(num_of_sim_positions, dtype=int)
+
+    # The expected length of the longest simulated row of an instrument
+    row_len = max(
+        num_of_sim * lengths.mean() for num_of_sim, lengths in zip(num_of_sim_positions, lengths_list)
+    )
+    chunk_size = int(max(1, min(
+        chunk_size, max_chunk_elements // (len(num_of_sim_positions) * (row_len + 1))
+    )))
+    chunk_sizes = [
+        min(chunk_size, num_of_sims - chunk_start)
+        for chunk_start in range(0, num_of_sims, chunk_size)
+    ]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        results = list(executor.map(
+            lambda args: _simulate_ragged_chunk(
+                increments, position_lengths, position_offsets, num_of_sim_positions,
+                start_capital, args[0], args[1], resampling_method, block_len
+            ),
+            zip(chunk_sizes, rng.spawn(len(chunk_sizes)))
+        ))
+
+    final_equity = np.concatenate([result[0] for result in results], axis=1)
+    max_dds = np.concatenate([result[1] for result in results], axis=1)
+    return final_equity, max_dds
+
+
+def portfolio_calendar_arrays(positions: list[Position]):
+    """
+    Aligns the positions of many instruments on a common business day
+    calendar and sums their equity increments and exposure per day.
+    The market to market returns of a position are assigned to the
+    business days up to and including its exit date.
+
+    Parameters
+    ----------
+    :param positions:
+        'list' : A collection of closed Position objects, possibly
+        of different instruments.
+
+    :return:
+        'tuple' : The calendar as a Pandas DatetimeIndex, and float
+        arrays with the profit/loss and the exposure (capital in open
+        positions) of each day of the calendar.
+    """
+
+    increments, lengths = position_equity_increments(positions)
+    entry_values = np.array([float(pos.entry_price * pos.position_size) for pos in positions])
+    exit_dts = pd.to_datetime([pos.exit_dt for pos in positions]).normalize()
+    entry_dts = pd.to_datetime([pos.entry_dt for pos in positions]).normalize()
+
+    calendar = pd.bdate_range(entry_dts.min(), exit_dts.max())
+    exit_index = calendar.searchsorted(exit_dts, side='right') - 1
+
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    day_index = np.repeat(exit_index - lengths + 1, lengths) + offsets
+    in_calendar = day_index >= 0
+
+    daily_pnl = np.bincount(
+        day_index[in_calendar], weights=increments[in_calendar], minlength=len(calendar)
+    )
+    daily_exposure = np.bincount(
+        day_index[in_calendar], weights=np.repeat(entry_values, lengths)[in_calendar],
+        minlength=len(calendar)
+    )
+    return calendar, daily_pnl, daily_exposure
+
+
+def monte_carlo_simulate_portfolio(
+    positions: list[Position], start_capital=None, num_of_sims=2500,
+    data_fraction_used=1.0, resampling_method=ResamplingMethod.STATIONARY,
+    block_len=None, rng=None
+):
+    """
+    Simulates equity curves of a portfolio trading many instruments
+    on a shared capital base. Days of the calendar aligned profit/loss
+    of all positions are resampled in blocks, so concurrent positions
+    stay together and overlapping exposure and cross instrument
+    correlation are preserved.
+
+    Parameters
+    ----------
+    :param positions:
+        'list' : A collection of closed Position objects, possibly
+        of different instruments.
+    :param start_capital:
+        Keyword arg 'None/int/float' : The shared capital. Defaults to
+        the peak capital in concurrently open positions if None.
+        Default value=None
+    :param num_of_sims:
+        Keyword arg 'int' : The number of simulations to run.
+        Default value=2500
+    :param data_fraction_used:
+        Keyword arg 'float' : The length of the simulated equity curves
+        as a fraction of the number of days in the calendar.
+        Default value=1.0
+    :param resampling_method:
+        Keyword arg 'ResamplingMethod/str' : How to resample the days.
+        Default value=ResamplingMethod.STATIONARY
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length in days.
+        Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'tuple' : The final equity and max drawdown of each simulation
+        as float arrays, the shared capital and the number of periods
+        of the simulated equity curves.
+    """
+
+    _, daily_pnl, daily_exposure = portfolio_calendar_arrays(positions)
+    start_capital = daily_exposure.max() if start_capital is None else start_capital
+    num_of_periods = max(1, int(len(daily_pnl) * data_fraction_used + 0.5))
+
+    indices = resample_indices(
+        resampling_method, len(daily_pnl), num_of_sims,
+        length=num_of_periods, block_len=block_len, rng=rng
+    )
+    equity_curves = start_capital + np.cumsum(daily_pnl[indices], axis=1)
+    equity_curves = np.hstack((np.full((num_of_sims, 1), start_capital), equity_curves))
+
+    return equity_curves[:, -1], max_drawdowns(equity_curves), start_capital, num_of_periods
@@ -0,0 +1,173 @@
+import numpy as np
+
+
+class P2QuantileEstimator:
+    """
+    Estimates a single quantile of a stream of observations in constant
+    memory using the P-square algorithm (Jain & Chlamtac, 1985). Five
+    markers are kept and adjusted with piecewise-parabolic interpolation
+    as observations arrive.
+
+    Parameters
+    ----------
+    quantile : 'float'
+        The quantile to estimate, given as a float from 0.0 to 1.0.
+    """
+
+    def __init__(self, quantile):
+        if not 0.0 <= quantile <= 1.0:
+            raise ValueError(f'quantile must be in the range [0.0, 1.0], got {quantile}')
+
+        self.__quantile = quantile
+        self.__count = 0
+        self.__heights = []
+        self.__positions = [0, 1, 2, 3, 4]
+        self.__desired_positions = [
+            0, 2 * quantile, 4 * quantile, 2 + 2 * quantile, 4
+        ]
+        self.__increments = [0, quantile / 2, quantile, (1 + quantile) / 2, 1]
+
+    @property
+    def quantile(self):
+        return self.__quantile
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def value(self):
+        """
+        The current estimate of the quantile. Until five observations
+        have been made the value is read from the sorted observations,
+        using the same index convention as the simulators.
+
+        :return:
+            'float'
+        """
+
+        if self.__count == 0:
+            return np.nan
+        if self.__count < 5:
+            heights = sorted(self.__heights)
+            return heights[min(int(len(heights) * self.__quantile), len(heights) - 1)]
+        return self.__heights[2]
+
+    def _parabolic(self, i, d):
+        q, n = self.__heights, self.__positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i, d):
+        q, n = self.__heights, self.__positions
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    def update(self, x):
+        """
+        Adds an observation to the estimator.
+
+        Parameters
+        ----------
+        :param x:
+            'float/Decimal' : The observed value.
+        """
+
+        x = float(x)
+        self.__count += 1
+        q, n = self.__heights, self.__positions
+
+        if self.__count <= 5:
+            q.append(x)
+            if self.__count == 5:
+                q.sort()
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.__desired_positions[i] += self.__increments[i]
+
+        for i in range(1, 4):
+            d = self.__desired_positions[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = self._linear(i, d)
+                q[i] = height
+                n[i] += d
+
+
+class QuantileSketch:
+    """
+    Keeps a P-square estimator for each of the given quantiles together
+    with the count, min and max of a stream of observations.
+
+    Parameters
+    ----------
+    quantiles : 'tuple'
+        A collection of quantiles to estimate, given as floats
+        from 0.0 to 1.0.
+    """
+
+    def __init__(self, quantiles):
+        self.__estimators = {q: P2QuantileEstimator(q) for q in quantiles}
+        self.__count = 0
+        self.__min = np.inf
+        self.__max = -np.inf
+
+    @property
+    def count(self):
+        return self.__count
+
+    @property
+    def min(self):
+        return self.__min
+
+    @property
+    def max(self):
+        return self.__max
+
+    @property
+    def quantiles(self):
+        """
+        A dict with the estimated value of each quantile.
+
+        :return:
+            'dict'
+        """
+
+        return {q: estimator.value for q, estimator in self.__estimators.items()}
+
+    def __getitem__(self, quantile):
+        return self.__estimators[quantile].value
+
+    def update(self, x):
+        """
+        Adds an observation to the estimators of the sketch.
+
+        Parameters
+        ----------
+        :param x:
+            'float/Decimal' : The observed value.
+        """
+
+        x = float(x)
+        self.__count += 1
+        self.__min = min(self.__min, x)
+        self.__max = max(self.__max, x)
+        for estimator in self.__estimators.values():
+            estimator.update(x)
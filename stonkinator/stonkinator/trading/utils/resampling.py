@@ -0,0 +1,301 @@
+from enum import Enum
+
+import numpy as np
+
+
+class ResamplingMethod(Enum):
+
+    SHUFFLE = 'shuffle'
+    BLOCK = 'block'
+    STATIONARY = 'stationary'
+
+
+def default_block_len(n):
+    """
+    Returns a default (average) block length for a series of n
+    observations, using the n^(1/3) rule of thumb.
+
+    Parameters
+    ----------
+    :param n:
+        'int' : The number of observations in the series.
+
+    :return:
+        'int'
+    """
+
+    return max(1, int(round(n ** (1 / 3))))
+
+
+def shuffle_indices(n, num_of_sims, rng=None):
+    """
+    Generates index arrays of permutations of n observations,
+    one row per simulation.
+
+    Parameters
+    ----------
+    :param n:
+        'int' : The number of observations to permute.
+    :param num_of_sims:
+        'int' : The number of index arrays to generate.
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'numpy array' : An int array of shape (num_of_sims, n).
+    """
+
+    rng = np.random.default_rng() if rng is None else rng
+    return rng.permuted(np.tile(np.arange(n), (num_of_sims, 1)), axis=1)
+
+
+def block_bootstrap_indices(n, num_of_sims, length=None, block_len=None, rng=None):
+    """
+    Generates index arrays with the circular moving block bootstrap.
+    Blocks of block_len consecutive indices, starting at uniformly
+    drawn offsets, are concatenated until 'length' indices are drawn.
+
+    Parameters
+    ----------
+    :param n:
+        'int' : The number of observations to resample from.
+    :param num_of_sims:
+        'int' : The number of index arrays to generate.
+    :param length:
+        Keyword arg 'None/int' : The length of each index array,
+        which may exceed n. Defaults to n if None. Default value=None
+    :param block_len:
+        Keyword arg 'None/int' : The length of the blocks. Defaults
+        to default_block_len(n) if None. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'numpy array' : An int array of shape (num_of_sims, length).
+    """
+
+    rng = np.random.default_rng() if rng is None else rng
+    length = n if length is None else length
+    block_len = default_block_len(n) if block_len is None else min(block_len, n)
+    num_of_blocks = -(-length // block_len)
+
+    starts = rng.integers(0, n, size=(num_of_sims, num_of_blocks))
+    indices = (starts[:, :, np.newaxis] + np.arange(block_len)) % n
+    return indices.reshape(num_of_sims, -1)[:, :length]
+
+
+def stationary_bootstrap_indices(n, num_of_sims, length=None, block_len=None, rng=None):
+    """
+    Generates index arrays with the stationary bootstrap of Politis
+    and Romano. Each index starts a new block at a uniformly drawn
+    offset with probability 1 / block_len, otherwise it continues
+    the current block, giving geometrically distributed block lengths
+    with mean block_len.
+
+    Parameters
+    ----------
+    :param n:
+        'int' : The number of observations to resample from.
+    :param num_of_sims:
+        'int' : The number of index arrays to generate.
+    :param length:
+        Keyword arg 'None/int' : The length of each index array,
+        which may exceed n. Defaults to n if None. Default value=None
+    :param block_len:
+        Keyword arg 'None/int/float' : The mean length of the blocks.
+        Defaults to default_block_len(n) if None. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'numpy array' : An int array of shape (num_of_sims, length).
+    """
+
+    rng = np.random.default_rng() if rng is None else rng
+    length = n if length is None else length
+    block_len = default_block_len(n) if block_len is None else block_len
+
+    new_block = rng.random((num_of_sims, length)) < 1 / block_len
+    new_block[:, 0] = True
+    starts = rng.integers(0, n, size=(num_of_sims, length))
+
+    steps = np.arange(length)
+    block_starts = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    rows = np.arange(num_of_sims)[:, np.newaxis]
+    return (starts[rows, block_starts] + steps - block_starts) % n
+
+
+def resample_indices(
+    method, n, num_of_sims, length=None, block_len=None, rng=None
+):
+    """
+    Generates index arrays for num_of_sims resampled sequences of
+    n observations with the given resampling method.
+
+    Parameters
+    ----------
+    :param method:
+        'ResamplingMethod/str' : The resampling method.
+    :param n:
+        'int' : The number of observations to resample from.
+    :param num_of_sims:
+        'int' : The number of index arrays to generate.
+    :param length:
+        Keyword arg 'None/int' : The length of each index array. Must
+        not exceed n when shuffling. Defaults to n if None.
+        Default value=None
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap methods. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'numpy array' : An int array of shape (num_of_sims, length).
+    """
+
+    method = ResamplingMethod(method)
+    if method == ResamplingMethod.SHUFFLE:
+        if length is not None and length > n:
+            raise ValueError(
+                f'can not shuffle {n} observations into sequences of length {length}'
+            )
+        return shuffle_indices(n, num_of_sims, rng=rng)[:, :length]
+    elif method == ResamplingMethod.BLOCK:
+        return block_bootstrap_indices(
+            n, num_of_sims, length=length, block_len=block_len, rng=rng
+        )
+    else:
+        return stationary_bootstrap_indices(
+            n, num_of_sims, length=length, block_len=block_len, rng=rng
+        )
+
+
+def iter_resampled_indices(
+    method, n, num_of_sims, length=None, block_len=None, rng=None, chunk_size=1000
+):
+    """
+    Yields the index arrays of resample_indices one simulation at a
+    time, generating them in bulk chunks of chunk_size simulations so
+    that memory usage does not grow with num_of_sims.
+
+    Parameters
+    ----------
+    :param method:
+        'ResamplingMethod/str' : The resampling method.
+    :param n:
+        'int' : The number of observations to resample from.
+    :param num_of_sims:
+        'int' : The number of index arrays to generate.
+    :param length:
+        Keyword arg 'None/int' : The length of each index array.
+        Default value=None
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap methods. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+    :param chunk_size:
+        Keyword arg 'int' : The number of index arrays to generate
+        per chunk. Default value=1000
+
+    :return:
+        'generator'
+    """
+
+    rng = np.random.default_rng() if rng is None else rng
+    for chunk_start in range(0, num_of_sims, chunk_size):
+        yield from resample_indices(
+            method, n, min(chunk_size, num_of_sims - chunk_start),
+            length=length, block_len=block_len, rng=rng
+        )
+
+
+def resample_mtm_returns(
+    mtm_returns, num_of_sims, method=ResamplingMethod.STATIONARY,
+    length=None, block_len=None, rng=None
+):
+    """
+    Resamples a series of market to market returns into a matrix
+    with one resampled return series per simulation.
+
+    Parameters
+    ----------
+    :param mtm_returns:
+        'list/numpy array' : A series of market to market returns
+        given in percent.
+    :param num_of_sims:
+        'int' : The number of series to generate.
+    :param method:
+        Keyword arg 'ResamplingMethod/str' : The resampling method.
+        Default value=ResamplingMethod.STATIONARY
+    :param length:
+        Keyword arg 'None/int' : The length of each resampled series.
+        Defaults to the length of mtm_returns if None.
+        Default value=None
+    :param block_len:
+        Keyword arg 'None/int' : The (mean) block length of the
+        bootstrap methods. Default value=None
+    :param rng:
+        Keyword arg 'None/numpy Generator' : Random number generator.
+        Default value=None
+
+    :return:
+        'numpy array' : A float array of shape (num_of_sims, length).
+    """
+
+    mtm_returns = np.asarray(mtm_returns, dtype=float)
+    indices = resample_indices(
+        method, len(mtm_returns), num_of_sims,
+        length=length, block_len=block_len, rng=rng
+    )
+    return mtm_returns[indices]
+
+
+def equity_curves_from_returns(returns_matrix, start_capital, capital_fraction=1.0):
+    """
+    Compounds a matrix of percentage returns into equity curves,
+    investing capital_fraction of the equity each period.
+
+    Parameters
+    ----------
+    :param returns_matrix:
+        'numpy array' : Returns given in percent, of shape
+        (num_of_sims, periods).
+    :param start_capital:
+        'int/float' : The amount of starting capital.
+    :param capital_fraction:
+        Keyword arg 'float' : The fraction of equity exposed to the
+        returns each period. Default value=1.0
+
+    :return:
+        'numpy array' : Equity curves of shape (num_of_sims, periods + 1),
+        starting at start_capital.
+    """
+
+    growth = np.cumprod(1 + capital_fraction * returns_matrix / 100, axis=1)
+    return start_capital * np.hstack((np.ones((len(returns_matrix), 1)), growth))
+
+
+def max_drawdowns(equity_curves):
+    """
+    Calculates the maximum drawdown of each row of a matrix of
+    equity curves, given in percent.
+
+    Parameters
+    ----------
+    :param equity_curves:
+        'numpy array' : Equity curves of shape (num_of_sims, periods).
+
+    :return:
+        'numpy array' : A float array of shape (num_of_sims,).
+    """
+
+    equity_curves = np.asarray(equity_curves, dtype=float)
+    peaks = np.maximum.accumulate(equity_curves, axis=1)
+    return np.abs(np.min((equity_curves - peaks) / peaks, axis=1) * 100)
@@ -0,0 +1,412 @@
+import numpy as np
+import pandas as pd
+
+from trading_systems.data_utils.indicator_feature_workshop.feature_spec import (
+    Feature, FeaturePipeline
+)
+
+
+class PricePanel:
+    """
+    Price data of many instruments as (time, instruments) matrices, on
+    which features are calculated for all instruments in one vectorized
+    call per feature.
+
+    Instruments listed at different dates, or missing dates that other
+    instruments have, e.g. exchange holidays, have NaN gaps in the
+    calendar aligned matrices. The panel keeps its matrices compacted,
+    with the rows of every instrument stacked from the first row in
+    order and NaN padded below, so that moving averages, EWMs and RSI
+    seeds run over the same rows as when calculated on the instrument's
+    own DataFrame. Matrices are mapped back to the calendar on the way
+    out by the row positions of each instrument.
+
+    Parameters
+    ----------
+    index : 'Pandas Index'
+        The calendar of the calendar aligned matrices.
+    instruments : 'list'
+        The instruments, in column order.
+    matrices : 'kwargs'
+        Calendar aligned (time, instruments) matrices keyed by column
+        name, e.g. open, high, low, close and volume.
+    ref_col_name : Keyword arg 'str'
+        The column whose valid values define the rows of each
+        instrument when row_mask is None. Default value='close'
+    row_mask : Keyword arg 'None/numpy array'
+        A boolean (time, instruments) matrix of the rows of each
+        instrument, e.g. the dates of its own DataFrame.
+        Default value=None
+    """
+
+    def __init__(self, index, instruments, ref_col_name='close', row_mask=None, **matrices):
+        self.__index = index
+        self.__instruments = list(instruments)
+
+        if row_mask is None:
+            row_mask = ~np.isnan(np.asarray(matrices[ref_col_name], dtype=float))
+        row_mask = np.asarray(row_mask, dtype=bool)
+        self.__lengths = row_mask.sum(axis=0)
+        # The calendar rows of each instrument in order, followed by
+        # padding, and the mask of the rows that are not padding
+        self.__rows = np.argsort(~row_mask, axis=0, kind='stable')
+        self.__in_range = np.arange(len(index))[:, np.newaxis] < self.__lengths
+
+        self.__matrices = {
+            col_name: self._compact(np.asarray(matrix, dtype=float))
+            for col_name, matrix in matrices.items()
+        }
+
+    @classmethod
+    def from_frames(cls, dfs: dict, col_names=('open', 'high', 'low', 'close', 'volume')):
+        """
+        Builds a panel from a dict of per-instrument DataFrames, aligned
+        on the union of their indexes. The rows of each instrument are
+        the rows of its DataFrame.
+
+        Parameters
+        ----------
+        :param dfs:
+            'dict' : Pandas DataFrames keyed by instrument.
+        :param col_names:
+            Keyword arg 'tuple' : The columns to collect.
+            Default value=('open', 'high', 'low', 'close', 'volume')
+
+        :return:
+            'PricePanel'
+        """
+
+        index = pd.Index(np.unique(np.concatenate([df.index.to_numpy() for df in dfs.values()])))
+
+        matrices = {
+            col_name: np.full((len(index), len(dfs)), np.nan) for col_name in col_names
+        }
+        row_mask = np.zeros((len(index), len(dfs)), dtype=bool)
+        for i, df in enumerate(dfs.values()):
+            rows = index.get_indexer(df.index)
+            row_mask[rows, i] = True
+            for col_name in col_names:
+                matrices[col_name][rows, i] = df[col_name].to_numpy(dtype=float)
+
+        return cls(index, list(dfs.keys()), row_mask=row_mask, **matrices)
+
+    @property
+    def index(self):
+        return self.__index
+
+    @property
+    def instruments(self):
+        return list(self.__instruments)
+
+    @property
+    def columns(self):
+        return list(self.__matrices.keys())
+
+    @property
+    def lengths(self):
+        """
+        The number of rows of each instrument.
+
+        :return:
+            'numpy array'
+        """
+
+        return self.__lengths.copy()
+
+    def _compact(self, matrix):
+        compacted = np.take_along_axis(matrix, self.__rows, axis=0)
+        compacted[~self.__in_range] = np.nan
+        # Column major, so each instrument's time series is contiguous
+        return np.asfortranarray(compacted)
+
+    def _calendar_align(self, matrix):
+        calendar = np.full(matrix.shape, np.nan)
+        columns = np.broadcast_to(np.arange(matrix.shape[1]), matrix.shape)
+        calendar[self.__rows[self.__in_range], columns[self.__in_range]] = \
+            np.asarray(matrix, dtype=float)[self.__in_range]
+        return calendar
+
+    def __getitem__(self, col_name):
+        return self.__matrices[col_name]
+
+    def __setitem__(self, col_name, matrix):
+        self.__matrices[col_name] = np.asfortranarray(matrix, dtype=float)
+
+    def __contains__(self, col_name):
+        return col_name in self.__matrices
+
+    def matrix(self, col_name) -> np.ndarray:
+        """
+        Returns a column as a calendar aligned (time, instruments) matrix.
+
+        Parameters
+        ----------
+        :param col_name:
+            'str' : The name of the column.
+
+        :return:
+            'numpy array'
+        """
+
+        return self._calendar_align(self.__matrices[col_name])
+
+    def to_frame(self, col_name) -> pd.DataFrame:
+        """
+        Returns a column as a calendar aligned DataFrame with one column
+        per instrument.
+
+        Parameters
+        ----------
+        :param col_name:
+            'str' : The name of the column.
+
+        :return:
+            'Pandas DataFrame'
+        """
+
+        return pd.DataFrame(
+            self.matrix(col_name), index=self.__index, columns=self.__instruments
+        )
+
+    def to_frames(self, col_names=None) -> dict[str, pd.DataFrame]:
+        """
+        Returns per-instrument DataFrames with the given columns, each
+        covering the rows of its instrument.
+
+        Parameters
+        ----------
+        :param col_names:
+            Keyword arg 'None/list' : The columns to include, all
+            columns if None. Default value=None
+
+        :return:
+            'dict' : Pandas DataFrames keyed by instrument.
+        """
+
+        col_names = self.columns if col_names is None else col_names
+        dfs = {}
+        for i, instrument in enumerate(self.__instruments):
+            length = self.__lengths[i]
+            dfs[instrument] = pd.DataFrame(
+                {col_name: self.__matrices[col_name][:length, i] for col_name in col_names},
+                index=self.__index[self.__rows[:length, i]]
+            )
+        return dfs
+
+
+def _rolling(matrix, period_param):
+    return pd.DataFrame(matrix).rolling(period_param)
+
+
+def _ewm_mean(matrix, **kwargs):
+    return pd.DataFrame(matrix).ewm(**kwargs).mean().to_numpy()
+
+
+def _shift(matrix, periods=1):
+    shifted = np.full_like(matrix, np.nan)
+    shifted[periods:] = matrix[:-periods]
+    return shifted
+
+
+def batched_apply_sma(panel: PricePanel, period_param, col_name='close', suffix=''):
+    panel[f'SMA_{period_param}{suffix}'] = _rolling(panel[col_name], period_param).mean()
+
+
+def batched_apply_ema(panel: PricePanel, period_param, col_name='close', suffix=''):
+    panel[f'EMA_{period_param}{suffix}'] = _ewm_mean(
+        panel[col_name], span=period_param, adjust=False
+    )
+
+
+def batched_apply_atr(
+    panel: PricePanel, period_param=14, col_name_high='high', col_name_low='low',
+    col_name_close='close', use_prev_close=False, suffix=''
+):
+    high, low, close = panel[col_name_high], panel[col_name_low], panel[col_name_close]
+    if use_prev_close:
+        ref_close = _shift(close)
+        tr = np.fmax(high - low, np.fmax(np.abs(high - ref_close), np.abs(low - ref_close)))
+    else:
+        tr = np.maximum(high - low, np.maximum(np.abs(high - close), np.abs(low - close)))
+        tr[:1] = np.nan
+
+    panel[f'TR{suffix}'] = tr
+    panel[f'ATR{suffix}'] = np.round(_ewm_mean(tr, alpha=1 / period_param, adjust=False), 4)
+
+
+def batched_apply_adr(
+    panel: PricePanel, period_param=14, col_name_high='high', col_name_low='low',
+    col_name_close='close', use_prev_close=False, suffix=''
+):
+    panel[f'ADR{suffix}'] = (panel[f'ATR{suffix}'] / panel[col_name_close]) * 100
+
+
+def batched_apply_rsi(panel: PricePanel, period_param=14, col_name='close', suffix=''):
+    periods = [period_param] if np.isscalar(period_param) else period_param
+    prices = panel[col_name]
+    deltas = np.zeros_like(prices)
+    deltas[1:] = np.diff(prices, axis=0)
+    gains = np.nan_to_num(deltas.clip(min=0), nan=0.0)
+    losses = np.nan_to_num(-deltas.clip(max=0), nan=0.0)
+
+    for n in periods:
+        rsi = np.full_like(prices, np.nan)
+        if len(prices) > n + 1:
+            seed_gain = np.sum(deltas[1:n+1].clip(min=0), axis=0) / n
+            seed_loss = -np.sum(deltas[1:n+1].clip(max=0), axis=0) / n
+            avg_gain = _ewm_mean(
+                np.vstack((seed_gain, gains[n+1:])), alpha=1 / n, adjust=False
+            )[1:]
+            avg_loss = _ewm_mean(
+                np.vstack((seed_loss, losses[n+1:])), alpha=1 / n, adjust=False
+            )[1:]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi[n+1:] = np.where(
+                    avg_loss != 0, np.round(100 - (100 / (1 + avg_gain / avg_loss)), 4), 100
+                )
+            # Instruments with too few periods for an RSI
+            rsi[:, panel.lengths <= n + 1] = np.nan
+
+        panel[f'RSI_{n}{suffix}'] = rsi
+
+
+def batched_apply_bollinger_bands(
+    panel: PricePanel, ma_period_param=20, sd_multiplier=2, col_name='close', suffix=''
+):
+    if np.isscalar(ma_period_param):
+        periods, band_suffixes = [ma_period_param], [suffix]
+    else:
+        periods = ma_period_param
+        band_suffixes = [f'_{period}{suffix}' for period in periods]
+
+    prices = panel[col_name]
+    for period, band_suffix in zip(periods, band_suffixes):
+        stdev = np.full_like(prices, np.nan)
+        if len(prices) > period + 1:
+            stdev[period+1:] = np.std(
+                np.lib.stride_tricks.sliding_window_view(prices, period, axis=0)[2:], axis=-1
+            )
+        sma = panel[f'SMA_{period}{suffix}']
+
+        panel[f'STD_{col_name}{band_suffix}'] = np.round(stdev, 4)
+        panel[f'BB_upper{band_suffix}'] = sma + stdev * sd_multiplier
+        panel[f'BB_lower{band_suffix}'] = sma - stdev * sd_multiplier
+        panel[f'BB_distance{band_suffix}'] = \
+            panel[f'BB_upper{band_suffix}'] - panel[f'BB_lower{band_suffix}']
+
+
+def batched_apply_keltner_channels(
+    panel: PricePanel, ema_period_param=20, atr_period_param=20, multiplier=1,
+    col_name_high='high', col_name_low='low', col_name_close='close',
+    use_prev_close=False, suffix=''
+):
+    atr_band = panel[f'ATR{suffix}'] * multiplier
+    panel[f'Keltner_upper{suffix}'] = panel[f'EMA_{ema_period_param}'] + atr_band
+    panel[f'Keltner_lower{suffix}'] = panel[f'EMA_{ema_period_param}'] - atr_band
+
+
+def batched_apply_comparative_relative_strength(panel: PricePanel, col_1, col_2, suffix=''):
+    panel[f'CRS{suffix}'] = panel[col_1] / panel[col_2]
+
+
+def batched_apply_avg_volume(panel: PricePanel, period_param, col_name='volume', suffix=''):
+    panel[f'Avg_vol_({period_param}){suffix}'] = _rolling(panel[col_name], period_param).mean()
+
+
+def batched_apply_rvol(panel: PricePanel, period_param=10, col_name='volume', suffix=''):
+    avg_volume = panel[f'Avg_vol_({period_param})']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rvol = np.where(avg_volume <= 0, 0, panel[col_name] / avg_volume)
+    rvol[:period_param] = np.nan
+
+    panel[f'RVOL_({period_param}){suffix}'] = rvol
+
+
+def batched_apply_volume_balance(
+    panel: PricePanel, period_param=20, col_name_price='close', col_name_volume='volume',
+    suffix=''
+):
+    price, volume = panel[col_name_price], panel[col_name_volume]
+    prev_price = _shift(price)
+    signed_volume = np.where(
+        price > prev_price, volume, np.where(price < prev_price, -volume, 0.0)
+    )
+    signed_volume[:2] = np.nan
+
+    panel[f'Volume_balance_{period_param}{suffix}'] = \
+        _rolling(signed_volume, period_param).mean()
+
+
+def batched_apply_vwap(
+    panel: PricePanel, period_param, col_name_price='close', col_name_volume='volume',
+    suffix=''
+):
+    price, volume = panel[col_name_price], panel[col_name_volume]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        panel[f'VWAP_{period_param}{suffix}'] = \
+            _rolling(price * volume, period_param).sum().shift(1).to_numpy() / \
+            _rolling(volume, period_param).sum().shift(1).to_numpy()
+
+
+def batched_apply_percent_period_return(panel: PricePanel, period_param, col_name='close', suffix=''):
+    prices = panel[col_name]
+    panel[f'{period_param}_p_%_change{suffix}'] = \
+        (prices / _shift(prices, period_param) - 1) * 100
+
+
+def batched_apply_percent_rank(panel: PricePanel, period_param, col_name='close', suffix=''):
+    values = panel[col_name]
+    pct_rank = np.full_like(values, np.nan)
+    if len(values) > period_param:
+        windows = np.lib.stride_tricks.sliding_window_view(values, period_param + 1, axis=0)
+        pct_rank[period_param:] = \
+            (windows[..., :-1] < windows[..., -1:]).sum(axis=-1) / period_param
+
+    panel[f'%_rank{suffix}'] = pct_rank
+
+
+_BATCHED_FEATURES = {
+    'sma': batched_apply_sma,
+    'ema': batched_apply_ema,
+    'atr': batched_apply_atr,
+    'adr': batched_apply_adr,
+    'rsi': batched_apply_rsi,
+    'bollinger_bands': batched_apply_bollinger_bands,
+    'keltner_channels': batched_apply_keltner_channels,
+    'comparative_relative_strength': batched_apply_comparative_relative_strength,
+    'avg_volume': batched_apply_avg_volume,
+    'rvol': batched_apply_rvol,
+    'volume_balance': batched_apply_volume_balance,
+    'vwap': batched_apply_vwap,
+    'percent_period_return': batched_apply_percent_period_return,
+    'percent_rank': batched_apply_percent_rank,
+}
+
+
+def compute_batched_features(panel: PricePanel, features: list[Feature]) -> PricePanel:
+    """
+    Resolves declared features with a FeaturePipeline and calculates
+    each of them once for all instruments of a panel. The results are
+    added to the panel under the column names of the per-instrument
+    apply functions.
+
+    Parameters
+    ----------
+    :param panel:
+        'PricePanel' : Price data of the instruments.
+    :param features:
+        'list' : A collection of Feature objects.
+
+    :return:
+        'PricePanel' : The given panel.
+    """
+
+    pipeline = FeaturePipeline(features)
+    unsupported = {f.name for f in pipeline.features if f.name not in _BATCHED_FEATURES}
+    if unsupported:
+        raise ValueError(f'features without a batched implementation: {sorted(unsupported)}')
+
+    for feature in pipeline.features:
+        _BATCHED_FEATURES[feature.name](panel, **feature.params)
+
+    return panel
@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc
+
+from trading_systems.data_utils.indicator_feature_workshop.feature_spec import FeaturePipeline
+
+
+def feature_spec_hash(pipeline: FeaturePipeline):
+    """
+    Returns a hash of the resolved features of a pipeline, including
+    all of their parameters, that is stable across processes.
+
+    Parameters
+    ----------
+    :param pipeline:
+        'FeaturePipeline' : The features to hash.
+
+    :return:
+        'str'
+    """
+
+    spec = repr([feature.key for feature in pipeline.features])
+    return hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+
+def _row_hashes(df: pd.DataFrame) -> np.ndarray:
+    return pd.util.hash_pandas_object(df, index=True).to_numpy()
+
+
+def source_data_hash(df: pd.DataFrame, num_of_rows=None, row_hashes=None):
+    """
+    Returns a hash of the values and index of the first num_of_rows rows
+    of source data, so that restated history, e.g. split adjusted
+    prices, is detected even if the last index value and the number of
+    rows are unchanged.
+
+    Parameters
+    ----------
+    :param df:
+        'Pandas DataFrame' : Source price data.
+    :param num_of_rows:
+        Keyword arg 'None/int' : The number of rows to hash, all rows
+        if None. Default value=None
+    :param row_hashes:
+        Keyword arg 'None/numpy array' : Precomputed hashes of the rows
+        of df. Default value=None
+
+    :return:
+        'str'
+    """
+
+    row_hashes = _row_hashes(df) if row_hashes is None else row_hashes
+    return hashlib.sha256(row_hashes[:num_of_rows].tobytes()).hexdigest()[:32]
+
+
+class FeatureCache:
+    """
+    Local on-disk cache of feature DataFrames in the Arrow IPC file
+    format, keyed by instrument id and a hash of the feature spec.
+
+    Each entry records the watermark of the source data it was
+    calculated from, the index value and the number of its last row
+    and a hash of the source rows. New bars are appended as additional
+    part files instead of rewriting the entry. Entries are read through
+    memory maps, and DataFrames are converted without consolidating the
+    columns, so numeric columns without nulls of single part entries
+    are not copied into memory. When the total size of the cache
+    exceeds max_bytes the least recently used entries, by the
+    modification time of their meta files, are evicted.
+
+    The cache is used with features calculated in Python with a
+    FeaturePipeline. The features of the example trading systems are
+    calculated by the data frame service and are not cached.
+
+    Parameters
+    ----------
+    dir_path : 'str'
+        The directory of the cache.
+    max_bytes : Keyword arg 'None/int'
+        The maximum total size of the cache in bytes, no limit if None.
+        Default value=None
+    """
+
+    __META_FILE = 'meta.json'
+
+    def __init__(self, dir_path, max_bytes=None):
+        self.__dir_path = dir_path
+        self.__max_bytes = max_bytes
+        os.makedirs(dir_path, exist_ok=True)
+
+    def _entry_path(self, instrument_id, spec_hash):
+        return os.path.join(self.__dir_path, f'{instrument_id}_{spec_hash}')
+
+    def _read_meta(self, entry_path):
+        meta_path = os.path.join(entry_path, self.__META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as file:
+            return json.load(file)
+
+    def _write_meta(self, entry_path, meta):
+        meta_path = os.path.join(entry_path, self.__META_FILE)
+        with open(f'{meta_path}.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(f'{meta_path}.tmp', meta_path)
+
+    def _write_part(self, entry_path, part_name, df, schema=None):
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=True)
+        with ipc.new_file(os.path.join(entry_path, part_name), table.schema) as writer:
+            writer.write_table(table)
+        return table.schema
+
+    def _touch(self, entry_path):
+        os.utime(os.path.join(entry_path, self.__META_FILE))
+
+    def watermark(self, instrument_id, spec_hash) -> dict | None:
+        """
+        Returns the watermark of an entry, a dict with the 'watermark'
+        index value, as a str, the 'num_of_rows' and the 'source_hash'
+        of the source data the entry was calculated from.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param spec_hash:
+            'str' : The hash of the feature spec.
+
+        :return:
+            'dict/None' : None if there is no entry.
+        """
+
+        meta = self._read_meta(self._entry_path(instrument_id, spec_hash))
+        if meta is None:
+            return None
+        return {
+            'watermark': meta['watermark'], 'num_of_rows': meta['num_of_rows'],
+            'source_hash': meta.get('source_hash')
+        }
+
+    def read_table(self, instrument_id, spec_hash) -> pa.Table | None:
+        """
+        Reads an entry as an Arrow Table backed by memory maps of its
+        part files.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param spec_hash:
+            'str' : The hash of the feature spec.
+
+        :return:
+            'pyarrow Table/None' : None if there is no entry.
+        """
+
+        entry_path = self._entry_path(instrument_id, spec_hash)
+        meta = self._read_meta(entry_path)
+        if meta is None:
+            return None
+
+        self._touch(entry_path)
+        tables = [
+            ipc.open_file(pa.memory_map(os.path.join(entry_path, part_name))).read_all()
+            for part_name in meta['parts']
+        ]
+        return pa.concat_tables(tables)
+
+    def get(self, instrument_id, spec_hash) -> pd.DataFrame | None:
+        """
+        Reads an entry as a DataFrame.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param spec_hash:
+            'str' : The hash of the feature spec.
+
+        :return:
+            'Pandas DataFrame/None' : None if there is no entry.
+        """
+
+        table = self.read_table(instrument_id, spec_hash)
+        return None if table is None else table.to_pandas(split_blocks=True)
+
+    def put(self, instrument_id, spec_hash, df: pd.DataFrame, source_hash=None):
+        """
+        Writes a DataFrame as an entry, replacing any previous entry.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param spec_hash:
+            'str' : The hash of the feature spec.
+        :param df:
+            'Pandas DataFrame' : The features, with the index of the
+            source data.
+        :param source_hash:
+            Keyword arg 'None/str' : The source_data_hash of the source
+            data. Default value=None
+        """
+
+        entry_path = self._entry_path(instrument_id, spec_hash)
+        shutil.rmtree(entry_path, ignore_errors=True)
+        os.makedirs(entry_path)
+
+        part_name = 'part-00000.arrow'
+        self._write_part(entry_path, part_name, df)
+        self._write_meta(
+            entry_path,
+            {
+                'instrument_id': instrument_id, 'spec_hash': spec_hash,
+                'watermark': str(df.index[-1]), 'num_of_rows': len(df),
+                'source_hash': source_hash, 'parts': [part_name]
+            }
+        )
+        self.evict()
+
+    def append(self, instrument_id, spec_hash, df: pd.DataFrame, source_hash=None):
+        """
+        Appends the rows of a DataFrame to an entry as a new part file
+        and moves the watermark to its last row.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param spec_hash:
+            'str' : The hash of the feature spec.
+        :param df:
+            'Pandas DataFrame' : The features of the new rows, with the
+            same columns as the entry.
+        :param source_hash:
+            Keyword arg 'None/str' : The source_data_hash of all rows of
+            the source data. Default value=None
+        """
+
+        entry_path = self._entry_path(instrument_id, spec_hash)
+        meta = self._read_meta(entry_path)
+        if meta is None:
+            self.put(instrument_id, spec_hash, df, source_hash=source_hash)
+            return
+        if df.empty:
+            return
+
+        first_part = os.path.join(entry_path, meta['parts'][0])
+        schema = ipc.open_file(pa.memory_map(first_part)).schema
+        part_name = f'part-{len(meta["parts"]):05d}.arrow'
+        self._write_part(entry_path, part_name, df, schema=schema)
+
+        meta['parts'].append(part_name)
+        meta['watermark'] = str(df.index[-1])
+        meta['num_of_rows'] += len(df)
+        meta['source_hash'] = source_hash
+        self._write_meta(entry_path, meta)
+        self.evict()
+
+    def size(self):
+        """
+        Returns the total size of the cache in bytes.
+
+        :return:
+            'int'
+        """
+
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for entry_name in os.listdir(self.__dir_path):
+            entry_path = os.path.join(self.__dir_path, entry_name)
+            meta_path = os.path.join(entry_path, self.__META_FILE)
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry_path, file_name))
+                for file_name in os.listdir(entry_path)
+            )
+            yield entry_path, os.path.getmtime(meta_path), size
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the total size of
+        the cache is within max_bytes.
+        """
+
+        if self.__max_bytes is None:
+            return
+
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total_size = sum(size for _, _, size in entries)
+        for entry_path, _, size in entries:
+            if total_size <= self.__max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def get_or_compute(
+        self, instrument_id, df: pd.DataFrame, pipeline: FeaturePipeline
+    ) -> pd.DataFrame:
+        """
+        Returns the features of the source data of an instrument. The
+        cached entry is returned as is if its watermark and source hash
+        match the source data. If the source data extends past the
+        watermark, with the rows up to it unchanged, the features are
+        calculated and only the new rows are appended to the entry.
+        Otherwise the entry is calculated and written anew.
+
+        Parameters
+        ----------
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param df:
+            'Pandas DataFrame' : Source price data of the instrument.
+        :param pipeline:
+            'FeaturePipeline' : The features to apply.
+
+        :return:
+            'Pandas DataFrame'
+        """
+
+        spec_hash = feature_spec_hash(pipeline)
+        watermark = self.watermark(instrument_id, spec_hash)
+        row_hashes = _row_hashes(df)
+        source_hash = source_data_hash(df, row_hashes=row_hashes)
+
+        if watermark is not None and watermark['num_of_rows'] == len(df) and \
+                watermark['watermark'] == str(df.index[-1]) and \
+                watermark['source_hash'] == source_hash:
+            return self.get(instrument_id, spec_hash)
+
+        features_df = pipeline(df.copy())
+        num_of_rows = watermark['num_of_rows'] if watermark is not None else 0
+        if 0 < num_of_rows < len(df) and \
+                str(df.index[num_of_rows - 1]) == watermark['watermark'] and \
+                source_data_hash(df, num_of_rows, row_hashes=row_hashes) == watermark['source_hash']:
+            self.append(
+                instrument_id, spec_hash, features_df.iloc[num_of_rows:], source_hash=source_hash
+            )
+        else:
+            self.put(instrument_id, spec_hash, features_df, source_hash=source_hash)
+
+        return features_df
@@ -0,0 +1,281 @@
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from trading_systems.data_utils.indicator_feature_workshop.technical_features import (
+    standard_indicators, volume_features, misc_features
+)
+
+
+class _FeatureDefinition:
+    """
+    The apply function of a feature together with a function resolving
+    the features it depends on from its parameters, and keyword args
+    that are always passed to the apply function, used to turn off the
+    recalculation of the dependencies inside of it.
+    """
+
+    def __init__(self, func, dependencies=None, fixed_kwargs=None):
+        self.__func = func
+        self.__dependencies = dependencies
+        self.__fixed_kwargs = fixed_kwargs if fixed_kwargs else {}
+        self.__parameters = [
+            param for param in list(inspect.signature(func).parameters.values())[1:]
+            if param.name not in self.__fixed_kwargs
+        ]
+
+    def bind(self, name, params):
+        params = dict(params)
+        arguments = {}
+        for param in self.__parameters:
+            if param.name in params:
+                value = params.pop(param.name)
+                arguments[param.name] = tuple(value) if isinstance(value, list) else value
+            elif param.default is inspect.Parameter.empty:
+                raise TypeError(f'{name} feature missing required parameter {param.name!r}')
+            else:
+                arguments[param.name] = param.default
+        if params:
+            raise TypeError(f'{name} feature got unexpected parameters {list(params)}')
+
+        return tuple(arguments.items())
+
+    def dependencies(self, params):
+        if self.__dependencies is None:
+            return []
+        return [Feature(name, **dep_params) for name, dep_params in self.__dependencies(params)]
+
+    def apply(self, df, params):
+        self.__func(df, **params, **self.__fixed_kwargs)
+
+
+def _atr_params(params, period_key='period_param'):
+    return {
+        'period_param': params[period_key],
+        'col_name_high': params['col_name_high'],
+        'col_name_low': params['col_name_low'],
+        'col_name_close': params['col_name_close'],
+        'use_prev_close': params['use_prev_close'],
+        'suffix': params['suffix']
+    }
+
+
+def _bollinger_dependencies(params):
+    periods = params['ma_period_param']
+    periods = [periods] if np.isscalar(periods) else periods
+    return [
+        ('sma', {'period_param': period, 'col_name': params['col_name'], 'suffix': params['suffix']})
+        for period in periods
+    ]
+
+
+_FEATURE_DEFINITIONS = {
+    'sma': _FeatureDefinition(standard_indicators.apply_sma),
+    'ema': _FeatureDefinition(standard_indicators.apply_ema),
+    'atr': _FeatureDefinition(standard_indicators.apply_atr),
+    'adr': _FeatureDefinition(
+        standard_indicators.apply_adr,
+        dependencies=lambda params: [('atr', _atr_params(params))],
+        fixed_kwargs={'func_apply_atr': False}
+    ),
+    'rsi': _FeatureDefinition(standard_indicators.apply_rsi),
+    'keltner_channels': _FeatureDefinition(
+        standard_indicators.apply_keltner_channels,
+        dependencies=lambda params: [
+            (
+                'ema',
+                {'period_param': params['ema_period_param'], 'col_name': params['col_name_high']}
+            ),
+            ('atr', _atr_params(params, period_key='atr_period_param'))
+        ],
+        fixed_kwargs={'func_apply_ema_atr': False}
+    ),
+    'bollinger_bands': _FeatureDefinition(
+        standard_indicators.apply_bollinger_bands,
+        dependencies=_bollinger_dependencies,
+        fixed_kwargs={'func_apply_sma': False}
+    ),
+    'comparative_relative_strength': _FeatureDefinition(
+        standard_indicators.apply_comparative_relative_strength
+    ),
+    'avg_volume': _FeatureDefinition(volume_features.apply_avg_volume),
+    'rvol': _FeatureDefinition(
+        volume_features.apply_rvol,
+        dependencies=lambda params: [
+            ('avg_volume', {'period_param': params['period_param'], 'col_name': params['col_name']})
+        ],
+        fixed_kwargs={'func_apply_avg_volume': False}
+    ),
+    'volume_balance': _FeatureDefinition(volume_features.apply_volume_balance),
+    'vwap': _FeatureDefinition(volume_features.apply_vwap),
+    'vwap_from_n_period_low': _FeatureDefinition(volume_features.apply_vwap_from_n_period_low),
+    'percent_period_return': _FeatureDefinition(misc_features.apply_percent_period_return),
+    'composite_momentum': _FeatureDefinition(misc_features.apply_composite_momentum),
+    'percent_rank': _FeatureDefinition(misc_features.apply_percent_rank),
+    'linreg': _FeatureDefinition(misc_features.apply_linreg),
+    'higher_high_higher_low': _FeatureDefinition(misc_features.apply_higher_high_higher_low),
+    'rolling_corr': _FeatureDefinition(misc_features.apply_rolling_corr),
+    'alpha_score': _FeatureDefinition(misc_features.apply_alpha_score),
+}
+
+
+def register_feature(name, func, dependencies=None, fixed_kwargs=None):
+    """
+    Registers an apply function so that it can be declared as a Feature.
+
+    Parameters
+    ----------
+    :param name:
+        'str' : The name of the feature.
+    :param func:
+        'function' : A function applying the feature to a DataFrame,
+        given as the first argument, in place.
+    :param dependencies:
+        Keyword arg 'None/function' : A function taking the dict of
+        parameters of the feature and returning a list of (name, params)
+        tuples of the features it depends on. Default value=None
+    :param fixed_kwargs:
+        Keyword arg 'None/dict' : Keyword args always passed to func,
+        e.g. to turn off its own calculation of the dependencies.
+        Default value=None
+    """
+
+    _FEATURE_DEFINITIONS[name] = _FeatureDefinition(
+        func, dependencies=dependencies, fixed_kwargs=fixed_kwargs
+    )
+
+
+class Feature:
+    """
+    A declared feature, identified by its name and the full set of
+    parameters of its apply function, default values included. Two
+    declarations resolving to the same parameters are equal, which is
+    what lets a FeaturePipeline calculate shared intermediates once.
+
+    Parameters
+    ----------
+    name : 'str'
+        The name of a registered feature, e.g. 'atr' or 'keltner_channels'.
+    params : 'kwargs'
+        Parameters of the apply function of the feature.
+    """
+
+    def __init__(self, name, **params):
+        if name not in _FEATURE_DEFINITIONS:
+            raise ValueError(f'unknown feature {name!r}')
+
+        self.__name = name
+        self.__definition = _FEATURE_DEFINITIONS[name]
+        self.__params = self.__definition.bind(name, params)
+
+    @property
+    def name(self):
+        return self.__name
+
+    @property
+    def params(self) -> dict:
+        return dict(self.__params)
+
+    @property
+    def key(self):
+        return self.__name, self.__params
+
+    @property
+    def dependencies(self) -> list['Feature']:
+        return self.__definition.dependencies(self.params)
+
+    def apply(self, df):
+        self.__definition.apply(df, self.params)
+
+    def __eq__(self, other):
+        return isinstance(other, Feature) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        params = ', '.join(f'{k}={v!r}' for k, v in self.__params)
+        return f'Feature({self.__name!r}, {params})'
+
+
+class FeaturePipeline:
+    """
+    Resolves a collection of declared features and their dependencies
+    into a dependency ordered list of unique features, and applies it
+    to DataFrames with every feature calculated once.
+
+    Features without a declared dependency on one another are applied
+    in the order they were declared, so a feature reading a column of
+    another feature, e.g. 'linreg' reading 'CRS', should be declared
+    after it. Features of the same kind with different parameters may
+    write to the same columns, e.g. 'ATR', and need different suffixes.
+
+    Parameters
+    ----------
+    features : 'list'
+        A collection of Feature objects.
+    """
+
+    def __init__(self, features: list[Feature]):
+        self.__features: list[Feature] = []
+        visited = set()
+
+        def resolve(feature: Feature):
+            if feature in visited:
+                return
+            visited.add(feature)
+            for dependency in feature.dependencies:
+                resolve(dependency)
+            self.__features.append(feature)
+
+        for feature in features:
+            resolve(feature)
+
+    @property
+    def features(self) -> list[Feature]:
+        return list(self.__features)
+
+    def __len__(self):
+        return len(self.__features)
+
+    def __call__(self, df):
+        """
+        Applies the features to a DataFrame in place.
+
+        Parameters
+        ----------
+        :param df:
+            'Pandas DataFrame' : Data to apply the features to.
+
+        :return:
+            'Pandas DataFrame' : The given DataFrame.
+        """
+
+        for feature in self.__features:
+            feature.apply(df)
+
+        return df
+
+    def apply_to_data_dict(self, data_dict: dict, num_workers=None) -> dict:
+        """
+        Applies the features to each DataFrame of a dict in place,
+        with the instruments processed in parallel.
+
+        Parameters
+        ----------
+        :param data_dict:
+            'dict' : A dict with instrument keys and Pandas DataFrames
+            as values.
+        :param num_workers:
+            Keyword arg 'None/int' : The max_workers argument passed
+            to ThreadPoolExecutor. Default value=None
+
+        :return:
+            'dict' : The given dict.
+        """
+
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(self, data_dict.values()))
+
+        return data_dict
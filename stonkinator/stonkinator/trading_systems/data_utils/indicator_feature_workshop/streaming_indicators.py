@@ -0,0 +1,813 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+
+
+class StreamingIndicator(ABC):
+    """
+    Base class of indicators that are updated one bar at a time in
+    constant time, for runs that only add the latest bar to a history
+    whose indicator values were calculated before.
+
+    The state of an indicator can be serialized with get_state and
+    restored with streaming_indicator_from_state. Running sums are
+    recalculated from their windows once per window length to keep
+    floating point drift bounded, which is still O(1) amortized.
+    """
+
+    @property
+    @abstractmethod
+    def value(self):
+        raise NotImplementedError("should contain a 'value' property")
+
+    @abstractmethod
+    def update(self, *args):
+        raise NotImplementedError('should implement update()')
+
+    @abstractmethod
+    def _get_state(self) -> dict:
+        raise NotImplementedError('should implement _get_state()')
+
+    @abstractmethod
+    def _set_state(self, state: dict):
+        raise NotImplementedError('should implement _set_state()')
+
+    def get_state(self) -> dict:
+        """
+        Returns the state of the indicator as a JSON serializable dict.
+
+        :return:
+            'dict'
+        """
+
+        return {'type': type(self).__name__, **self._get_state()}
+
+
+def _to_list(values):
+    return [float(x) for x in values]
+
+
+class StreamingSMA(StreamingIndicator):
+    """
+    Simple moving average, see apply_sma.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The moving average period.
+    """
+
+    def __init__(self, period_param):
+        self.__period = period_param
+        self.__window = deque(maxlen=period_param)
+        self.__updates = 0
+        self.__recalculate()
+
+    def __recalculate(self):
+        window = np.array(self.__window, dtype=float)
+        self.__sum = float(np.nansum(window))
+        self.__num_of_nans = int(np.isnan(window).sum())
+
+    @property
+    def value(self):
+        if len(self.__window) < self.__period or self.__num_of_nans:
+            return np.nan
+        return self.__sum / self.__period
+
+    def update(self, x):
+        x = float(x)
+        if len(self.__window) == self.__period:
+            removed = self.__window[0]
+            if np.isnan(removed):
+                self.__num_of_nans -= 1
+            else:
+                self.__sum -= removed
+        self.__window.append(x)
+        if np.isnan(x):
+            self.__num_of_nans += 1
+        else:
+            self.__sum += x
+        self.__updates += 1
+        if self.__updates % self.__period == 0:
+            self.__recalculate()
+        return self.value
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'window': _to_list(self.__window),
+            'updates': self.__updates
+        }
+
+    def _set_state(self, state):
+        self.__init__(state['period_param'])
+        self.__window.extend(state['window'])
+        self.__updates = state['updates']
+        self.__recalculate()
+
+
+def _ewm_update(mean, old_weight, x, alpha):
+    # One step of ewm(adjust=False).mean(), the weight of the previous
+    # mean decays on NaN values too, which are otherwise skipped
+    if np.isnan(mean):
+        return x, 1.0
+    old_weight *= 1 - alpha
+    if np.isnan(x):
+        return mean, old_weight
+    return (old_weight * mean + alpha * x) / (old_weight + alpha), 1.0
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Exponential moving average with alpha=2/(span+1), see apply_ema.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The span of the moving average.
+    """
+
+    def __init__(self, period_param):
+        self.__period = period_param
+        self.__ema = np.nan
+        self.__old_weight = 1.0
+
+    @property
+    def value(self):
+        return self.__ema
+
+    def update(self, x):
+        self.__ema, self.__old_weight = _ewm_update(
+            self.__ema, self.__old_weight, float(x), 2 / (self.__period + 1)
+        )
+        return self.__ema
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'ema': self.__ema,
+            'old_weight': self.__old_weight
+        }
+
+    def _set_state(self, state):
+        self.__period = state['period_param']
+        self.__ema = state['ema']
+        self.__old_weight = state.get('old_weight', 1.0)
+
+
+class StreamingATR(StreamingIndicator):
+    """
+    Average true range with Wilder smoothing, rounded to four decimals,
+    see apply_atr.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The ATR period.
+    use_prev_close : Keyword arg 'bool'
+        True to calculate the true range from the previous close,
+        see true_range. Default value=False
+    """
+
+    def __init__(self, period_param=14, use_prev_close=False):
+        self.__period = period_param
+        self.__use_prev_close = use_prev_close
+        self.__prev_close = None
+        self.__atr = np.nan
+        self.__old_weight = 1.0
+
+    @property
+    def value(self):
+        return round(self.__atr, 4)
+
+    def update(self, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        # NaN handling as in true_range, fmax ignores a missing previous
+        # close while maximum makes the range of a bar with a NaN NaN
+        if self.__use_prev_close:
+            ref_close = np.nan if self.__prev_close is None else self.__prev_close
+            tr = float(np.fmax(
+                high - low, np.fmax(abs(high - ref_close), abs(low - ref_close))
+            ))
+        elif self.__prev_close is None:
+            tr = np.nan
+        else:
+            tr = float(np.maximum(
+                high - low, np.maximum(abs(high - close), abs(low - close))
+            ))
+        self.__prev_close = close
+
+        self.__atr, self.__old_weight = _ewm_update(
+            self.__atr, self.__old_weight, tr, 1 / self.__period
+        )
+        return self.value
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'use_prev_close': self.__use_prev_close,
+            'prev_close': self.__prev_close, 'atr': self.__atr,
+            'old_weight': self.__old_weight
+        }
+
+    def _set_state(self, state):
+        self.__period = state['period_param']
+        self.__use_prev_close = state['use_prev_close']
+        self.__prev_close = state['prev_close']
+        self.__atr = state['atr']
+        self.__old_weight = state.get('old_weight', 1.0)
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    RSI with Wilder smoothing seeded with the average gain and loss of
+    the first period_param price changes, see apply_rsi.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The RSI period.
+    """
+
+    def __init__(self, period_param=14):
+        self.__period = period_param
+        self.__num_of_changes = 0
+        self.__prev_x = None
+        self.__avg_gain = 0.0
+        self.__avg_loss = 0.0
+        self.__rsi = np.nan
+
+    @property
+    def value(self):
+        return self.__rsi
+
+    def update(self, x):
+        x = float(x)
+        if self.__prev_x is None:
+            self.__prev_x = x
+            return self.__rsi
+
+        delta = x - self.__prev_x
+        self.__prev_x = x
+        self.__num_of_changes += 1
+        n = self.__period
+
+        if self.__num_of_changes <= n:
+            # Sum of the first n changes, averaged on the n:th change
+            self.__avg_gain += max(delta, 0)
+            self.__avg_loss += -min(delta, 0)
+            if self.__num_of_changes == n:
+                self.__avg_gain /= n
+                self.__avg_loss /= n
+            return self.__rsi
+
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.__avg_gain = (1 - 1 / n) * self.__avg_gain + gain / n
+        self.__avg_loss = (1 - 1 / n) * self.__avg_loss + loss / n
+        if self.__avg_loss != 0:
+            self.__rsi = round(100 - (100 / (1 + self.__avg_gain / self.__avg_loss)), 4)
+        else:
+            self.__rsi = 100.0
+        return self.__rsi
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'num_of_changes': self.__num_of_changes,
+            'prev_x': self.__prev_x, 'avg_gain': self.__avg_gain,
+            'avg_loss': self.__avg_loss, 'rsi': self.__rsi
+        }
+
+    def _set_state(self, state):
+        self.__period = state['period_param']
+        self.__num_of_changes = state['num_of_changes']
+        self.__prev_x = state['prev_x']
+        self.__avg_gain = state['avg_gain']
+        self.__avg_loss = state['avg_loss']
+        self.__rsi = state['rsi']
+
+
+class StreamingBollingerBands(StreamingIndicator):
+    """
+    Rolling population standard deviation and Bollinger bands, see
+    apply_bollinger_bands. The sums are kept relative to the first
+    value of the window to avoid cancellation at high price levels.
+    The value is the standard deviation rounded to four decimals, as
+    in the 'STD_' column, and the bands are given by upper and lower.
+
+    Parameters
+    ----------
+    ma_period_param : 'int'
+        The moving average period.
+    sd_multiplier : Keyword arg 'int/float'
+        The number of standard deviations between the moving average
+        and the bands. Default value=2
+    """
+
+    def __init__(self, ma_period_param=20, sd_multiplier=2):
+        self.__period = ma_period_param
+        self.__sd_multiplier = sd_multiplier
+        self.__window = deque(maxlen=ma_period_param)
+        self.__updates = 0
+        self.__recalculate()
+
+    def __recalculate(self):
+        window = np.array(self.__window, dtype=float)
+        valid_values = window[~np.isnan(window)]
+        self.__shift = float(valid_values[0]) if len(valid_values) else 0.0
+        deviations = valid_values - self.__shift
+        self.__sum = float(np.sum(deviations))
+        self.__sum_sq = float(np.sum(deviations ** 2))
+        self.__num_of_nans = len(window) - len(valid_values)
+
+    @property
+    def sma(self):
+        if len(self.__window) < self.__period or self.__num_of_nans:
+            return np.nan
+        return self.__shift + self.__sum / self.__period
+
+    @property
+    def std(self):
+        # The bands start one bar after the first full window
+        if self.__updates <= self.__period + 1 or self.__num_of_nans:
+            return np.nan
+        mean = self.__sum / self.__period
+        return float(np.sqrt(max(self.__sum_sq / self.__period - mean ** 2, 0.0)))
+
+    @property
+    def value(self):
+        return round(self.std, 4)
+
+    @property
+    def upper(self):
+        return self.sma + self.std * self.__sd_multiplier
+
+    @property
+    def lower(self):
+        return self.sma - self.std * self.__sd_multiplier
+
+    def update(self, x):
+        x = float(x)
+        if len(self.__window) == self.__period:
+            removed = self.__window[0] - self.__shift
+            if np.isnan(removed):
+                self.__num_of_nans -= 1
+            else:
+                self.__sum -= removed
+                self.__sum_sq -= removed ** 2
+        self.__window.append(x)
+        if np.isnan(x):
+            self.__num_of_nans += 1
+        else:
+            self.__sum += x - self.__shift
+            self.__sum_sq += (x - self.__shift) ** 2
+        self.__updates += 1
+        if self.__updates % self.__period == 0:
+            self.__recalculate()
+        return self.value
+
+    def _get_state(self):
+        return {
+            'ma_period_param': self.__period, 'sd_multiplier': self.__sd_multiplier,
+            'window': _to_list(self.__window), 'updates': self.__updates
+        }
+
+    def _set_state(self, state):
+        self.__init__(state['ma_period_param'], sd_multiplier=state['sd_multiplier'])
+        self.__window.extend(state['window'])
+        self.__updates = state['updates']
+        self.__recalculate()
+
+
+class StreamingRollingMinMax(StreamingIndicator):
+    """
+    Rolling min and max over period_param values, including the latest
+    value, kept with monotonic deques in amortized O(1) per update. The
+    value is the max, the min is given by min. As with rolling(...).max()
+    both are NaN while the window contains a NaN.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The window length.
+    """
+
+    def __init__(self, period_param):
+        self.__period = period_param
+        self.__updates = 0
+        self.__last_nan_index = None
+        # (index, value) pairs with decreasing and increasing values
+        self.__max_deque = deque()
+        self.__min_deque = deque()
+
+    def __is_defined(self):
+        return self.__updates >= self.__period and (
+            self.__last_nan_index is None
+            or self.__last_nan_index < self.__updates - self.__period
+        )
+
+    @property
+    def max(self):
+        if not self.__is_defined():
+            return np.nan
+        return self.__max_deque[0][1]
+
+    @property
+    def min(self):
+        if not self.__is_defined():
+            return np.nan
+        return self.__min_deque[0][1]
+
+    @property
+    def value(self):
+        return self.max
+
+    def update(self, x):
+        x = float(x)
+        index = self.__updates
+        if np.isnan(x):
+            self.__last_nan_index = index
+        else:
+            while self.__max_deque and self.__max_deque[-1][1] <= x:
+                self.__max_deque.pop()
+            self.__max_deque.append((index, x))
+            while self.__min_deque and self.__min_deque[-1][1] >= x:
+                self.__min_deque.pop()
+            self.__min_deque.append((index, x))
+
+        for window_deque in (self.__max_deque, self.__min_deque):
+            if window_deque and window_deque[0][0] <= index - self.__period:
+                window_deque.popleft()
+        self.__updates += 1
+        return self.value
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'updates': self.__updates,
+            'last_nan_index': self.__last_nan_index,
+            'max_deque': [list(pair) for pair in self.__max_deque],
+            'min_deque': [list(pair) for pair in self.__min_deque]
+        }
+
+    def _set_state(self, state):
+        self.__period = state['period_param']
+        self.__updates = state['updates']
+        self.__last_nan_index = state.get('last_nan_index')
+        self.__max_deque = deque(tuple(pair) for pair in state['max_deque'])
+        self.__min_deque = deque(tuple(pair) for pair in state['min_deque'])
+
+
+class StreamingVWAP(StreamingIndicator):
+    """
+    VWAP of the period_param bars preceding the latest bar, see
+    apply_vwap.
+
+    Parameters
+    ----------
+    period_param : 'int'
+        The number of bars of the VWAP.
+    """
+
+    def __init__(self, period_param):
+        self.__period = period_param
+        self.__window = deque(maxlen=period_param)
+        self.__updates = 0
+        self.__recalculate()
+        self.__vwap = np.nan
+
+    def __recalculate(self):
+        price_volumes = [(p * v, v) for p, v in self.__window]
+        self.__price_volume = float(sum(pv for pv, _ in price_volumes if not np.isnan(pv)))
+        self.__volume = float(sum(v for pv, v in price_volumes if not np.isnan(pv)))
+        self.__num_of_nans = sum(1 for pv, _ in price_volumes if np.isnan(pv))
+
+    @property
+    def value(self):
+        return self.__vwap
+
+    def update(self, price, volume):
+        if len(self.__window) == self.__period:
+            if self.__num_of_nans:
+                self.__vwap = np.nan
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    self.__vwap = float(np.float64(self.__price_volume) / self.__volume)
+            removed_price, removed_volume = self.__window[0]
+            if np.isnan(removed_price * removed_volume):
+                self.__num_of_nans -= 1
+            else:
+                self.__price_volume -= removed_price * removed_volume
+                self.__volume -= removed_volume
+        price, volume = float(price), float(volume)
+        self.__window.append((price, volume))
+        if np.isnan(price * volume):
+            self.__num_of_nans += 1
+        else:
+            self.__price_volume += price * volume
+            self.__volume += volume
+        self.__updates += 1
+        if self.__updates % self.__period == 0:
+            self.__recalculate()
+        return self.__vwap
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period, 'updates': self.__updates,
+            'window': [list(pair) for pair in self.__window], 'vwap': self.__vwap
+        }
+
+    def _set_state(self, state):
+        self.__init__(state['period_param'])
+        self.__window.extend(tuple(pair) for pair in state['window'])
+        self.__updates = state['updates']
+        self.__vwap = state['vwap']
+        self.__recalculate()
+
+
+class StreamingADLine(StreamingIndicator):
+    """
+    Advance/decline line of a universe of instruments, updated with the
+    prices of all instruments of a bar, see apply_ad_line.
+    """
+
+    def __init__(self):
+        self.__prev_prices = None
+        self.__ad = 0
+
+    @property
+    def value(self):
+        return self.__ad
+
+    def update(self, prices):
+        prices = np.asarray(prices, dtype=float)
+        if self.__prev_prices is not None:
+            self.__ad += int(
+                (prices > self.__prev_prices).sum() - (prices < self.__prev_prices).sum()
+            )
+        self.__prev_prices = prices
+        return self.__ad
+
+    def _get_state(self):
+        return {
+            'prev_prices': None if self.__prev_prices is None else _to_list(self.__prev_prices),
+            'ad': self.__ad
+        }
+
+    def _set_state(self, state):
+        self.__prev_prices = None if state['prev_prices'] is None \
+            else np.array(state['prev_prices'], dtype=float)
+        self.__ad = state['ad']
+
+
+class StreamingHighsVsLows(StreamingIndicator):
+    """
+    Number of instruments at or above their price of period_param bars
+    ago less the number at or below it, see apply_highs_v_lows.
+
+    Parameters
+    ----------
+    period_param : Keyword arg 'int'
+        The number of bars to look back. Default value=63
+    """
+
+    def __init__(self, period_param=63):
+        self.__period = period_param
+        self.__window = deque(maxlen=period_param + 1)
+        self.__highs_v_lows = 0
+
+    @property
+    def value(self):
+        return self.__highs_v_lows
+
+    def update(self, prices):
+        self.__window.append(np.asarray(prices, dtype=float))
+        if len(self.__window) > self.__period:
+            current, past = self.__window[-1], self.__window[0]
+            self.__highs_v_lows = int((current >= past).sum() - (current <= past).sum())
+        return self.__highs_v_lows
+
+    def _get_state(self):
+        return {
+            'period_param': self.__period,
+            'window': [_to_list(prices) for prices in self.__window],
+            'highs_v_lows': self.__highs_v_lows
+        }
+
+    def _set_state(self, state):
+        self.__init__(state['period_param'])
+        self.__window.extend(np.array(prices, dtype=float) for prices in state['window'])
+        self.__highs_v_lows = state['highs_v_lows']
+
+
+class StreamingPctOverSMA(StreamingIndicator):
+    """
+    Percentage of instruments with a price over their SMA, see
+    apply_pct_over_n_sma. The SMAs of all instruments are kept as
+    arrays, so an update costs O(1) per instrument.
+
+    Parameters
+    ----------
+    sma_period_param : 'int'
+        The SMA period.
+    """
+
+    def __init__(self, sma_period_param):
+        self.__period = sma_period_param
+        self.__window = deque(maxlen=sma_period_param)
+        self.__updates = 0
+        self.__pct = np.nan
+        self.__recalculate()
+
+    def __recalculate(self):
+        # Sums and counts of the non-NaN prices of each instrument, the
+        # SMA of an instrument is defined once it has a full window
+        if self.__window:
+            window = np.array(self.__window, dtype=float)
+            self.__sum = np.nansum(window, axis=0)
+            self.__count = (~np.isnan(window)).sum(axis=0)
+        else:
+            self.__sum, self.__count = 0.0, 0
+
+    @property
+    def value(self):
+        return self.__pct
+
+    def update(self, prices):
+        prices = np.asarray(prices, dtype=float)
+        valid = ~np.isnan(prices)
+        if len(self.__window) == self.__period:
+            removed = self.__window[0]
+            self.__sum = self.__sum - np.nan_to_num(removed)
+            self.__count = self.__count - ~np.isnan(removed)
+        self.__window.append(prices)
+        self.__sum = self.__sum + np.nan_to_num(prices)
+        self.__count = self.__count + valid
+        self.__updates += 1
+        if self.__updates % self.__period == 0:
+            self.__recalculate()
+
+        if not valid.any():
+            self.__pct = 0
+        else:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sma = np.where(self.__count == self.__period, self.__sum / self.__period, np.nan)
+            self.__pct = (sma < prices).sum() / valid.sum() * 100
+        return self.__pct
+
+    def _get_state(self):
+        return {
+            'sma_period_param': self.__period,
+            'window': [_to_list(prices) for prices in self.__window],
+            'updates': self.__updates, 'pct': self.__pct
+        }
+
+    def _set_state(self, state):
+        self.__init__(state['sma_period_param'])
+        self.__window.extend(np.array(prices, dtype=float) for prices in state['window'])
+        self.__updates = state['updates']
+        self.__pct = state['pct']
+        self.__recalculate()
+
+
+_STREAMING_INDICATORS = {
+    cls.__name__: cls for cls in (
+        StreamingSMA, StreamingEMA, StreamingATR, StreamingRSI,
+        StreamingBollingerBands, StreamingRollingMinMax, StreamingVWAP,
+        StreamingADLine, StreamingHighsVsLows, StreamingPctOverSMA
+    )
+}
+
+
+def streaming_indicator_from_state(state: dict) -> StreamingIndicator:
+    """
+    Restores an indicator from a state returned by its get_state method.
+
+    Parameters
+    ----------
+    :param state:
+        'dict' : The state of the indicator.
+
+    :return:
+        'StreamingIndicator'
+    """
+
+    state = dict(state)
+    cls = _STREAMING_INDICATORS[state.pop('type')]
+    indicator = cls.__new__(cls)
+    indicator._set_state(state)
+    return indicator
+
+
+class StreamingIndicatorStateStore:
+    """
+    Persists the states of the streaming indicators of each trading
+    system and instrument as JSON files in a local directory, one file
+    per system and instrument.
+
+    Parameters
+    ----------
+    dir_path : 'str'
+        The directory to keep the state files in.
+    """
+
+    def __init__(self, dir_path):
+        self.__dir_path = dir_path
+
+    def _file_path(self, system_name, instrument_id):
+        return os.path.join(self.__dir_path, system_name, f'{instrument_id}.json')
+
+    def save(self, system_name, instrument_id, indicators: dict[str, StreamingIndicator]):
+        """
+        Saves the states of a dict of indicators.
+
+        Parameters
+        ----------
+        :param system_name:
+            'str' : The name of the trading system.
+        :param instrument_id:
+            'str' : The id of the instrument.
+        :param indicators:
+            'dict' : StreamingIndicator objects keyed by feature name.
+        """
+
+        file_path = self._file_path(system_name, instrument_id)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = f'{file_path}.tmp'
+        with open(tmp_file_path, 'w') as file:
+            json.dump({name: ind.get_state() for name, ind in indicators.items()}, file)
+        os.replace(tmp_file_path, file_path)
+
+    def load(self, system_name, instrument_id) -> dict[str, StreamingIndicator] | None:
+        """
+        Loads the indicators of a system and instrument.
+
+        Parameters
+        ----------
+        :param system_name:
+            'str' : The name of the trading system.
+        :param instrument_id:
+            'str' : The id of the instrument.
+
+        :return:
+            'dict/None' : StreamingIndicator objects keyed by feature name,
+            None if no state has been saved.
+        """
+
+        file_path = self._file_path(system_name, instrument_id)
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path) as file:
+            states = json.load(file)
+        return {name: streaming_indicator_from_state(state) for name, state in states.items()}
+
+
+def check_streaming_consistency(
+    indicator: StreamingIndicator, df, input_cols, batch_func, batch_col,
+    value_attr='value', row_as_array=False, rtol=1e-7, atol=1e-6, **batch_kwargs
+):
+    """
+    Feeds the rows of a DataFrame to a streaming indicator one at a time
+    and compares the values with those of the batch apply function.
+
+    Parameters
+    ----------
+    :param indicator:
+        'StreamingIndicator' : A newly created indicator.
+    :param df:
+        'Pandas DataFrame' : Price data.
+    :param input_cols:
+        'list' : The columns passed to the update method of the
+        indicator, in order.
+    :param batch_func:
+        'function' : The apply function of the batch implementation.
+    :param batch_col:
+        'str' : The name of the column written by batch_func.
+    :param value_attr:
+        Keyword arg 'str' : The attribute of the indicator to compare.
+        Default value='value'
+    :param row_as_array:
+        Keyword arg 'bool' : True to pass each row to update as one
+        array, as with the breadth indicators. Default value=False
+    :param rtol:
+        Keyword arg 'float' : Relative tolerance. Default value=1e-7
+    :param atol:
+        Keyword arg 'float' : Absolute tolerance. Default value=1e-6
+    :param batch_kwargs:
+        'kwargs' : Keyword args passed to batch_func.
+
+    :return:
+        'bool'
+    """
+
+    streaming_values = np.empty(len(df))
+    for i, row in enumerate(df[input_cols].to_numpy(dtype=float)):
+        if row_as_array:
+            indicator.update(row)
+        else:
+            indicator.update(*row)
+        streaming_values[i] = getattr(indicator, value_attr)
+
+    batch_df = df.copy()
+    batch_func(batch_df, **batch_kwargs)
+    batch_values = batch_df[batch_col].to_numpy(dtype=float)
+    return bool(np.allclose(streaming_values, batch_values, rtol=rtol, atol=atol, equal_nan=True))
@@ -1,12 +1,38 @@
 import numpy as np
 import pandas as pd
 
-from trading_systems.data_utils.indicator_feature_workshop.technical_features.standard_indicators \
-    import apply_sma
+
+def build_wide_panel(dfs, col_name='close', how='outer'):
+    """
+    Builds a wide DataFrame with one '{col_name}_{ticker}' column per
+    instrument from a dict of per-instrument DataFrames, aligned on
+    their indexes. This is the layout the breadth indicators of this
+    module are calculated from.
+    :param dfs: Dict with tickers as keys and Pandas DataFrame objects as values
+    :param col_name: Name of the column to collect from each DataFrame
+    :param how: How to join the indexes of the DataFrames, 'outer' or 'inner'
+    """
+
+    return pd.concat(
+        {f'{col_name}_{ticker}': df[col_name] for ticker, df in dfs.items()},
+        axis=1, join=how
+    ).sort_index()
+
+
+def get_panel_values(df, ticker_list, col_name='close'):
+    """
+    Returns the '{col_name}_{ticker}' columns of a wide DataFrame as a
+    2D float array of shape (time, instruments).
+    :param df: Pandas DataFrame object
+    :param ticker_list: List of tickers which data is contained in the DataFrame
+    :param col_name: Name of the column prefix of the instruments
+    """
+
+    return df[[f'{col_name}_{ticker}' for ticker in ticker_list]].to_numpy(dtype=float)
 
 
 def apply_pct_over_n_sma(
-    df, sma_period_param, ticker_list, col_name='close', 
+    df, sma_period_param, ticker_list, col_name='close',
     func_apply_sma=False, suffix=''
 ):
     """
@@ -15,32 +41,27 @@ def apply_pct_over_n_sma(
     :param sma_period_param: Simple Moving Average period parameter
     :param ticker_list: List of tickers which data is contained in the DataFrame
     :param col_name: Name of the column to calculate SMA on
-    :param func_apply_sma: If true the SMA column will be applied inside the function. 
+    :param func_apply_sma: If true the SMA column will be applied inside the function.
         If SMA column has already been applied leave this kwarg as False.
     """
 
-    pct_over_sma_list = []
+    prices = get_panel_values(df, ticker_list, col_name=col_name)
+    sma_cols = [f'SMA_{str(sma_period_param)}_{ticker}' for ticker in ticker_list]
 
     if func_apply_sma:
-        for ticker in ticker_list:
-            apply_sma(
-                df, sma_period_param, col_name=f'{col_name}_{ticker}', 
-                suffix=f'_{ticker}'
-            )
-
-    for index, row in df.iterrows():
-        np.seterr(divide='ignore', invalid='ignore')
-        over_sma_list = [
-            row[f'SMA_{str(sma_period_param)}_{ticker}'] < row[f'{col_name}_{ticker}'] 
-            for ticker in ticker_list if not np.isnan(row[f'{col_name}_{ticker}'])
-        ]
-                         
-        if len(over_sma_list) < 1:
-            pct_over_sma_list.append(0)
-        else:
-            pct_over_sma_list.append(sum(over_sma_list) / len(over_sma_list) * 100)
-
-    df[f'%_over_SMA_{sma_period_param}{suffix}'] = pct_over_sma_list
+        smas = pd.DataFrame(prices, index=df.index).rolling(sma_period_param).mean()
+        df[sma_cols] = smas.to_numpy()
+
+    smas = df[sma_cols].to_numpy(dtype=float)
+    valid = ~np.isnan(prices)
+    num_of_valid = valid.sum(axis=1)
+    # Comparisons with NaN are False, so missing SMA values count as not over
+    num_over_sma = (smas < prices).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df[f'%_over_SMA_{sma_period_param}{suffix}'] = np.where(
+            num_of_valid > 0, num_over_sma / num_of_valid * 100, 0
+        )
 
 
 def apply_ad_line(df, ticker_list, col_name='close', suffix=''):
@@ -51,40 +72,34 @@ def apply_ad_line(df, ticker_list, col_name='close', suffix=''):
     :param col_name: Name of DataFrame column to calculate advancers/decliners on.
     """
 
-    ad = []
-
-    for index, row in enumerate(df.iterrows()):
-        if index < 1:
-            ad.append(0)
-            continue
-        else:
-            advancers = [
-                df[f'{col_name}_{ticker}'].iloc[index] > df[f'{col_name}_{ticker}'].iloc[index-1]
-                for ticker in ticker_list
-            ]
-            decliners = [
-                df[f'{col_name}_{ticker}'].iloc[index] < df[f'{col_name}_{ticker}'].iloc[index-1]
-                for ticker in ticker_list
-            ]
-            ad.append(ad[-1] + (sum(advancers) - sum(decliners)))
+    prices = get_panel_values(df, ticker_list, col_name=col_name)
+
+    ad = np.zeros(len(prices), dtype=int)
+    if len(prices) > 1:
+        advancers = (prices[1:] > prices[:-1]).sum(axis=1)
+        decliners = (prices[1:] < prices[:-1]).sum(axis=1)
+        ad[1:] = np.cumsum(advancers - decliners)
 
     df[f'AD_line{suffix}'] = ad
 
 
 def apply_highs_v_lows(df, ticker_list, period_param=63, col_name='close', suffix=''):
+    """
+    Apply the number of instruments at or above their price of 'period_param'
+    periods ago less the number at or below it to given Pandas DataFrame.
+    :param df: Pandas DataFrame object
+    :param ticker_list: List of tickers which data the indicator will be calculated from.
+    :param period_param: Number of periods to look back
+    :param col_name: Name of DataFrame column to compare
+    """
 
-    highs_v_lows = []
+    prices = get_panel_values(df, ticker_list, col_name=col_name)
 
-    for index, row in enumerate(df.iterrows()):
-        if index < period_param:
-            highs_v_lows.append(0)
-            continue
-        else:
-            new_highs = [df[f'{col_name}_{ticker}'].iloc[index] >= df[f'{col_name}_{ticker}'].iloc[index-period_param]
-                         for ticker in ticker_list]
-            new_lows = [df[f'{col_name}_{ticker}'].iloc[index] <= df[f'{col_name}_{ticker}'].iloc[index-period_param]
-                        for ticker in ticker_list]
-            highs_v_lows.append(sum(new_highs) - sum(new_lows))
+    highs_v_lows = np.zeros(len(prices), dtype=int)
+    if len(prices) > period_param:
+        current, past = prices[period_param:], prices[:-period_param]
+        highs_v_lows[period_param:] = \
+            (current >= past).sum(axis=1) - (current <= past).sum(axis=1)
 
     df[f'New_{period_param}_period_highs_v_lows{suffix}'] = highs_v_lows
 
@@ -101,15 +116,9 @@ def apply_periods_above_v_below_breadth_indicator_value(
     :param col_name: Name of the column to calculate the periods above vs below values on
     """
 
-    periods_above_list = []
-
-    for index, row in enumerate(df.iterrows()):
-        if index < period_param:
-            periods_above_list.append(np.nan)
-            continue
-        else:
-            periods_above = df[col_name].iloc[index-period_param:index][df.iloc[index-period_param:index][col_name] >=
-                                                                        indicator_value].count()
-            periods_above_list.append((periods_above / period_param) * 100)
+    # The count of the window preceding each period, excluding the period itself
+    periods_above = (df[col_name] >= indicator_value).astype(float) \
+        .rolling(period_param).sum().shift(1)
 
-    df[f'Periods_above_{col_name}/{indicator_value}_{period_param}{suffix}'] = periods_above_list
+    df[f'Periods_above_{col_name}/{indicator_value}_{period_param}{suffix}'] = \
+        (periods_above / period_param) * 100
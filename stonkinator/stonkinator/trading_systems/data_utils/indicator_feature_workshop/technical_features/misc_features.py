@@ -17,51 +17,52 @@ def apply_composite_momentum(df, periods=(21, 42, 63), col_name='close', suffix=
 
 
 def apply_percent_rank(df, period_param, col_name='close', suffix=''):
-    pct_rank = []
-    for i in range(len(df)):
-        if i < period_param:
-            pct_rank.append(np.nan)
-            continue
-        else:
-            df_col_list = df[col_name].iloc[i-period_param:i].to_list()
-            df_col_list.append(df[col_name].iloc[i])
-            df_col_list.sort()
-            try:
-                period_rank = df_col_list.index(df[col_name].iloc[i])
-            except ValueError as e:
-                print(f'ValueError {e}')
-                period_rank = 0
-            pct_rank.append(period_rank / period_param)
+    values = df[col_name].to_numpy(dtype=float)
+
+    pct_rank = np.full(len(values), np.nan)
+    if len(values) > period_param:
+        # Each window holds the 'period_param' preceding values and the
+        # current value last, the rank is the number of preceding values
+        # below the current value
+        windows = np.lib.stride_tricks.sliding_window_view(values, period_param + 1)
+        pct_rank[period_param:] = \
+            (windows[:, :-1] < windows[:, -1:]).sum(axis=1) / period_param
 
     df[f'%_rank{suffix}'] = pct_rank
 
 
 def apply_linreg(df, period_param, col_name_1='CRS', col_name_2='close', suffix=''):
-    linreg = []
-    for index, row in enumerate(df.itertuples()):
-        if index < period_param:
-            linreg.append(np.nan)
-        else:
-            crs_close_fit = np.polyfit(
-                df[col_name_1].iloc[index-period_param:index],
-                df[col_name_2].iloc[index-period_param:index], 1
-            )
-            linreg.append(crs_close_fit[0])
+    x = df[col_name_1].to_numpy(dtype=float)
+    y = df[col_name_2].to_numpy(dtype=float)
+
+    linreg = np.full(len(x), np.nan)
+    if len(x) > period_param:
+        # The OLS slope of col_name_2 on col_name_1 over the 'period_param'
+        # preceding periods, with x and y centred on the mean of each
+        # window, which keeps the sums stable for low-variance x
+        x_windows = np.lib.stride_tricks.sliding_window_view(x[:-1], period_param)
+        y_windows = np.lib.stride_tricks.sliding_window_view(y[:-1], period_param)
+        x_centred = x_windows - x_windows.mean(axis=1, keepdims=True)
+        y_centred = y_windows - y_windows.mean(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            linreg[period_param:] = \
+                (x_centred * y_centred).sum(axis=1) / (x_centred ** 2).sum(axis=1)
 
     df[f'Linreg{suffix}'] = linreg
 
 
 def apply_higher_high_higher_low(df, f_period=20, c_period=10, col_name='close', suffix=''):
-    higher_high_higher_low = []
-    for index, row in enumerate(df.itertuples()):
-        if index < f_period:
-            higher_high_higher_low.append(np.nan)
-        else:
-            higher_high = max(df[col_name].iloc[index-c_period:index]) > \
-                max(df[col_name].iloc[index-f_period:index-c_period])
-            lower_low = min(df[col_name].iloc[index-c_period:index]) > \
-                min(df[col_name].iloc[index-f_period:index-c_period])
-            higher_high_higher_low.append(higher_high and lower_low)
+    values = df[col_name]
+    # Highs and lows of the 'c_period' preceding periods and of the
+    # 'f_period' - 'c_period' periods before those
+    recent_max = values.rolling(c_period).max().shift(1)
+    recent_min = values.rolling(c_period).min().shift(1)
+    earlier_max = values.rolling(f_period - c_period).max().shift(c_period + 1)
+    earlier_min = values.rolling(f_period - c_period).min().shift(c_period + 1)
+
+    higher_high_higher_low = ((recent_max > earlier_max) & (recent_min > earlier_min)) \
+        .astype(object)
+    higher_high_higher_low.iloc[:f_period] = np.nan
 
     df[f'Higher_high_higher_low{suffix}'] = higher_high_higher_low
 
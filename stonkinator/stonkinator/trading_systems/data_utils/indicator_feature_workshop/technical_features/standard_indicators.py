@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 
 
 def apply_sma(df, period_param, col_name='close', suffix=''):
@@ -9,22 +10,57 @@ def apply_ema(df, period_param, col_name='close', suffix=''):
     df[f'EMA_{period_param}{suffix}'] = df[col_name].ewm(span=period_param, adjust=False).mean()
 
 
+def true_range(high, low, close, use_prev_close=False):
+    """
+    Calculates the true range of each bar.
+
+    Parameters
+    ----------
+    :param high:
+        'numpy array/pandas Series' : High prices.
+    :param low:
+        'numpy array/pandas Series' : Low prices.
+    :param close:
+        'numpy array/pandas Series' : Close prices.
+    :param use_prev_close:
+        Keyword arg 'bool' : True to compare high and low against the
+        previous close, giving the standard true range with the high
+        to low range of the first bar as its first value. False compares
+        against the close of the same bar and leaves the first value
+        as NaN, which is how the range has been calculated historically.
+        Default value=False
+
+    :return:
+        'numpy array'
+    """
+
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+
+    if use_prev_close:
+        ref_close = np.empty_like(close)
+        ref_close[0] = np.nan
+        ref_close[1:] = close[:-1]
+        # fmax ignores the missing previous close of the first bar
+        tr = np.fmax(
+            high - low, np.fmax(np.abs(high - ref_close), np.abs(low - ref_close))
+        )
+    else:
+        tr = np.maximum(high - low, np.maximum(np.abs(high - close), np.abs(low - close)))
+        tr[:1] = np.nan
+
+    return tr
+
+
 def apply_atr(
     df, period_param=14, col_name_high='high', col_name_low='low', col_name_close='close', 
-    suffix=''
+    use_prev_close=False, suffix=''
 ):
-    tr = []
-    for i, r in df.iterrows():
-        if i == df.index[0]:
-            tr.append(np.nan)
-            continue
-        else:
-            atr1 = r[col_name_high] - r[col_name_low]
-            atr2 = abs(r[col_name_high] - r[col_name_close])
-            atr3 = abs(r[col_name_low] - r[col_name_close])
-            tr.append(max(atr1, atr2, atr3))
-
-    df[f'TR{suffix}'] = tr
+    df[f'TR{suffix}'] = true_range(
+        df[col_name_high], df[col_name_low], df[col_name_close], 
+        use_prev_close=use_prev_close
+    )
     df[f'ATR{suffix}'] = round(
         df[f'TR{suffix}'].ewm(alpha=1 / period_param, adjust=False).mean(), 4
     )
@@ -32,107 +68,149 @@ def apply_atr(
 
 def apply_adr(
     df, period_param=14, col_name_high='high', col_name_low='low', col_name_close='close', 
-    func_apply_atr=False, suffix=''
+    func_apply_atr=False, use_prev_close=False, suffix=''
 ):
     if func_apply_atr:
         apply_atr(
             df, period_param=period_param, col_name_high=col_name_high, 
             col_name_low=col_name_low, col_name_close=col_name_close,
-            suffix=suffix
+            use_prev_close=use_prev_close, suffix=suffix
         )
 
-    df[f'ADR{suffix}'] = (df['ATR'] / df[col_name_close]) * 100
+    df[f'ADR{suffix}'] = (df[f'ATR{suffix}'] / df[col_name_close]) * 100
 
 
-def apply_rsi(df, period_param=14, col_name='close', suffix=''):
-    def calc_rsi(array, deltas, avg_gain, avg_loss, n):
-        # Use Wilder smoothing method
-        up = lambda x:  x if x > 0 else 0
-        down = lambda x: -x if x < 0 else 0
-        i = n+1
-        for d in deltas[n+1:]:
-            avg_gain = ((avg_gain * (n-1)) + up(d)) / n
-            avg_loss = ((avg_loss * (n-1)) + down(d)) / n
-            if avg_loss != 0:
-                rs = avg_gain / avg_loss
-                array[i] = round(100 - (100 / (1 + rs)), 4)
-            else:
-                array[i] = 100
-            i += 1
-
-        return array
-
-    def get_rsi(array, n):
-        deltas = np.append([0], np.diff(array))
+def _wilder_average(values, seed, period_param):
+    """
+    Wilder smoothing of values, starting from seed, as an exponential
+    moving average with alpha=1/period_param.
+    """
 
-        avg_gain = np.sum(deltas[1:n+1].clip(min=0)) / n
-        avg_loss = -np.sum(deltas[1:n+1].clip(max=0)) / n
+    return pd.Series(np.concatenate(([seed], values))).ewm(
+        alpha=1 / period_param, adjust=False
+    ).mean().to_numpy()[1:]
 
-        array = np.empty(deltas.shape[0])
-        array.fill(np.nan)
 
-        array = calc_rsi(array, deltas, avg_gain, avg_loss, n)
-        return array
+def apply_rsi(df, period_param=14, col_name='close', suffix=''):
+    """
+    Applies the RSI, using Wilder smoothing of the average gain and
+    loss seeded with their simple averages over the first period_param
+    price changes, to one or many periods. The price changes are only
+    calculated once regardless of the number of periods.
+
+    Parameters
+    ----------
+    :param df:
+        'pandas DataFrame' : Data to apply the RSI to.
+    :param period_param:
+        Keyword arg 'int/list' : A period, or a collection of periods,
+        to calculate the RSI for. Default value=14
+    :param col_name:
+        Keyword arg 'str' : The column to calculate the RSI from.
+        Default value='close'
+    :param suffix:
+        Keyword arg 'str' : A suffix to add to the column names.
+        Default value=''
+    """
+
+    periods = [period_param] if np.isscalar(period_param) else period_param
+    deltas = np.append([0], np.diff(np.asarray(df[col_name], dtype=float)))
+    # Missing price changes count as neither a gain nor a loss
+    gains = np.nan_to_num(deltas.clip(min=0), nan=0.0)
+    losses = np.nan_to_num(-deltas.clip(max=0), nan=0.0)
+
+    for n in periods:
+        rsi = np.full(len(deltas), np.nan)
+        if len(deltas) > n + 1:
+            avg_gain = _wilder_average(
+                gains[n+1:], np.sum(deltas[1:n+1].clip(min=0)) / n, n
+            )
+            avg_loss = _wilder_average(
+                losses[n+1:], -np.sum(deltas[1:n+1].clip(max=0)) / n, n
+            )
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rsi[n+1:] = np.where(
+                    avg_loss != 0, np.round(100 - (100 / (1 + avg_gain / avg_loss)), 4), 100
+                )
 
-    df[f'RSI_{period_param}{suffix}'] = get_rsi(df[col_name], period_param)
+        df[f'RSI_{n}{suffix}'] = rsi
 
 
 def apply_keltner_channels(
     df, ema_period_param=20, atr_period_param=20, multiplier=1,
-    col_name_high='high', col_name_low='low', col_name_close='close', suffix=''
+    col_name_high='high', col_name_low='low', col_name_close='close', 
+    use_prev_close=False, func_apply_ema_atr=True, suffix=''
 ):
-    apply_ema(df, ema_period_param, col_name=col_name_high)
-    apply_atr(
-        df, period_param=atr_period_param, col_name_high=col_name_high, 
-        col_name_low=col_name_low, col_name_close=col_name_close, suffix=suffix
-    )
-
-    kelt_upper = []
-    kelt_lower = []
-    for i, r in df.iterrows():
-        kelt_upper.append(r[f'EMA_{ema_period_param}'] + r['ATR'] * multiplier)
-        kelt_lower.append(r[f'EMA_{ema_period_param}'] - r['ATR'] * multiplier)
+    if func_apply_ema_atr:
+        apply_ema(df, ema_period_param, col_name=col_name_high)
+        apply_atr(
+            df, period_param=atr_period_param, col_name_high=col_name_high, 
+            col_name_low=col_name_low, col_name_close=col_name_close, 
+            use_prev_close=use_prev_close, suffix=suffix
+        )
 
-    df[f'Keltner_upper{suffix}'] = kelt_upper
-    df[f'Keltner_lower{suffix}'] = kelt_lower
+    atr_band = df[f'ATR{suffix}'] * multiplier
+    df[f'Keltner_upper{suffix}'] = df[f'EMA_{ema_period_param}'] + atr_band
+    df[f'Keltner_lower{suffix}'] = df[f'EMA_{ema_period_param}'] - atr_band
 
 
 def apply_bollinger_bands(
-    df, ma_period_param=20, sd_multiplier=2, col_name='close', suffix=''
+    df, ma_period_param=20, sd_multiplier=2, col_name='close', 
+    func_apply_sma=True, suffix=''
 ):
-    stdevs, bb_upper, bb_lower = [], [], []
-    apply_sma(df, ma_period_param, col_name=col_name, suffix=suffix)
-
-    for i in range(len(df)):
-        if i <= ma_period_param:
-            stdevs.append(np.nan)
-            bb_upper.append(np.nan)
-            bb_lower.append(np.nan)
-            continue
-        else:
-            prices_close = np.array(df[col_name].iloc[i-ma_period_param+1:i+1])
-            stdev = np.std(prices_close, dtype=float)
-            stdevs.append(round(stdev, 4))
-
-            if suffix:
-                bb_upper.append(
-                    df[f'SMA_{ma_period_param}_{suffix}'].iloc[i] + stdev * sd_multiplier
-                )
-                bb_lower.append(
-                    df[f'SMA_{ma_period_param}_{suffix}'].iloc[i] - stdev * sd_multiplier
-                )
-            else:
-                bb_upper.append(
-                    df[f'SMA_{ma_period_param}'].iloc[i] + stdev * sd_multiplier
-                )
-                bb_lower.append(
-                    df[f'SMA_{ma_period_param}'].iloc[i] - stdev * sd_multiplier
-                )
-
-    df[f'STD_{col_name}{suffix}'] = stdevs
-    df[f'BB_upper{suffix}'] = bb_upper
-    df[f'BB_lower{suffix}'] = bb_lower
-    df[f'BB_distance{suffix}'] = df[f'BB_upper{suffix}'] - df[f'BB_lower{suffix}']
+    """
+    Applies Bollinger bands, using the population standard deviation
+    of rolling windows, to one or many moving average periods. When
+    given a collection of periods the period is added to the names of
+    the standard deviation and band columns, e.g. 'BB_upper_20'.
+
+    Parameters
+    ----------
+    :param df:
+        'pandas DataFrame' : Data to apply the Bollinger bands to.
+    :param ma_period_param:
+        Keyword arg 'int/list' : A moving average period, or a collection
+        of periods. Default value=20
+    :param sd_multiplier:
+        Keyword arg 'int/float' : The number of standard deviations
+        between the moving average and the bands. Default value=2
+    :param col_name:
+        Keyword arg 'str' : The column to calculate the bands from.
+        Default value='close'
+    :param func_apply_sma:
+        Keyword arg 'bool' : If True the SMA columns are applied inside
+        the function, leave as False if they have already been applied.
+        Default value=True
+    :param suffix:
+        Keyword arg 'str' : A suffix to add to the column names.
+        Default value=''
+    """
+
+    if np.isscalar(ma_period_param):
+        periods, band_suffixes = [ma_period_param], [suffix]
+    else:
+        periods = ma_period_param
+        band_suffixes = [f'_{period}{suffix}' for period in periods]
+
+    for period, band_suffix in zip(periods, band_suffixes):
+        if func_apply_sma:
+            apply_sma(df, period, col_name=col_name, suffix=suffix)
+
+        prices = np.asarray(df[col_name], dtype=float)
+        stdev = np.full(len(prices), np.nan)
+        # The bands start one bar after the first full window
+        if len(prices) > period + 1:
+            stdev[period+1:] = np.std(
+                np.lib.stride_tricks.sliding_window_view(prices, period)[2:], axis=1
+            )
+        stdev = pd.Series(stdev, index=df.index)
+        sma = df[f'SMA_{period}{suffix}']
+
+        df[f'STD_{col_name}{band_suffix}'] = round(stdev, 4)
+        df[f'BB_upper{band_suffix}'] = sma + stdev * sd_multiplier
+        df[f'BB_lower{band_suffix}'] = sma - stdev * sd_multiplier
+        df[f'BB_distance{band_suffix}'] = \
+            df[f'BB_upper{band_suffix}'] - df[f'BB_lower{band_suffix}']
 
 
 def apply_comparative_relative_strength(df, col_1, col_2, suffix=''):
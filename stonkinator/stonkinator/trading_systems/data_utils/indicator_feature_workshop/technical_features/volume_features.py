@@ -6,99 +6,95 @@ def apply_avg_volume(df, period_param, col_name='volume', suffix=''):
     df[f'Avg_vol_({period_param}){suffix}'] = df[col_name].rolling(period_param).mean()
 
 
-def apply_rvol(df, period_param=10, col_name='volume', suffix=''):
-    apply_avg_volume(df, period_param, col_name=col_name)
-
-    rvol_list = []
-    for i in range(len(df[col_name])):
-        if i < period_param:
-            rvol_list.append(np.nan)
-            continue
-        try:
-            if df[f'Avg_vol_({period_param})'].iloc[i] <= 0:
-                rvol_list.append(0)
-                continue
-            else:
-                rvol_list.append(
-                    df[col_name].iloc[i] / df[f'Avg_vol_({period_param})'].iloc[i]
-                )
-        except RuntimeWarning:
-            print('RuntimeWarning')
-        except ZeroDivisionError:
-            print('ZeroDivisionError')
-
-    df[f'RVOL_({period_param}){suffix}'] = rvol_list
+def apply_rvol(
+    df, period_param=10, col_name='volume', func_apply_avg_volume=True, suffix=''
+):
+    if func_apply_avg_volume:
+        apply_avg_volume(df, period_param, col_name=col_name)
+
+    avg_volume = df[f'Avg_vol_({period_param})'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rvol = np.where(
+            avg_volume <= 0, 0, df[col_name].to_numpy(dtype=float) / avg_volume
+        )
+    rvol[:period_param] = np.nan
+
+    df[f'RVOL_({period_param}){suffix}'] = rvol
 
 
 def apply_volume_balance(
     df, period_param=20, col_name_price='close', col_name_volume='volume', 
     suffix=''
 ):
-    volume_balance_list = []
-    volume_balance_mean = []
-
-    for index, row in enumerate(df.itertuples()):
-        if index <= 1:
-            volume_balance_list.append(np.nan)
-            volume_balance_mean.append(np.nan)
-            continue
-        if df[col_name_price].iloc[index] > df[col_name_price].iloc[index-1]:
-            volume_balance_list.append(float(df[col_name_volume].iloc[index]))
-        elif df[col_name_price].iloc[index] < df[col_name_price].iloc[index-1]:
-            volume_balance_list.append(float(df[col_name_volume].iloc[index]) * -1)
-        else:
-            volume_balance_list.append(0)
-        if index >= period_param:
-            volume_balance_mean.append(np.mean(volume_balance_list[-period_param:]))
-        else:
-            volume_balance_mean.append(np.nan)
-
-    df[f'Volume_balance_{period_param}{suffix}'] = volume_balance_mean
+    price = df[col_name_price]
+    volume = df[col_name_volume].astype(float)
+    # Volume signed by the direction of the price change, zero if unchanged
+    signed_volume = volume.where(price > price.shift(1), 0.0) \
+        .mask(price < price.shift(1), -volume)
+    signed_volume.iloc[:2] = np.nan
+
+    df[f'Volume_balance_{period_param}{suffix}'] = \
+        signed_volume.rolling(period_param).mean()
+
+
+def _rolling_sums(array, period_param):
+    """
+    Sums of the 'period_param' values preceding each index, excluding
+    the value at the index, NaN for the first 'period_param' indexes.
+    """
+
+    return pd.Series(array).rolling(period_param).sum().shift(1).to_numpy()
 
 
 def apply_vwap(
     df: pd.DataFrame, period_param, 
     col_name_price='close', col_name_volume='volume', suffix=''
 ):
-    vwap_list = []
-    
-    price_array = df[col_name_price].to_numpy()
-    volume_array = df[col_name_volume].to_numpy()
-    for index, row in enumerate(df.itertuples()):
-        if index < period_param:
-            vwap_list.append(np.nan)
-            continue
-        else:
-            vwap_list.append(
-                np.sum(np.multiply(price_array[index-period_param:index], volume_array[index-period_param:index])) / 
-                np.sum(volume_array[index-period_param:index])
-            )
+    price_array = df[col_name_price].to_numpy(dtype=float)
+    volume_array = df[col_name_volume].to_numpy(dtype=float)
 
-    df[f'VWAP_{period_param}{suffix}'] = vwap_list
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df[f'VWAP_{period_param}{suffix}'] = \
+            _rolling_sums(price_array * volume_array, period_param) / \
+            _rolling_sums(volume_array, period_param)
 
 
 def apply_vwap_from_n_period_low(
     df: pd.DataFrame, period_param, 
     col_name_price='close', col_name_volume='volume', suffix=''
 ):
-    vwap_list = []
-    
-    price_array = df[col_name_price].to_numpy()
-    volume_array = df[col_name_volume].to_numpy()
-    for index, row in enumerate(df.itertuples()):
-        if index < period_param:
-            vwap_list.append(np.nan)
-            continue
-        else:
-            min_price = min(price_array[index-period_param:index])
-            min_price_index = np.where(price_array[index-period_param:index] == min_price)[0][-1]
-            # hantera null values #
-            vwap = np.sum(np.multiply(price_array[index-period_param:index][min_price_index:], volume_array[index-period_param:index][min_price_index:])) / \
-            np.sum(volume_array[index-period_param:index][min_price_index:])
-
-            if vwap <= 0.1:
-                vwap_list.append(vwap_list[-1])
-            else:
-                vwap_list.append(vwap)
-
-    df[f'VWAP_{period_param}{suffix}'] = vwap_list
+    price_array = df[col_name_price].to_numpy(dtype=float)
+    volume_array = df[col_name_volume].to_numpy(dtype=float)
+    num_of_periods = len(price_array)
+
+    vwap = np.full(num_of_periods, np.nan)
+    if num_of_periods > period_param:
+        # Index of the last occurrence of the low of the 'period_param'
+        # periods preceding each index, from the reversed windows argmin
+        windows = np.lib.stride_tricks.sliding_window_view(
+            price_array, period_param
+        )[:num_of_periods-period_param]
+        window_starts = np.arange(num_of_periods - period_param)
+        low_indexes = window_starts + period_param - 1 - \
+            np.argmin(windows[:, ::-1], axis=1)
+
+        # VWAP from the low to the preceding index, from prefix sums that
+        # skip NaN, NaN if the summed range contains a NaN
+        price_volume = price_array * volume_array
+        is_nan = np.isnan(price_volume)
+        cum_price_volume = np.concatenate(([0], np.nancumsum(price_volume)))
+        cum_volume = np.concatenate(([0], np.cumsum(np.where(is_nan, 0, volume_array))))
+        cum_nan_count = np.concatenate(([0], np.cumsum(is_nan)))
+        ends = window_starts + period_param
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap[period_param:] = np.where(
+                cum_nan_count[ends] > cum_nan_count[low_indexes], np.nan,
+                (cum_price_volume[ends] - cum_price_volume[low_indexes]) /
+                (cum_volume[ends] - cum_volume[low_indexes])
+            )
+
+    # Values of 0.1 or less are replaced with the preceding value
+    valid_indexes = np.where(vwap <= 0.1, 0, np.arange(num_of_periods))
+    vwap = vwap[np.maximum.accumulate(valid_indexes)] if num_of_periods else vwap
+
+    df[f'VWAP_{period_param}{suffix}'] = vwap
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 
@@ -11,26 +12,134 @@ def multi_period_labeler(
 ):
     df[entry_label] = predicate1(df[column1])
     df[exit_label] = predicate2(df[entry_label], df[column2])
-    df[hold_label] = False
-
-    hold_label_state = False
-    for i, _ in enumerate(df.itertuples()):
-        if (
-            df[hold_label].iloc[i-1] and
-            df[exit_label].iloc[i] and
-            hold_label_state
-        ):
-            hold_label_state = False
-        elif (
-            not df[hold_label].iloc[i] and 
-            df[entry_label].iloc[i] and 
-            not hold_label_state 
-        ):
-            hold_label_state = True
-        
-        df.loc[i, hold_label] = hold_label_state
-
-    df[hold_label] = df[hold_label].shift(1)
+
+    # The hold state turns on at an entry and off at an exit, a period
+    # with both an entry and an exit toggles it. The state of each period
+    # is the value of the last period with only one of them, toggled by
+    # the number of periods with both since.
+    entries = np.asarray(df[entry_label], dtype=bool)
+    exits = np.asarray(df[exit_label], dtype=bool)
+    sets = entries ^ exits
+    toggles = np.cumsum(entries & exits)
+
+    last_set = np.maximum.accumulate(np.where(sets, np.arange(len(df)), -1))
+    has_set = last_set >= 0
+    set_state = np.where(has_set, entries[last_set], False)
+    toggles_since_set = toggles - np.where(has_set, toggles[last_set], 0)
+    hold_state = set_state ^ (toggles_since_set % 2 == 1)
+
+    df[hold_label] = pd.Series(hold_state, index=df.index).shift(1)
+
+
+def triple_barrier_labeler(
+    df: pd.DataFrame, profit_take: float=0.05, stop_loss: float=0.05,
+    max_holding_period: int=10, col_name_close: str='close', 
+    col_name_high: str='high', col_name_low: str='low', 
+    volatility_column: str | None=None, events: str | None=None,
+    label_name: str='tb_label', chunk_size: int=100000
+):
+    """
+    Labels periods with the barrier first touched after entering at the
+    close: 1 for the profit taking barrier, -1 for the stop loss barrier
+    and the sign of the return at the vertical barrier, max_holding_period
+    periods later, if neither is touched. A period where both barriers
+    are touched counts as a stop loss. Periods too close to the end of
+    the data to reach a barrier are labeled NaN.
+
+    The periods to look closer at are found with the forward rolling max
+    of the highs and min of the lows, and the first touch within their
+    forward windows is found with a vectorized argmax over a strided view
+    of the windows, processed in chunks of chunk_size values.
+
+    Parameters
+    ----------
+    :param df:
+        'Pandas DataFrame' : Price data.
+    :param profit_take:
+        Keyword arg 'float' : The distance from the entry to the profit
+        taking barrier, as a fraction of the entry price. Default value=0.05
+    :param stop_loss:
+        Keyword arg 'float' : The distance from the entry to the stop loss
+        barrier, as a fraction of the entry price. Default value=0.05
+    :param max_holding_period:
+        Keyword arg 'int' : The number of periods to the vertical barrier.
+        Default value=10
+    :param col_name_close:
+        Keyword arg 'str' : Default value='close'
+    :param col_name_high:
+        Keyword arg 'str' : Default value='high'
+    :param col_name_low:
+        Keyword arg 'str' : Default value='low'
+    :param volatility_column:
+        Keyword arg 'None/str' : A column of volatility, as a fraction of
+        price, that the barrier distances are multiplied by, e.g. the ADR
+        divided by 100. Default value=None
+    :param events:
+        Keyword arg 'None/str' : A bool column with the periods to label,
+        all periods are labeled if None. Default value=None
+    :param label_name:
+        Keyword arg 'str' : The label column, the number of periods held
+        and the return at the touched barrier are added as the
+        '{label_name}_periods' and '{label_name}_return' columns.
+        Default value='tb_label'
+    :param chunk_size:
+        Keyword arg 'int' : The max number of window values processed
+        at a time. Default value=100000
+    """
+
+    close = df[col_name_close].to_numpy(dtype=float)
+    high = df[col_name_high].to_numpy(dtype=float)
+    low = df[col_name_low].to_numpy(dtype=float)
+    n, h = len(close), max_holding_period
+
+    scale = df[volatility_column].to_numpy(dtype=float) if volatility_column else 1.0
+    upper = close * (1 + profit_take * scale)
+    lower = close * (1 - stop_loss * scale)
+
+    # Forward windows of the h periods after each period
+    pad = np.full(h, np.nan)
+    high_windows = np.lib.stride_tricks.sliding_window_view(np.append(high, pad)[1:], h)
+    low_windows = np.lib.stride_tricks.sliding_window_view(np.append(low, pad)[1:], h)
+    forward_max = pd.Series(high[::-1]).rolling(h, min_periods=1).max().shift(1) \
+        .to_numpy()[::-1]
+    forward_min = pd.Series(low[::-1]).rolling(h, min_periods=1).min().shift(1) \
+        .to_numpy()[::-1]
+
+    first_up = np.full(n, h)
+    first_down = np.full(n, h)
+    rows = np.flatnonzero((forward_max >= upper) | (forward_min <= lower))
+    rows_per_chunk = max(1, chunk_size // max(h, 1))
+    for start in range(0, len(rows), rows_per_chunk):
+        chunk = rows[start:start+rows_per_chunk]
+        hit_up = high_windows[chunk] >= upper[chunk, np.newaxis]
+        hit_down = low_windows[chunk] <= lower[chunk, np.newaxis]
+        first_up[chunk] = np.where(hit_up.any(axis=1), hit_up.argmax(axis=1), h)
+        first_down[chunk] = np.where(hit_down.any(axis=1), hit_down.argmax(axis=1), h)
+
+    touched_down = (first_down < h) & (first_down <= first_up)
+    touched_up = (first_up < h) & ~touched_down
+    vertical = np.arange(n) + h
+    vertical_close = np.append(close, pad)[vertical]
+
+    label = np.where(
+        touched_down, -1.0, np.where(touched_up, 1.0, np.sign(vertical_close / close - 1))
+    )
+    periods = np.where(touched_down, first_down + 1, np.where(touched_up, first_up + 1, h))
+    returns = np.where(
+        touched_down, lower / close - 1,
+        np.where(touched_up, upper / close - 1, vertical_close / close - 1)
+    )
+
+    # Untouched barriers past the end of the data are unknown
+    unknown = ~touched_down & ~touched_up & (vertical >= n)
+    if events is not None:
+        unknown |= ~np.asarray(df[events], dtype=bool)
+    label[unknown] = np.nan
+    returns[unknown] = np.nan
+
+    df[label_name] = label
+    df[f'{label_name}_periods'] = np.where(unknown, np.nan, periods)
+    df[f'{label_name}_return'] = returns
 
 
 if __name__ == '__main__':
@@ -1,25 +1,114 @@
+import hashlib
 from typing import Callable
+from collections import Counter
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.stattools import adfuller
+from sklearn.base import clone
 from sklearn.feature_selection import SelectKBest, mutual_info_classif, RFE, RFECV
 
 from trading_systems.model_creation.model_creation import SKModel
+from trading_systems.model_creation.model_cache import ModelCache, training_fingerprint
+
+
+def _adf_p_value(values: np.ndarray, maxlag, autolag) -> float:
+    try:
+        _, p_value, *_ = adfuller(values, maxlag=maxlag, autolag=autolag)
+        return p_value
+    except ValueError:
+        return np.nan
+
+
+def adf_stationarity_test_batch(
+    data_dict: dict, significance_level=0.05, maxlag=None, autolag='AIC',
+    num_workers=1, adf_cache: dict | None=None
+) -> dict:
+    """
+    Runs the Augmented Dickey-Fuller test on every column of every
+    DataFrame of data_dict, with the (instrument, column) tests executed
+    on a process pool. Columns with identical content are tested once.
+
+    Parameters
+    ----------
+    :param data_dict:
+        'dict' : Pandas DataFrames with the columns to test.
+    :param significance_level:
+        Keyword arg 'float' : A column is stationary if the p-value of
+        the test is below it. Default value=0.05
+    :param maxlag:
+        Keyword arg 'None/int' : The maximum lag of the test, passed to
+        adfuller, which derives it from the number of rows if None.
+        Default value=None
+    :param autolag:
+        Keyword arg 'None/str' : The lag selection method passed to
+        adfuller, maxlag is used as is if None. Default value='AIC'
+    :param num_workers:
+        Keyword arg 'None/int' : The max_workers argument passed to
+        ProcessPoolExecutor, the tests run in the current process if 1.
+        Default value=1
+    :param adf_cache:
+        Keyword arg 'None/dict' : A dict the p-values are cached in,
+        keyed by a hash of the column content and the test arguments.
+        Reusing it between calls skips the columns that are unchanged.
+        Default value=None
+
+    :return:
+        'dict' : Dicts with the same keys as data_dict of bools by
+        column, True if the column is stationary.
+    """
+
+    if adf_cache is None:
+        adf_cache = {}
+
+    column_keys: dict = {}
+    pending: dict = {}
+    for key, df in data_dict.items():
+        for column in df.columns:
+            try:
+                values = df[column].dropna().to_numpy(dtype=float)
+            except (ValueError, TypeError):
+                column_keys[(key, column)] = None
+                continue
+
+            cache_key = (
+                hashlib.sha256(np.ascontiguousarray(values).tobytes()).hexdigest(),
+                maxlag, autolag
+            )
+            column_keys[(key, column)] = cache_key
+            if cache_key not in adf_cache:
+                pending[cache_key] = values
+
+    if num_workers == 1 or len(pending) <= 1:
+        p_values = [_adf_p_value(values, maxlag, autolag) for values in pending.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            p_values = list(
+                executor.map(
+                    _adf_p_value, pending.values(),
+                    repeat(maxlag), repeat(autolag), chunksize=8
+                )
+            )
+    adf_cache.update(zip(pending.keys(), p_values))
+
+    stationary_results = {key: {} for key in data_dict}
+    for (key, column), cache_key in column_keys.items():
+        p_value = np.nan if cache_key is None else adf_cache[cache_key]
+        stationary_results[key][column] = bool(p_value < significance_level)
 
+    return stationary_results
 
-def adf_stationarity_test(df: pd.DataFrame, significance_level=0.05):
-    stationary_results = {}
-    for column in df.columns:
-        series = df[column]
-        try:
-            result = adfuller(series.dropna())
-            _, p_value, *_ = result
-            stationary_results[column] = p_value < significance_level
-        except ValueError:
-            stationary_results[column] = False
 
-    return stationary_results
+def adf_stationarity_test(
+    df: pd.DataFrame, significance_level=0.05, maxlag=None, autolag='AIC',
+    num_workers=1, adf_cache: dict | None=None
+):
+    return adf_stationarity_test_batch(
+        {None: df}, significance_level=significance_level, maxlag=maxlag,
+        autolag=autolag, num_workers=num_workers, adf_cache=adf_cache
+    )[None]
 
 
 def encode_categorical_features(df: pd.DataFrame, categorical_features):
@@ -98,60 +187,6 @@ def feature_importances_by_threshold_selection(
     return selected_features.to_list(), importances_sorted[:len(selected_features)], estimator_best_params
 
 
-# n_grid_search_runs = 5
-# n_stability_selection_runs = 20
-# grid_search_best_params_composite = []
-# selected_features_composite = []
-
-# for i in range(n_grid_search_runs):
-#     print(f'grid search, iteration {i}')
-#     selected_features, feature_importances, estimator_best_params = feature_importances_by_threshold_selection(
-#         X_train, y_train, grid_search,
-#         feature_metrics_attr_chain=['best_estimator_', 'feature_importances_']
-#     )
-#     selected_features_composite += selected_features
-#     grid_search_best_params_composite.append(estimator_best_params)
-
-#     if i == 0:
-#         feature_importances.plot(kind='barh')
-#         plt.title('RFE Ranking')
-
-# grid_search_best_params_df = pd.DataFrame(grid_search_best_params_composite)
-# grid_search_most_selected_params_dict = {
-#     column: grid_search_best_params_df[column].value_counts().idxmax() 
-#     for column in grid_search_best_params_df.columns
-# }
-# gbc = GradientBoostingClassifier(**grid_search_most_selected_params_dict, random_state=42)
-
-# print('grid_search_best_params_composite:', grid_search_best_params_composite)
-# print('grid_search_most_selected_params_dict:', grid_search_most_selected_params_dict)
-
-# for i in range(n_stability_selection_runs - n_grid_search_runs):
-#     print(f'iteration {i}')
-#     selected_features, feature_importances, _ = feature_importances_by_threshold_selection(
-#         X_train, y_train, gbc,
-#         feature_metrics_attr_chain=['feature_importances_']
-#     )
-#     selected_features_composite += selected_features
-
-# selected_features_counter = Counter(selected_features_composite)
-
-# # Retain features that are selected in atleast a defined % of the runs
-# percentage = 0.85
-# # percentage = 0.50
-# n_times_selected_threshold = int(n_stability_selection_runs * percentage)
-# selected_features = [
-#     feature for feature, n_times_selected in selected_features_counter.items() 
-#     if n_times_selected >= n_times_selected_threshold
-# ]
-# X_df_reduced = X_df[selected_features]
-
-# print(f'Extracted features:\n{selected_features}')
-# print(f'Excluded features:\n{[feature for feature in X_df.columns.to_list() if feature not in selected_features]}')
-# print(f'Number of features before: {len(X_df.columns.to_list())}')
-# print(f'Number of features after: {len(selected_features)}')
-
-
 def recursive_feature_elimination(
     X: pd.DataFrame, y: pd.DataFrame, estimator_model,
     cv=None, feature_metrics_attr_chain=None, **hyperparams
@@ -185,64 +220,175 @@ def recursive_feature_elimination(
     return list(selected_features), importances_sorted, estimator_best_params
 
 
-# # Experiment with different values for scoring (accuracy, f1, roc_auc, etc). 
-# # Evaluate which scoring function suits the problem the best.
-# # How to evaluate the fitted feature selection model? Should that be taken into account for the stability selection?
-# rfe_params = {
-#     'step': 1,
-#     'scoring': 'f1',  # 'accuracy', 'roc_auc',
-#     'verbose': 0,
-#     'importance_getter': 'best_estimator_.feature_importances_'
-# }
-
-# n_grid_search_runs = 1
-# n_stability_selection_runs = 6
-# grid_search_best_params_composite = []
-# selected_features_composite = []
-
-# for i in range(n_grid_search_runs):
-#     selected_features, feature_importances, estimator_best_params = recursive_feature_elimination(
-#         X_train, y_train, grid_search,
-#         cv=ts_split, feature_metrics_attr_chain=rfe_params.get('importance_getter').split('.'),
-#         **rfe_params
-#     )
-#     selected_features_composite += selected_features
-#     grid_search_best_params_composite.append(estimator_best_params)
-
-#     if i == 0:
-#         feature_importances.plot(kind='barh')
-#         plt.title('RFE Ranking')
-#         plt.show()
-
-# grid_search_best_params_df = pd.DataFrame(grid_search_best_params_composite)
-# grid_search_most_selected_params_dict = {
-#     column: grid_search_best_params_df[column].value_counts().idxmax() 
-#     for column in grid_search_best_params_df.columns
-# }
-# gbc = GradientBoostingClassifier(**grid_search_most_selected_params_dict, random_state=42)
-# rfe_params['importance_getter'] = 'feature_importances_'
-
-# print('\ngrid_search_best_params_composite:', grid_search_best_params_composite)
-# print(f'grid_search_most_selected_params_dict: {grid_search_most_selected_params_dict}\n')
-
-# for i in range(n_stability_selection_runs - n_grid_search_runs):
-#     selected_features, feature_importances, _ = recursive_feature_elimination(
-#         X_train, y_train, gbc,
-#         cv=ts_split, feature_metrics_attr_chain=rfe_params.get('importance_getter').split('.'),
-#         **rfe_params
-#     )
-#     selected_features_composite += selected_features
-
-# selected_features_counter = Counter(selected_features_composite)
-
-# # Retain features that are selected in atleast 85% of the run
-# n_times_selected_threshold = int(n_stability_selection_runs * 0.85)
-# selected_features = [
-#     feature for feature, n_times_selected in selected_features_counter.items() 
-#     if n_times_selected >= n_times_selected_threshold
-# ]
-# X_df_reduced = X_df[selected_features]
-
-# print(f'\nExtracted features:\n{selected_features}')
-# print(f'Number of features before: {len(X_df.columns.to_list())}')
-# print(f'Number of features after: {len(X_df_reduced.columns.to_list())}')
\ No newline at end of file
+def _seeded_model(model: SKModel, seed: int) -> SKModel:
+    model = clone(model)
+    seed_params = {
+        param: seed for param in model.get_params(deep=True)
+        if param == 'random_state' or param.endswith('__random_state')
+    }
+    return model.set_params(**seed_params)
+
+
+def _selection_round(
+    selection_func: Callable, X: pd.DataFrame, y: pd.Series, model: SKModel,
+    seed: int, selection_kwargs: dict
+) -> tuple[list[str], dict[str, object] | None]:
+    selected_features, _, estimator_best_params = selection_func(
+        X, y, _seeded_model(model, seed), **selection_kwargs
+    )
+    return list(selected_features), estimator_best_params
+
+
+def _run_selection_rounds(
+    selection_func: Callable, X: pd.DataFrame, y: pd.Series, model: SKModel,
+    seeds: list[int], selection_kwargs: dict, num_workers
+) -> list[tuple[list[str], dict[str, object] | None]]:
+    if num_workers == 1:
+        return [
+            _selection_round(selection_func, X, y, model, seed, selection_kwargs)
+            for seed in seeds
+        ]
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(_selection_round, selection_func, X, y, model, seed, selection_kwargs)
+            for seed in seeds
+        ]
+        return [future.result() for future in futures]
+
+
+def _most_selected_params(best_params_list: list[dict | None]) -> dict[str, object]:
+    params_counters: dict[str, Counter] = {}
+    for best_params in best_params_list:
+        for param, value in (best_params or {}).items():
+            params_counters.setdefault(param, Counter())[value] += 1
+
+    return {
+        param: counter.most_common(1)[0][0]
+        for param, counter in params_counters.items()
+    }
+
+
+def stability_selection(
+    X: pd.DataFrame, y: pd.Series, grid_search_model: SKModel, model_class: SKModel,
+    selection_func: Callable=feature_importances_by_threshold_selection,
+    n_grid_search_runs=5, n_stability_selection_runs=20, fraction=0.85,
+    grid_search_selection_kwargs: dict | None=None, selection_kwargs: dict | None=None,
+    random_state=None, num_workers=1, model_cache: ModelCache | None=None
+) -> tuple[list[str], pd.Series, dict[str, object]]:
+    """
+    Repeats a feature selection with independent seeds and retains the
+    features selected in at least the given fraction of the runs.
+
+    The first n_grid_search_runs runs select features with
+    grid_search_model, e.g. a GridSearchCV object. The params chosen
+    most often by those runs are used to instantiate model_class for
+    the remaining runs, which skip the grid search. The runs of each
+    phase are executed in parallel on a process pool, with the
+    random_state params of the models set to seeds spawned from
+    random_state.
+
+    Parameters
+    ----------
+    :param X:
+        'Pandas DataFrame' : The features.
+    :param y:
+        'Pandas Series' : The target.
+    :param grid_search_model:
+        'SKModel' : The model of the grid search runs.
+    :param model_class:
+        'SKModel' : The model class of the remaining runs, instantiated
+        with the most selected params of the grid search runs.
+    :param selection_func:
+        Keyword arg 'function' : A function taking X, y and a model and
+        returning a tuple of the selected features, their importances
+        and the best params of the model, e.g.
+        feature_importances_by_threshold_selection or
+        recursive_feature_elimination.
+        Default value=feature_importances_by_threshold_selection
+    :param n_grid_search_runs:
+        Keyword arg 'int' : The number of runs with grid_search_model.
+        Default value=5
+    :param n_stability_selection_runs:
+        Keyword arg 'int' : The total number of runs. Default value=20
+    :param fraction:
+        Keyword arg 'float' : The fraction of the runs a feature needs
+        to be selected in to be retained. Default value=0.85
+    :param grid_search_selection_kwargs:
+        Keyword arg 'None/dict' : Keyword args passed to selection_func
+        in the grid search runs, e.g. feature_metrics_attr_chain=
+        ['best_estimator_', 'feature_importances_']. Default value=None
+    :param selection_kwargs:
+        Keyword arg 'None/dict' : Keyword args passed to selection_func
+        in the remaining runs. Default value=None
+    :param random_state:
+        Keyword arg 'None/int' : Seed of the seed sequence the seeds of
+        the runs are spawned from. Default value=None
+    :param num_workers:
+        Keyword arg 'None/int' : The max_workers argument passed to
+        ProcessPoolExecutor, the runs are executed in the current
+        process if 1. Default value=1
+    :param model_cache:
+        Keyword arg 'None/ModelCache' : Cache of the results of the
+        grid search runs, keyed by the training fingerprint of X, y,
+        grid_search_model and the seeds. The seeds are left out of the
+        key if random_state is None, as they are then drawn from fresh
+        entropy on every call, so any cached result of the same inputs
+        is reused. Default value=None
+
+    :return:
+        'tuple' : The retained features ordered by the number of times
+        they were selected, the fraction of the runs each feature was
+        selected in and the params used for the remaining runs.
+    """
+
+    grid_search_selection_kwargs = grid_search_selection_kwargs or {}
+    selection_kwargs = selection_kwargs or {}
+    seeds = [
+        int(seed_seq.generate_state(1)[0])
+        for seed_seq in np.random.SeedSequence(random_state).spawn(n_stability_selection_runs)
+    ]
+    grid_search_seeds = seeds[:n_grid_search_runs]
+
+    def run_grid_search():
+        return _run_selection_rounds(
+            selection_func, X, y, grid_search_model, grid_search_seeds,
+            grid_search_selection_kwargs, num_workers
+        )
+
+    if model_cache is None:
+        grid_search_results = run_grid_search()
+    else:
+        target_col = '__stability_selection_target__'
+        fingerprint = training_fingerprint(
+            X.assign(**{target_col: y.to_numpy()}), list(X.columns), target_col,
+            grid_search_model, {}, model_type='stability_selection',
+            selection_func=selection_func,
+            seeds=grid_search_seeds if random_state is not None else None,
+            selection_kwargs=grid_search_selection_kwargs
+        )
+        grid_search_results = model_cache.get_or_create(fingerprint, run_grid_search)
+
+    selected_params = _most_selected_params(
+        [best_params for _, best_params in grid_search_results]
+    )
+    results = grid_search_results + _run_selection_rounds(
+        selection_func, X, y, model_class(**selected_params), seeds[n_grid_search_runs:],
+        selection_kwargs, num_workers
+    )
+
+    selected_features_counter = Counter(
+        feature for selected_features, _ in results for feature in selected_features
+    )
+    selection_frequencies = pd.Series(
+        [selected_features_counter[feature] / len(results) for feature in X.columns],
+        index=X.columns
+    ).sort_values(ascending=False, kind='stable')
+
+    n_times_selected_threshold = int(len(results) * fraction)
+    selected_features = [
+        feature for feature, n_times_selected in selected_features_counter.most_common()
+        if n_times_selected >= n_times_selected_threshold
+    ]
+
+    return selected_features, selection_frequencies, selected_params
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def _stable_repr(value):
+    if isinstance(value, dict):
+        return '{' + ', '.join(
+            f'{_stable_repr(k)}: {_stable_repr(v)}'
+            for k, v in sorted(value.items(), key=lambda item: repr(item[0]))
+        ) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_stable_repr(v) for v in value) + ']'
+    if isinstance(value, np.ndarray):
+        return _stable_repr(value.tolist())
+    if isinstance(value, type) or callable(value) and hasattr(value, '__qualname__'):
+        return f'{value.__module__}.{value.__qualname__}'
+    if hasattr(value, 'get_params'):
+        # Estimators and transformers, e.g. pipeline steps
+        return f'{_stable_repr(type(value))}({_stable_repr(value.get_params(deep=False))})'
+    return repr(value)
+
+
+def training_fingerprint(
+    df: pd.DataFrame, features: list[str], target_col: str,
+    model_class, params: dict, pipeline_args: tuple[tuple] | None=None,
+    **kwargs
+):
+    """
+    Returns a hash of the inputs of a model fit, the feature columns
+    and target of the training data, rows and index included, the model
+    class, its params and the pipeline steps, that is stable across
+    processes.
+
+    Parameters
+    ----------
+    :param df:
+        'Pandas DataFrame' : The training data.
+    :param features:
+        'list' : The feature columns.
+    :param target_col:
+        'str' : The target column.
+    :param model_class:
+        'SKModel' : The model class.
+    :param params:
+        'dict' : The params of the model, or the param grid of a search.
+    :param pipeline_args:
+        Keyword arg 'None/tuple' : Steps of a Pipeline that the model is
+        added to as the final step. Default value=None
+    :param kwargs:
+        Other arguments the fit depends on, e.g. the number of folds.
+
+    :return:
+        'str'
+    """
+
+    spec = _stable_repr(
+        [features, target_col, model_class, params, pipeline_args, kwargs]
+    )
+    data_hash = pd.util.hash_pandas_object(df[[*features, target_col]], index=True)
+
+    fingerprint = hashlib.sha256(spec.encode())
+    fingerprint.update(data_hash.to_numpy().tobytes())
+    return fingerprint.hexdigest()[:32]
+
+
+class ModelCache:
+    """
+    Local on-disk cache of fitted models and walk-forward predictions,
+    keyed by training fingerprints. Entries are pickled, so only load
+    a cache directory written by a trusted process.
+
+    Entries older than max_age are evicted, and when the total size of
+    the cache exceeds max_bytes the least recently used entries are
+    evicted. The entries are listed once per cache object, on the first
+    write, and kept in an in-memory LRU index after that, so a write
+    costs O(1) amortized filesystem calls. Expired entries are removed
+    by that listing and when read.
+
+    Parameters
+    ----------
+    dir_path : 'str'
+        The directory of the cache.
+    max_bytes : Keyword arg 'None/int'
+        The maximum total size of the cache in bytes, no limit if None.
+        Default value=None
+    max_age : Keyword arg 'None/float'
+        The maximum age of an entry in seconds, no limit if None.
+        Default value=None
+    """
+
+    __META_FILE = 'meta.json'
+    __OBJECT_FILE = 'object.pkl'
+
+    def __init__(self, dir_path, max_bytes=None, max_age=None):
+        self.__dir_path = dir_path
+        self.__max_bytes = max_bytes
+        self.__max_age = max_age
+        # Entry paths and sizes in least recently used order and their
+        # total size, listed from the directory on the first write
+        self.__index: OrderedDict[str, int] | None = None
+        self.__size = 0
+        os.makedirs(dir_path, exist_ok=True)
+
+    def _entry_path(self, fingerprint):
+        return os.path.join(self.__dir_path, fingerprint)
+
+    def _read_meta(self, entry_path):
+        meta_path = os.path.join(entry_path, self.__META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as file:
+            return json.load(file)
+
+    def _write_meta(self, entry_path, meta):
+        meta_path = os.path.join(entry_path, self.__META_FILE)
+        with open(f'{meta_path}.tmp', 'w') as file:
+            json.dump(meta, file)
+        os.replace(f'{meta_path}.tmp', meta_path)
+
+    def _is_expired(self, meta, now):
+        return self.__max_age is not None and now - meta['created'] > self.__max_age
+
+    def get(self, fingerprint):
+        """
+        Returns the object of an entry.
+
+        Parameters
+        ----------
+        :param fingerprint:
+            'str' : The training fingerprint of the entry.
+
+        :return:
+            'object/None' : None if there is no entry, or if it is
+            expired.
+        """
+
+        entry_path = self._entry_path(fingerprint)
+        meta = self._read_meta(entry_path)
+        now = time.time()
+        if meta is None:
+            return None
+        if self._is_expired(meta, now):
+            shutil.rmtree(entry_path, ignore_errors=True)
+            if self.__index is not None and entry_path in self.__index:
+                self.__size -= self.__index.pop(entry_path)
+            return None
+
+        with open(os.path.join(entry_path, self.__OBJECT_FILE), 'rb') as file:
+            obj = pickle.load(file)
+        meta['last_access'] = now
+        self._write_meta(entry_path, meta)
+        if self.__index is not None and entry_path in self.__index:
+            self.__index.move_to_end(entry_path)
+        return obj
+
+    def put(self, fingerprint, obj):
+        """
+        Writes an object as an entry, replacing any previous entry.
+
+        Parameters
+        ----------
+        :param fingerprint:
+            'str' : The training fingerprint of the entry.
+        :param obj:
+            'object' : A picklable object, e.g. a fitted model.
+        """
+
+        entry_path = self._entry_path(fingerprint)
+        shutil.rmtree(entry_path, ignore_errors=True)
+        os.makedirs(entry_path)
+
+        with open(os.path.join(entry_path, self.__OBJECT_FILE), 'wb') as file:
+            pickle.dump(obj, file, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        self._write_meta(entry_path, {'created': now, 'last_access': now})
+
+        if self.__index is None:
+            self.evict()
+        elif self.__max_bytes is not None:
+            size = self._entry_size(entry_path)
+            self.__size += size - self.__index.pop(entry_path, 0)
+            self.__index[entry_path] = size
+            self._evict_indexed()
+
+    def get_or_create(self, fingerprint, create_func):
+        """
+        Returns the object of an entry, or calls create_func and writes
+        its return value as the entry if there is none.
+
+        Parameters
+        ----------
+        :param fingerprint:
+            'str' : The training fingerprint of the entry.
+        :param create_func:
+            'function' : A function without arguments creating the
+            object, e.g. fitting a model.
+
+        :return:
+            'object'
+        """
+
+        obj = self.get(fingerprint)
+        if obj is None:
+            obj = create_func()
+            if obj is not None:
+                self.put(fingerprint, obj)
+        return obj
+
+    def size(self):
+        """
+        Returns the total size of the cache in bytes.
+
+        :return:
+            'int'
+        """
+
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for entry_name in os.listdir(self.__dir_path):
+            entry_path = os.path.join(self.__dir_path, entry_name)
+            meta = self._read_meta(entry_path) if os.path.isdir(entry_path) else None
+            if meta is None:
+                continue
+            yield entry_path, meta, self._entry_size(entry_path)
+
+    def _entry_size(self, entry_path):
+        return sum(
+            os.path.getsize(os.path.join(entry_path, file_name))
+            for file_name in os.listdir(entry_path)
+        )
+
+    def evict(self):
+        """
+        Lists the entries of the cache, rebuilding the LRU index, and
+        removes the entries older than max_age, then the least recently
+        used entries until the total size of the cache is within
+        max_bytes.
+        """
+
+        now = time.time()
+        entries = []
+        for entry_path, meta, size in self._entries():
+            if self._is_expired(meta, now):
+                shutil.rmtree(entry_path, ignore_errors=True)
+            else:
+                entries.append((entry_path, meta['last_access'], size))
+
+        entries.sort(key=lambda entry: entry[1])
+        self.__index = OrderedDict((entry_path, size) for entry_path, _, size in entries)
+        self.__size = sum(self.__index.values())
+        self._evict_indexed()
+
+    def _evict_indexed(self):
+        if self.__max_bytes is None:
+            return
+        while self.__size > self.__max_bytes and self.__index:
+            entry_path, size = self.__index.popitem(last=False)
+            shutil.rmtree(entry_path, ignore_errors=True)
+            self.__size -= size
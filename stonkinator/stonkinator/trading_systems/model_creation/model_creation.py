@@ -1,5 +1,6 @@
 from typing import Callable, Protocol
 from itertools import product
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
 
 import numpy as np
 import pandas as pd
@@ -7,6 +8,12 @@ from sklearn.model_selection import TimeSeriesSplit
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import classification_report, confusion_matrix, precision_score, roc_auc_score
 
+from trading_systems.model_creation.model_cache import ModelCache, training_fingerprint
+from trading_systems.model_creation.prediction_cache import (
+    PredictionCache, model_fingerprint, training_data_hash
+)
+from trading_systems.model_creation.training_matrix import TrainingMatrix
+
 
 class SKModel(Protocol):
     def fit(self, X, y, **kwargs): ...
@@ -34,78 +41,471 @@ def print_classification_model_metrics(estimator: SKModel, X_train, X_test, y_tr
     print('--------------------------------------------------------')
 
 
-def create_backtest_models(
-    df: pd.DataFrame, features: list[str], target_col: str,
+def _build_estimator(model_class: SKModel, params: dict, pipeline_args: tuple[tuple] | None):
+    estimator = model_class(**params)
+    if pipeline_args is not None:
+        estimator = Pipeline([*pipeline_args, ('estimator', estimator)])
+    return estimator
+
+
+def _fit_candidate(
+    X_train, y_train, X_test, y_test, model_class: SKModel, params: dict,
+    pipeline_args: tuple[tuple] | None, optimization_metric_func: Callable,
+    return_estimator: bool
+):
+    estimator = _build_estimator(model_class, params, pipeline_args)
+    estimator.fit(X_train, y_train)
+    y_pred = estimator.predict(X_test)
+    return (
+        optimization_metric_func(y_test, y_pred), y_pred, estimator.get_params(),
+        estimator if return_estimator else None
+    )
+
+
+def param_grid_combinations(param_grid: dict[str, np.array]) -> list[dict]:
+    model_params, model_param_values = zip(*param_grid.items())
+    return [dict(zip(model_params, v)) for v in product(*model_param_values)]
+
+
+def _grid_search_tasks(training_matrix: TrainingMatrix, param_combinations, n_splits):
+    ts_split = TimeSeriesSplit(n_splits=n_splits)
+    for key in training_matrix.keys:
+        X, y = training_matrix.get(key)
+        for fold, (tr_index, val_index) in enumerate(ts_split.split(X)):
+            # TimeSeriesSplit indexes are contiguous, slices avoid copies
+            tr_slice = slice(tr_index[0], tr_index[-1] + 1)
+            val_slice = slice(val_index[0], val_index[-1] + 1)
+            for param_index, params in enumerate(param_combinations):
+                yield (key, fold, param_index, val_index), (
+                    X[tr_slice], y[tr_slice], X[val_slice], y[val_slice], params
+                )
+
+
+def create_backtest_models_batch(
+    data_dict: dict, features: list[str], target_col: str,
     model_class: SKModel, param_grid: dict[str, np.array], *args,
     pipeline_args: tuple[tuple] | None=None, 
-    optimization_metric_func: Callable=precision_score, verbose=False
-) -> tuple[pd.DataFrame, list[dict]]:
-    df_copy = df.copy()
+    optimization_metric_func: Callable=precision_score, verbose=False,
+    n_splits=3, num_workers=1, model_cache: ModelCache | None=None, dtype=np.float32,
+    prediction_cache: PredictionCache | None=None
+) -> tuple[dict, dict]:
+    """
+    Fits every combination of param_grid on every TimeSeriesSplit fold
+    of every DataFrame of data_dict, and keeps the predictions of the
+    best combination of each fold, by optimization_metric_func, as the
+    out of sample predictions of the DataFrame.
 
-    X_df = df_copy[features]
-    y_df = df_copy[target_col]
+    The (instrument, fold, params) fits are scheduled on a process pool
+    with at most two tasks per worker in flight, so peak memory does not
+    grow with the size of the search. Only the predictions of the best
+    candidate of each fold are retained, as arrays, and each output
+    DataFrame is assembled once.
 
-    X = X_df.to_numpy()
-    y = y_df.to_numpy()
+    Parameters
+    ----------
+    :param data_dict:
+        'dict' : Pandas DataFrames with the features and target.
+    :param features:
+        'list' : The feature columns.
+    :param target_col:
+        'str' : The target column.
+    :param model_class:
+        'SKModel' : The model class, instantiated with the params.
+    :param param_grid:
+        'dict' : The values to search of each param.
+    :param pipeline_args:
+        Keyword arg 'None/tuple' : Steps of a Pipeline that the model is
+        added to as the final step. Default value=None
+    :param optimization_metric_func:
+        Keyword arg 'function' : Metric of the predictions to maximize.
+        Default value=precision_score
+    :param verbose:
+        Keyword arg 'bool' : Print the metrics of the best model of each
+        fold. Default value=False
+    :param n_splits:
+        Keyword arg 'int' : The number of TimeSeriesSplit folds.
+        Default value=3
+    :param num_workers:
+        Keyword arg 'None/int' : The max_workers argument passed to
+        ProcessPoolExecutor, the fits run in the current process if 1.
+        The model class, pipeline steps and metric function must be
+        picklable to use a pool. Default value=1
+    :param model_cache:
+        Keyword arg 'None/ModelCache' : Cache of the out of sample row
+        positions, predictions and selected params of each DataFrame,
+        keyed by its training fingerprint. Only DataFrames without a
+        cache entry are fitted. Default value=None
+    :param dtype:
+        Keyword arg 'numpy dtype' : The dtype of the feature matrices.
+        Default value=np.float32
+    :param prediction_cache:
+        Keyword arg 'None/PredictionCache' : Cache of the out of sample
+        predictions of each candidate, keyed by the fingerprint of its
+        fold fit and the DataFrame key, and joined on the index.
+        Candidates with the predictions of their fold cached are not
+        fitted, so reruns over unchanged data only fit new candidates.
+        Not used if verbose, which needs the fitted models.
+        Default value=None
 
-    ts_split = TimeSeriesSplit(n_splits=3)
+    :return:
+        'tuple' : Dicts with the same keys as data_dict of DataFrames of
+        the out of sample rows with a 'pred' column, and of lists of
+        the params of the best model of each fold.
+    """
 
-    model_params, model_param_values =  zip(*param_grid.items())
-    param_combinations = [dict(zip(model_params, v)) for v in product(*model_param_values)]
-    selected_params = []
+    fingerprints, cached = {}, {}
+    if model_cache is not None:
+        fingerprints = {
+            key: training_fingerprint(
+                df, features, target_col, model_class, param_grid, pipeline_args,
+                model_type='backtest_predictions', n_splits=n_splits,
+                optimization_metric_func=optimization_metric_func, dtype=np.dtype(dtype).name
+            )
+            for key, df in data_dict.items()
+        }
+        cached = {key: model_cache.get(fingerprint) for key, fingerprint in fingerprints.items()}
+
+    predictions_dict, selected_params_dict = _backtest_predictions_batch(
+        {key: df for key, df in data_dict.items() if cached.get(key) is None},
+        features, target_col, model_class, param_grid,
+        pipeline_args=pipeline_args, optimization_metric_func=optimization_metric_func,
+        verbose=verbose, n_splits=n_splits, num_workers=num_workers, dtype=dtype,
+        prediction_cache=prediction_cache
+    )
+    if model_cache is not None:
+        for key, predictions in predictions_dict.items():
+            if predictions is not None:
+                model_cache.put(fingerprints[key], (*predictions, selected_params_dict[key]))
+        for key, cached_entry in cached.items():
+            if cached_entry is not None:
+                *predictions_dict[key], selected_params_dict[key] = cached_entry
 
-    model_df = None
+    # The output DataFrames are assembled from the current DataFrames, so
+    # cached predictions never carry stale columns that are not hashed
+    models_data_dict = {}
+    for key, df in data_dict.items():
+        if predictions_dict[key] is None:
+            models_data_dict[key] = None
+            continue
+        positions, y_pred = predictions_dict[key]
+        model_df = df.iloc[positions].copy()
+        model_df['pred'] = y_pred.tolist()
+        models_data_dict[key] = model_df
+
+    return (
+        models_data_dict,
+        {key: selected_params_dict[key] for key in data_dict}
+    )
+
+
+def _backtest_predictions_batch(
+    data_dict: dict, features: list[str], target_col: str,
+    model_class: SKModel, param_grid: dict[str, np.array], *args,
+    pipeline_args: tuple[tuple] | None=None,
+    optimization_metric_func: Callable=precision_score, verbose=False,
+    n_splits=3, num_workers=1, dtype=np.float32,
+    prediction_cache: PredictionCache | None=None
+) -> tuple[dict, dict]:
+    param_combinations = param_grid_combinations(param_grid)
+
+    # (key, fold) -> [metric, param index, y_pred, params, val_index, estimator]
+    best = {}
+
+    def handle_result(task_key, result):
+        key, fold, param_index, val_index = task_key
+        metric, y_pred, params, estimator = result
+        current = best.get((key, fold))
+        if (
+            current is None or metric > current[0] or
+            (metric == current[0] and param_index < current[1])
+        ):
+            best[(key, fold)] = [metric, param_index, y_pred, params, val_index, estimator]
+
+        if (key, fold, param_index) in pending_predictions:
+            fingerprint, index = pending_predictions.pop((key, fold, param_index))
+            prediction_cache.put(fingerprint, key, pd.Series(y_pred, index=index))
+
+    # (key, fold, param index) -> [fingerprint, index]
+    pending_predictions = {}
+    data_hashes = {}
+
+    def cached_tasks(tasks):
+        # Resolves the candidates with the predictions of the fold
+        # cached without a fit
+        for task_key, task in tasks:
+            key, fold, param_index, val_index = task_key
+            index = training_matrix.index(key)[val_index]
+            if prediction_cache is None or verbose == True or not index.is_unique:
+                yield task_key, task
+                continue
+
+            X_train, y_train, _, y_test, params = task
+            if (key, fold) not in data_hashes:
+                data_hashes[(key, fold)] = training_data_hash(X_train, y_train)
+            fingerprint = model_fingerprint(
+                data_hashes[(key, fold)], model_class, params, pipeline_args
+            )
+            cached_pred = prediction_cache.get(fingerprint, key, index).to_numpy()
+            if not pd.isna(cached_pred).any():
+                handle_result(
+                    task_key, (
+                        optimization_metric_func(y_test, cached_pred), cached_pred,
+                        _build_estimator(model_class, params, pipeline_args).get_params(), None
+                    )
+                )
+                continue
+
+            pending_predictions[(key, fold, param_index)] = (fingerprint, index)
+            yield task_key, task
+
+    training_matrix = TrainingMatrix.from_frames(data_dict, features, target_col, dtype=dtype)
+    tasks = cached_tasks(_grid_search_tasks(training_matrix, param_combinations, n_splits))
+    fit_args = (model_class,)
+    fit_kwargs = (pipeline_args, optimization_metric_func, verbose)
     try:
-        for tr_index, val_index in ts_split.split(X):
-            X_train, X_test = X[tr_index], X[val_index]
-            y_train, y_test = y[tr_index], y[val_index]
-            model_pred_df = None
-            optimization_metric_val = -1
-            for params in param_combinations:
-                estimator = model_class(**params)
-                if pipeline_args is not None:
-                    estimator = Pipeline([*pipeline_args, ('estimator', estimator)])
-                estimator.fit(X_train, y_train)
-                y_pred = estimator.predict(X_test)
-                pred_df = df_copy.iloc[val_index].copy()
-                pred_df['pred'] = y_pred.tolist()
-                optimization_metric = optimization_metric_func(y_test, y_pred)
-                if model_pred_df is None:
-                    model_pred_df = pred_df
-                    optimization_metric_val = optimization_metric
-                elif optimization_metric > optimization_metric_val:
-                    model_pred_df = pred_df
-                    optimization_metric_val = optimization_metric
-            if model_df is None:
-                model_df = model_pred_df
-            else:
-                model_df = pd.concat([model_df, model_pred_df])
-            selected_params.append(estimator.get_params())
-
-            if verbose == True:
-                print_classification_model_metrics(
-                    estimator, X_train, X_test, y_train, y_test, y_pred
+        if num_workers == 1:
+            for task_key, (X_train, y_train, X_test, y_test, params) in tasks:
+                handle_result(
+                    task_key,
+                    _fit_candidate(X_train, y_train, X_test, y_test, *fit_args, params, *fit_kwargs)
                 )
+        else:
+            with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                max_in_flight = 2 * executor._max_workers
+                in_flight = {}
+                for task_key, (X_train, y_train, X_test, y_test, params) in tasks:
+                    future = executor.submit(
+                        _fit_candidate, X_train, y_train, X_test, y_test,
+                        *fit_args, params, *fit_kwargs
+                    )
+                    in_flight[future] = task_key
+                    if len(in_flight) >= max_in_flight:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for done_future in done:
+                            handle_result(in_flight.pop(done_future), done_future.result())
+                for future in as_completed(list(in_flight)):
+                    handle_result(in_flight.pop(future), future.result())
     except ValueError as e:
         print(e)
-    return model_df, selected_params
+
+    predictions_dict, selected_params_dict = {}, {}
+    for key in data_dict:
+        folds = sorted(fold for data_key, fold in best if data_key == key)
+        if not folds:
+            predictions_dict[key], selected_params_dict[key] = None, []
+            continue
+
+        fold_results = [best[(key, fold)] for fold in folds]
+        predictions_dict[key] = (
+            np.concatenate([result[4] for result in fold_results]),
+            np.concatenate([result[2] for result in fold_results])
+        )
+        selected_params_dict[key] = [result[3] for result in fold_results]
+
+        if verbose == True:
+            X, y = training_matrix.get(key)
+            for fold, (tr_index, val_index) in enumerate(TimeSeriesSplit(n_splits=n_splits).split(X)):
+                if (key, fold) in best:
+                    print_classification_model_metrics(
+                        best[(key, fold)][5], X[tr_index], X[val_index],
+                        y[tr_index], y[val_index], best[(key, fold)][2]
+                    )
+
+    return predictions_dict, selected_params_dict
+
+
+def create_backtest_models(
+    df: pd.DataFrame, features: list[str], target_col: str,
+    model_class: SKModel, param_grid: dict[str, np.array], *args,
+    pipeline_args: tuple[tuple] | None=None, 
+    optimization_metric_func: Callable=precision_score, verbose=False,
+    num_workers=1, model_cache: ModelCache | None=None, dtype=np.float32,
+    prediction_cache: PredictionCache | None=None
+) -> tuple[pd.DataFrame, list[dict]]:
+    models_data_dict, selected_params_dict = create_backtest_models_batch(
+        {None: df}, features, target_col, model_class, param_grid,
+        pipeline_args=pipeline_args, optimization_metric_func=optimization_metric_func,
+        verbose=verbose, num_workers=num_workers, model_cache=model_cache, dtype=dtype,
+        prediction_cache=prediction_cache
+    )
+    return models_data_dict[None], selected_params_dict[None]
 
 
 def create_inference_model(
     df: pd.DataFrame, features: list[str], target_col: str,
     model_class: SKModel, params: dict, *args,
-    pipeline_args: tuple[tuple] | None=None
+    pipeline_args: tuple[tuple] | None=None, model_cache: ModelCache | None=None,
+    dtype=np.float32
 ) -> SKModel:
-    df_copy = df.copy()
+    def fit_estimator():
+        X, y = TrainingMatrix.from_frames({None: df}, features, target_col, dtype=dtype).get(None)
 
-    X_df = df_copy[features]
-    y_df = df_copy[target_col]
+        estimator = _build_estimator(model_class, params, pipeline_args)
+        estimator.fit(X, y)
+        return estimator
 
-    X = X_df.to_numpy()
-    y = y_df.to_numpy()
+    if model_cache is None:
+        return fit_estimator()
 
-    estimator = model_class(**params)
-    if pipeline_args is not None:
-        estimator = Pipeline([*pipeline_args, ('estimator', estimator)])
-    estimator.fit(X, y)
-    return estimator
\ No newline at end of file
+    fingerprint = training_fingerprint(
+        df, features, target_col, model_class, params, pipeline_args,
+        model_type='inference', dtype=np.dtype(dtype).name
+    )
+    return model_cache.get_or_create(fingerprint, fit_estimator)
+
+def predict_latest_rows(
+    data_dict: dict, features: list[str], models: dict | SKModel, pred_col_name: str,
+    dtype=np.float32
+) -> dict:
+    """
+    Predicts the latest row of each DataFrame of data_dict and writes
+    the predictions to the pred_col_name column of the latest rows, in
+    place. The latest feature rows of all DataFrames sharing a model
+    are stacked into one matrix and predicted with a single call.
+
+    Parameters
+    ----------
+    :param data_dict:
+        'dict' : Pandas DataFrames with the features.
+    :param features:
+        'list' : The feature columns.
+    :param models:
+        'dict/SKModel' : A model shared by all DataFrames, or a dict
+        with the keys of data_dict and their models as values. Keys
+        missing from the dict are not predicted.
+    :param pred_col_name:
+        'str' : The column to write the predictions to.
+    :param dtype:
+        Keyword arg 'numpy dtype' : The dtype of the feature matrices,
+        the dtype the models were trained with, IncrementalModel objects
+        use their own. Default value=np.float32
+
+    :return:
+        'dict' : The given dict.
+    """
+
+    if not isinstance(models, dict):
+        models = dict.fromkeys(data_dict, models)
+
+    groups: dict[int, tuple[SKModel, list]] = {}
+    for key, model in models.items():
+        if key in data_dict and model is not None:
+            groups.setdefault(id(model), (model, []))[1].append(key)
+
+    for model, keys in groups.values():
+        # IncrementalModel objects know the dtype they were trained with
+        model_dtype = model.dtype if isinstance(model, IncrementalModel) else dtype
+        X = np.vstack(
+            [data_dict[key].iloc[-1:][features].to_numpy(dtype=model_dtype) for key in keys]
+        )
+        y_pred = np.asarray(model.predict(X))
+        for key, pred in zip(keys, y_pred):
+            data = data_dict[key]
+            if pred_col_name not in data.columns:
+                data[pred_col_name] = np.nan
+            col = data[pred_col_name]
+            if not np.can_cast(y_pred.dtype, col.dtype, casting='same_kind'):
+                data[pred_col_name] = col.astype(np.result_type(col.dtype, y_pred.dtype))
+            data.iloc[-1, data.columns.get_loc(pred_col_name)] = pred
+
+    return data_dict
+
+
+class IncrementalModel:
+    """
+    Wraps a fitted model whose final estimator implements partial_fit,
+    together with the index value of the latest row it has been trained
+    on, so that rows labeled after it can be fed to the model as they
+    become available. The transformers of a Pipeline keep the state of
+    their last full fit.
+
+    Parameters
+    ----------
+    model : 'SKModel'
+        A fitted model, or a Pipeline with a final estimator
+        implementing partial_fit.
+    last_trained_index : 'object'
+        The index value of the latest row the model was trained on.
+    dtype : Keyword arg 'numpy dtype'
+        The dtype of the feature matrix the model was trained with,
+        the rows fed to the model are cast to it. Default value=np.float32
+    """
+
+    def __init__(self, model: SKModel, last_trained_index, dtype=np.float32):
+        estimator = model.steps[-1][1] if isinstance(model, Pipeline) else model
+        if not hasattr(estimator, 'partial_fit'):
+            raise AttributeError('model should have a partial_fit method')
+
+        self.__model = model
+        self.__last_trained_index = last_trained_index
+        self.__num_of_updates = 0
+        self.__dtype = np.dtype(dtype)
+
+    def __setstate__(self, state):
+        # Models pickled before the dtype was stored were trained on float64
+        state.setdefault('_IncrementalModel__dtype', np.dtype(np.float64))
+        self.__dict__.update(state)
+
+    @property
+    def model(self) -> SKModel:
+        return self.__model
+
+    @property
+    def last_trained_index(self):
+        return self.__last_trained_index
+
+    @property
+    def num_of_updates(self):
+        return self.__num_of_updates
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.__dtype
+
+    def predict(self, X):
+        return self.__model.predict(X)
+
+    def partial_fit(
+        self, df: pd.DataFrame, features: list[str], target_col: str, target_period: int
+    ) -> int:
+        """
+        Feeds the rows of df after last_trained_index with a known
+        label, all rows except the last target_period rows, to the
+        model.
+
+        Parameters
+        ----------
+        :param df:
+            'Pandas DataFrame' : Data with the features and target,
+            with an index sorted in ascending order.
+        :param features:
+            'list' : The feature columns.
+        :param target_col:
+            'str' : The target column.
+        :param target_period:
+            'int' : The number of periods ahead the target is derived
+            from, the last target_period rows are not labeled yet.
+
+        :return:
+            'int' : The number of rows fed to the model.
+        """
+
+        labeled_df = df.iloc[:len(df) - target_period] if target_period > 0 else df
+        new_df = labeled_df[labeled_df.index > self.__last_trained_index]
+        new_df = new_df[new_df[target_col].notna()]
+        if new_df.empty:
+            return 0
+
+        X, y = TrainingMatrix.from_frames(
+            {None: new_df}, features, target_col, dtype=self.__dtype
+        ).get(None)
+        if isinstance(self.__model, Pipeline):
+            for _, transformer in self.__model.steps[:-1]:
+                X = transformer.transform(X)
+            self.__model.steps[-1][1].partial_fit(X, y)
+        else:
+            self.__model.partial_fit(X, y)
+
+        self.__last_trained_index = new_df.index[-1]
+        self.__num_of_updates += 1
+        return len(new_df)
@@ -0,0 +1,210 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from trading_systems.model_creation.model_cache import _stable_repr
+
+
+def training_data_hash(X_train: np.ndarray, y_train: np.ndarray):
+    """
+    Returns a hash of the training matrix and target vector of a model
+    fit, computed once per fold and shared by the candidates fitted on
+    it.
+
+    Parameters
+    ----------
+    :param X_train:
+        'numpy array' : The training matrix.
+    :param y_train:
+        'numpy array' : The target vector.
+
+    :return:
+        'str'
+    """
+
+    data_hash = hashlib.sha256(
+        _stable_repr([X_train.shape, X_train.dtype.str, y_train.dtype.str]).encode()
+    )
+    data_hash.update(np.ascontiguousarray(X_train).tobytes())
+    data_hash.update(np.ascontiguousarray(y_train).tobytes())
+    return data_hash.hexdigest()
+
+
+def model_fingerprint(data_hash: str, model_class, params: dict, pipeline_args=None):
+    """
+    Returns a hash of the inputs of a model fit, the hash of the
+    training data, the model class, its params and the pipeline steps,
+    that is stable across processes.
+
+    Parameters
+    ----------
+    :param data_hash:
+        'str' : The hash of the training data, see training_data_hash.
+    :param model_class:
+        'SKModel' : The model class.
+    :param params:
+        'dict' : The params of the model.
+    :param pipeline_args:
+        Keyword arg 'None/tuple' : Steps of a Pipeline that the model is
+        added to as the final step. Default value=None
+
+    :return:
+        'str'
+    """
+
+    spec = _stable_repr([data_hash, model_class, params, pipeline_args])
+    return hashlib.sha256(spec.encode()).hexdigest()[:32]
+
+
+class PredictionCache:
+    """
+    Local on-disk cache of the out of sample predictions of grid search
+    candidates in the Arrow IPC file format, one file of index values
+    and predictions per model fingerprint and instrument. A fingerprint
+    covers the training rows of a fold, so entries are reused by reruns
+    over unchanged data, e.g. repeated full runs or a param grid
+    extended with new candidates, and not after rows are appended,
+    which moves the TimeSeriesSplit fold boundaries. When the total size
+    of the cache exceeds max_bytes the least recently used files are
+    evicted. The files are listed once per cache object, on the first
+    write, and kept in an in-memory LRU index after that, so a write
+    costs O(1) amortized filesystem calls. pyarrow is only imported when
+    the cache is read or written.
+
+    Parameters
+    ----------
+    dir_path : 'str'
+        The directory of the cache.
+    max_bytes : Keyword arg 'None/int'
+        The maximum total size of the cache in bytes, no limit if None.
+        Default value=None
+    """
+
+    __PRED_COL = 'pred'
+
+    def __init__(self, dir_path, max_bytes=None):
+        self.__dir_path = dir_path
+        self.__max_bytes = max_bytes
+        # File paths and sizes in least recently used order and their
+        # total size, listed from the directory on the first write
+        self.__index: OrderedDict[str, int] | None = None
+        self.__size = 0
+        os.makedirs(dir_path, exist_ok=True)
+
+    def _file_path(self, fingerprint, instrument_id):
+        file_name = hashlib.sha256(repr((fingerprint, instrument_id)).encode()).hexdigest()[:32]
+        return os.path.join(self.__dir_path, f'{file_name}.arrow')
+
+    def _read(self, file_path) -> pd.Series | None:
+        if not os.path.exists(file_path):
+            return None
+        import pyarrow as pa
+        from pyarrow import ipc
+
+        os.utime(file_path)
+        if self.__index is not None and file_path in self.__index:
+            self.__index.move_to_end(file_path)
+        table = ipc.open_file(pa.memory_map(file_path)).read_all()
+        return table.to_pandas()[self.__PRED_COL]
+
+    def get(self, fingerprint, instrument_id, index: pd.Index) -> pd.Series:
+        """
+        Returns the cached predictions of a model for the given index
+        values of an instrument, joined on the index.
+
+        Parameters
+        ----------
+        :param fingerprint:
+            'str' : The fingerprint of the model.
+        :param instrument_id:
+            'object' : The id of the instrument.
+        :param index:
+            'Pandas Index' : The index values of the rows.
+
+        :return:
+            'Pandas Series' : NaN for rows without a cached prediction.
+        """
+
+        cached = self._read(self._file_path(fingerprint, instrument_id))
+        if cached is None:
+            return pd.Series(np.nan, index=index, name=self.__PRED_COL)
+        return cached.reindex(index)
+
+    def put(self, fingerprint, instrument_id, predictions: pd.Series):
+        """
+        Writes the predictions of a model and an instrument, replacing
+        any previous entry.
+
+        Parameters
+        ----------
+        :param fingerprint:
+            'str' : The fingerprint of the model.
+        :param instrument_id:
+            'object' : The id of the instrument.
+        :param predictions:
+            'Pandas Series' : The predictions, indexed like the rows.
+        """
+
+        import pyarrow as pa
+        from pyarrow import ipc
+
+        file_path = self._file_path(fingerprint, instrument_id)
+        table = pa.Table.from_pandas(
+            predictions.rename(self.__PRED_COL).to_frame(), preserve_index=True
+        )
+        with ipc.new_file(f'{file_path}.tmp', table.schema) as writer:
+            writer.write_table(table)
+        os.replace(f'{file_path}.tmp', file_path)
+
+        if self.__max_bytes is None:
+            return
+        if self.__index is None:
+            self.evict()
+        else:
+            size = os.path.getsize(file_path)
+            self.__size += size - self.__index.pop(file_path, 0)
+            self.__index[file_path] = size
+            self._evict_indexed()
+
+    def size(self):
+        """
+        Returns the total size of the cache in bytes.
+
+        :return:
+            'int'
+        """
+
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        for file_name in os.listdir(self.__dir_path):
+            if not file_name.endswith('.arrow'):
+                continue
+            file_path = os.path.join(self.__dir_path, file_name)
+            stat = os.stat(file_path)
+            yield file_path, stat.st_mtime, stat.st_size
+
+    def evict(self):
+        """
+        Lists the files of the cache, rebuilding the LRU index, and
+        removes the least recently used files until the total size of
+        the cache is within max_bytes.
+        """
+
+        if self.__max_bytes is None:
+            return
+
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        self.__index = OrderedDict((file_path, size) for file_path, _, size in entries)
+        self.__size = sum(self.__index.values())
+        self._evict_indexed()
+
+    def _evict_indexed(self):
+        while self.__size > self.__max_bytes and self.__index:
+            file_path, size = self.__index.popitem(last=False)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            self.__size -= size
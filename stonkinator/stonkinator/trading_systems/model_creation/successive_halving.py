@@ -0,0 +1,222 @@
+import math
+from typing import Callable
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import precision_score
+
+from trading_systems.model_creation.model_creation import (
+    SKModel, create_backtest_models_batch, param_grid_combinations
+)
+
+
+# The evaluate_func of the pool workers, set once per worker process
+_worker_evaluate_func: Callable | None = None
+
+
+def _init_worker(evaluate_func: Callable):
+    global _worker_evaluate_func
+    _worker_evaluate_func = evaluate_func
+
+
+def _evaluate_in_worker(candidate, budget):
+    return _worker_evaluate_func(candidate, budget)
+
+
+def successive_halving_search(
+    candidates: list, evaluate_func: Callable, budgets: list,
+    reduction_factor=2, num_workers=1
+) -> tuple[object, list[list[tuple[object, float]]]]:
+    """
+    Evaluates all candidates on the first, smallest, budget, retains the
+    best 1/reduction_factor of them and repeats with the next budget
+    until the budgets are exhausted or one candidate remains. The
+    candidates of each rung are evaluated in parallel on a process pool.
+    evaluate_func is sent to each worker process once, when the pool is
+    started, so data bound to it, e.g. the data_dict of
+    evaluate_backtest_model, is not pickled with every task.
+
+    Candidates can be params of a model, evaluated with
+    evaluate_backtest_model, or entry/exit args of a trading system,
+    evaluated with a function running a backtest and returning a metric
+    of it, e.g. on a subset of the instruments or a shorter history
+    given by the budget.
+
+    Parameters
+    ----------
+    :param candidates:
+        'list' : The candidates to search, e.g. param dicts.
+    :param evaluate_func:
+        'function' : A function taking a candidate and a budget and
+        returning a score to maximize. NaN scores rank last. It must be
+        picklable, e.g. a module level function or a partial of one, to
+        use a pool.
+    :param budgets:
+        'list' : The budgets of the rungs, in increasing order.
+    :param reduction_factor:
+        Keyword arg 'int' : The factor the number of candidates is
+        reduced by after each rung. Default value=2
+    :param num_workers:
+        Keyword arg 'None/int' : The max_workers argument passed to
+        ProcessPoolExecutor, the candidates are evaluated in the
+        current process if 1. Default value=1
+
+    :return:
+        'tuple' : The best candidate of the last rung, and a list of
+        the (candidate, score) tuples of each rung, sorted by score.
+    """
+
+    if not candidates:
+        raise ValueError('candidates should not be empty')
+
+    executor = ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_init_worker, initargs=(evaluate_func,)
+    ) if num_workers != 1 else None
+    rungs = []
+    survivors = list(candidates)
+    try:
+        for budget in budgets:
+            if executor is None:
+                scores = [evaluate_func(candidate, budget) for candidate in survivors]
+            else:
+                scores = list(
+                    executor.map(_evaluate_in_worker, survivors, [budget] * len(survivors))
+                )
+
+            # NaN scores rank last, ties keep the order of the candidates
+            sort_keys = np.nan_to_num(np.asarray(scores, dtype=float), nan=-np.inf)
+            order = np.argsort(-sort_keys, kind='stable')
+            rung = [(survivors[i], scores[i]) for i in order]
+            rungs.append(rung)
+
+            num_of_survivors = max(1, math.ceil(len(rung) / reduction_factor))
+            survivors = [candidate for candidate, _ in rung[:num_of_survivors]]
+            if len(survivors) == 1:
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best_candidate = rungs[-1][0][0] if rungs else survivors[0]
+    return best_candidate, rungs
+
+
+def evaluate_backtest_model(
+    params: dict, budget: dict, data_dict: dict, features: list[str], target_col: str,
+    model_class: SKModel, pipeline_args: tuple[tuple] | None=None,
+    optimization_metric_func: Callable=precision_score
+) -> float:
+    """
+    Scores params of a model by the optimization_metric_func of the out
+    of sample predictions of create_backtest_models_batch, pooled over
+    the instruments. Pass it to successive_halving_search as a partial
+    with the keyword args after budget bound.
+
+    Parameters
+    ----------
+    :param params:
+        'dict' : The params of the model.
+    :param budget:
+        'dict' : Optional 'n_splits', the number of TimeSeriesSplit
+        folds, 'num_of_instruments', the number of DataFrames of
+        data_dict to use, and 'history_fraction', the fraction of the
+        most recent rows of each DataFrame to use.
+    :param data_dict:
+        'dict' : Pandas DataFrames with the features and target.
+    :param features:
+        'list' : The feature columns.
+    :param target_col:
+        'str' : The target column.
+    :param model_class:
+        'SKModel' : The model class, instantiated with the params.
+    :param pipeline_args:
+        Keyword arg 'None/tuple' : Steps of a Pipeline that the model is
+        added to as the final step. Default value=None
+    :param optimization_metric_func:
+        Keyword arg 'function' : The metric of the predictions.
+        Default value=precision_score
+
+    :return:
+        'float' : NaN if no predictions could be made.
+    """
+
+    keys = list(data_dict.keys())[:budget.get('num_of_instruments')]
+    history_fraction = budget.get('history_fraction', 1.0)
+    budget_data_dict = {
+        key: data_dict[key].iloc[-max(1, int(len(data_dict[key]) * history_fraction)):]
+        for key in keys
+    }
+
+    models_data_dict, _ = create_backtest_models_batch(
+        budget_data_dict, features, target_col, model_class,
+        {param: [value] for param, value in params.items()},
+        pipeline_args=pipeline_args, optimization_metric_func=optimization_metric_func,
+        n_splits=budget.get('n_splits', 3)
+    )
+    model_dfs = [model_df for model_df in models_data_dict.values() if model_df is not None]
+    if not model_dfs:
+        return np.nan
+
+    model_df = pd.concat(model_dfs)
+    return optimization_metric_func(model_df[target_col].to_numpy(), model_df['pred'].to_numpy())
+
+
+def successive_halving_param_search(
+    data_dict: dict, features: list[str], target_col: str,
+    model_class: SKModel, param_grid: dict[str, np.array], budgets: list[dict],
+    pipeline_args: tuple[tuple] | None=None,
+    optimization_metric_func: Callable=precision_score,
+    reduction_factor=2, num_workers=1
+) -> tuple[dict, list[list[tuple[dict, float]]]]:
+    """
+    Searches the combinations of param_grid with
+    successive_halving_search and evaluate_backtest_model, as an
+    alternative to the exhaustive search of create_backtest_models for
+    large grids. The params found can be passed to
+    create_backtest_models or create_inference_model.
+
+    Parameters
+    ----------
+    :param data_dict:
+        'dict' : Pandas DataFrames with the features and target.
+    :param features:
+        'list' : The feature columns.
+    :param target_col:
+        'str' : The target column.
+    :param model_class:
+        'SKModel' : The model class, instantiated with the params.
+    :param param_grid:
+        'dict' : The values to search of each param.
+    :param budgets:
+        'list' : Budget dicts of the rungs, in increasing order, see
+        evaluate_backtest_model.
+    :param pipeline_args:
+        Keyword arg 'None/tuple' : Steps of a Pipeline that the model is
+        added to as the final step. Default value=None
+    :param optimization_metric_func:
+        Keyword arg 'function' : Metric of the predictions to maximize.
+        Default value=precision_score
+    :param reduction_factor:
+        Keyword arg 'int' : The factor the number of candidates is
+        reduced by after each rung. Default value=2
+    :param num_workers:
+        Keyword arg 'None/int' : The max_workers argument passed to
+        ProcessPoolExecutor. Default value=1
+
+    :return:
+        'tuple' : The best params, and the (params, score) tuples of
+        each rung.
+    """
+
+    evaluate_func = partial(
+        evaluate_backtest_model, data_dict=data_dict, features=features,
+        target_col=target_col, model_class=model_class, pipeline_args=pipeline_args,
+        optimization_metric_func=optimization_metric_func
+    )
+    return successive_halving_search(
+        param_grid_combinations(param_grid), evaluate_func, budgets,
+        reduction_factor=reduction_factor, num_workers=num_workers
+    )
+
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+
+class TrainingMatrix:
+    """
+    Feature matrix and target vector of one or more DataFrames, stacked
+    into preallocated contiguous arrays. The features are copied column
+    by column straight from the DataFrames, so no intermediate copies
+    of mixed dtype selections are made. The rows of each DataFrame are
+    a contiguous block of the arrays, returned as views by get, which
+    serves per-instrument training, while X and y serve pooled training.
+
+    Parameters
+    ----------
+    X : 'numpy array'
+        The feature matrix, of shape (rows, features).
+    y : 'None/numpy array'
+        The target vector.
+    features : 'list'
+        The feature columns.
+    keys : 'list'
+        The keys of the DataFrames, in the order of their blocks.
+    offsets : 'numpy array'
+        The start of the block of each key, followed by the number of
+        rows.
+    index_values : 'list'
+        The index of the rows of each block.
+    """
+
+    def __init__(self, X, y, features, keys, offsets, index_values):
+        self.__X = X
+        self.__y = y
+        self.__features = features
+        self.__keys = keys
+        self.__offsets = offsets
+        self.__index_values = index_values
+        self.__key_positions = {key: i for i, key in enumerate(keys)}
+
+    @classmethod
+    def from_frames(
+        cls, data_dict: dict, features: list[str], target_col: str | None=None,
+        dtype=np.float32, row_masks: dict | None=None
+    ) -> 'TrainingMatrix':
+        """
+        Builds a TrainingMatrix from the DataFrames of a dict.
+
+        Parameters
+        ----------
+        :param data_dict:
+            'dict' : Pandas DataFrames with the features and target.
+        :param features:
+            'list' : The feature columns.
+        :param target_col:
+            Keyword arg 'None/str' : The target column, no target vector
+            is built if None. Default value=None
+        :param dtype:
+            Keyword arg 'numpy dtype' : The dtype of the feature matrix.
+            Default value=np.float32
+        :param row_masks:
+            Keyword arg 'None/dict' : Boolean arrays by key selecting the
+            rows of the DataFrames to include, all rows are included for
+            keys without a mask. Default value=None
+
+        :return:
+            'TrainingMatrix'
+        """
+
+        row_masks = row_masks if row_masks is not None else {}
+        keys = list(data_dict.keys())
+        num_of_rows = [
+            int(np.count_nonzero(row_masks[key])) if key in row_masks else len(data_dict[key])
+            for key in keys
+        ]
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(num_of_rows, out=offsets[1:])
+
+        X = np.empty((offsets[-1], len(features)), dtype=dtype)
+        y = None
+        if target_col is not None:
+            y_dtype = np.result_type(*[data_dict[key][target_col].dtype for key in keys]) \
+                if keys else np.float64
+            y = np.empty(offsets[-1], dtype=y_dtype)
+
+        index_values = []
+        for i, key in enumerate(keys):
+            df = data_dict[key]
+            mask = row_masks.get(key)
+            start, end = offsets[i], offsets[i + 1]
+            for j, feature in enumerate(features):
+                values = df[feature].to_numpy()
+                X[start:end, j] = values if mask is None else values[mask]
+            if y is not None:
+                values = df[target_col].to_numpy()
+                y[start:end] = values if mask is None else values[mask]
+            index_values.append(df.index if mask is None else df.index[mask])
+
+        return cls(X, y, list(features), keys, offsets, index_values)
+
+    @property
+    def X(self) -> np.ndarray:
+        return self.__X
+
+    @property
+    def y(self) -> np.ndarray | None:
+        return self.__y
+
+    @property
+    def features(self) -> list[str]:
+        return list(self.__features)
+
+    @property
+    def keys(self) -> list:
+        return list(self.__keys)
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self.__offsets
+
+    def __len__(self):
+        return len(self.__X)
+
+    def rows(self, key) -> slice:
+        """
+        Returns the slice of the rows of a key.
+
+        Parameters
+        ----------
+        :param key:
+            'object' : A key of the DataFrames.
+
+        :return:
+            'slice'
+        """
+
+        i = self.__key_positions[key]
+        return slice(self.__offsets[i], self.__offsets[i + 1])
+
+    def get(self, key) -> tuple[np.ndarray, np.ndarray | None]:
+        """
+        Returns views of the feature matrix and target vector rows of a
+        key.
+
+        Parameters
+        ----------
+        :param key:
+            'object' : A key of the DataFrames.
+
+        :return:
+            'tuple'
+        """
+
+        rows = self.rows(key)
+        return self.__X[rows], None if self.__y is None else self.__y[rows]
+
+    def index(self, key) -> pd.Index:
+        """
+        Returns the index of the rows of a key.
+
+        Parameters
+        ----------
+        :param key:
+            'object' : A key of the DataFrames.
+
+        :return:
+            'Pandas Index'
+        """
+
+        return self.__index_values[self.__key_positions[key]]
+
+    def row_index(self) -> pd.MultiIndex:
+        """
+        Returns a MultiIndex of the (key, index value) of every row.
+
+        :return:
+            'Pandas MultiIndex'
+        """
+
+        keys = np.empty(len(self.__keys), dtype=object)
+        for i, key in enumerate(self.__keys):
+            keys[i] = key
+        return pd.MultiIndex.from_arrays(
+            [
+                np.repeat(keys, np.diff(self.__offsets)),
+                np.concatenate([np.asarray(index) for index in self.__index_values])
+                if self.__index_values else np.array([])
+            ]
+        )
@@ -1,12 +1,13 @@
-import random
-
 import pandas as pd
 
 from trading.data.metadata.trading_system_metrics import TradingSystemMetrics
 from trading.position.position import Position
 from trading.position.position_manager import PositionManager
+from trading.utils.equity_curve_store import EquityCurveStore, max_equity_curve_len
 from trading.utils.metric_functions import calculate_cagr
-from trading.utils.monte_carlo_functions import monte_carlo_simulations_plot
+from trading.utils.monte_carlo_functions import monte_carlo_simulations_plot, max_dd_pctl_key
+from trading.utils.quantile_sketches import QuantileSketch
+from trading.utils.resampling import ResamplingMethod, iter_resampled_indices
 
 from trading_systems.position_sizer.position_sizer import PositionSizer
 
@@ -43,10 +44,23 @@ class ExtPositionSizer(PositionSizer):
     def _monte_carlo_simulate_pos_sequence(
         self, positions: list[Position], num_testing_periods, start_capital,
         capital_fraction=1.0, num_of_sims=1000, data_fraction_used=0.66, 
-        symbol='', print_dataframe=False, plot_fig=False, **kwargs
+        symbol='', print_dataframe=False, plot_fig=False,
+        streaming_quantiles=False, max_dd_quantiles=(), plot_sample_size=100,
+        resampling_method=ResamplingMethod.SHUFFLE, block_len=None, rng=None,
+        retain_equity_curves=False, equity_curves_path=None, **kwargs
     ):
-        monte_carlo_sims_df = pd.DataFrame()
-        equity_curves_list = []
+        if retain_equity_curves and equity_curves_path is None:
+            raise ValueError('equity_curves_path is required to retain equity curves')
+        sequence_len = max(len(positions), int(len(positions) * data_fraction_used + 0.5))
+        equity_curves = None
+        if retain_equity_curves or plot_fig:
+            equity_curves = EquityCurveStore(
+                min(num_of_sims, plot_sample_size) if streaming_quantiles else num_of_sims,
+                max_equity_curve_len(positions, min(sequence_len, int(sequence_len * data_fraction_used + 0.5))),
+                path=equity_curves_path
+            )
+
+        monte_carlo_sims_data = []
         final_equity_list = []
         max_drawdowns_list = []
         sim_positions = None
@@ -55,63 +69,96 @@ class ExtPositionSizer(PositionSizer):
             for pos in position_list[:int(len(position_list) * data_fraction_used + 0.5)]:
                 yield pos
 
-        for _ in range(num_of_sims):
+        if streaming_quantiles:
+            final_equity_sketch = QuantileSketch((0.25, 0.75))
+            max_drawdown_sketch = QuantileSketch(max_dd_quantiles)
+
+        sim_indices = iter_resampled_indices(
+            resampling_method, len(positions), num_of_sims,
+            length=sequence_len, block_len=block_len, rng=rng
+        )
+        for n, indices in enumerate(sim_indices):
             sim_positions = PositionManager(
                 symbol, int(num_testing_periods * data_fraction_used + 0.5), start_capital,
                 capital_fraction
             )
 
-            pos_list = random.sample(positions, len(positions))
+            pos_list = [positions[i] for i in indices]
             sim_positions.generate_positions(generate_pos_sequence, pos_list)
-            monte_carlo_sims_df: pd.DataFrame = pd.concat(
-                [monte_carlo_sims_df, pd.DataFrame([sim_positions.metrics.summary_data_dict])], 
-                ignore_index=True
-            )
-            final_equity_list.append(float(sim_positions.metrics.equity_list[-1]))
-            max_drawdowns_list.append(sim_positions.metrics.max_drawdown)
-            equity_curves_list.append(sim_positions.metrics.equity_list)
+            final_equity = float(sim_positions.metrics.equity_list[-1])
+            max_drawdown = sim_positions.metrics.max_drawdown
+
+            if streaming_quantiles:
+                final_equity_sketch.update(final_equity)
+                max_drawdown_sketch.update(max_drawdown)
+                if n >= plot_sample_size:
+                    continue
+
+            monte_carlo_sims_data.append(sim_positions.metrics.summary_data_dict)
+            final_equity_list.append(final_equity)
+            max_drawdowns_list.append(max_drawdown)
+            if equity_curves is not None:
+                equity_curves.append(sim_positions.metrics.equity_list)
 
         final_equity_list = sorted(final_equity_list)
 
+        if streaming_quantiles:
+            final_equity_pctl25 = final_equity_sketch[0.25]
+            final_equity_pctl75 = final_equity_sketch[0.75]
+        else:
+            final_equity_pctl25 = final_equity_list[(int(len(final_equity_list) * 0.25))]
+            final_equity_pctl75 = final_equity_list[(int(len(final_equity_list) * 0.75))]
+
         car25 = calculate_cagr(
-            sim_positions.metrics.start_capital, 
-            final_equity_list[(int(len(final_equity_list) * 0.25))],
+            sim_positions.metrics.start_capital,
+            final_equity_pctl25,
             sim_positions.metrics.num_testing_periods
         )
         car75 = calculate_cagr(
             sim_positions.metrics.start_capital,
-            final_equity_list[(int(len(final_equity_list) * 0.75))],
+            final_equity_pctl75,
             sim_positions.metrics.num_testing_periods
         )
 
-        car_df = pd.DataFrame.from_dict({'car25': [car25], 'car75': [car75]})
-        monte_carlo_sims_df = pd.concat([monte_carlo_sims_df, car_df], ignore_index=True)
+        car_data = {'car25': car25, 'car75': car75}
+        if streaming_quantiles:
+            for quantile, max_dd in max_drawdown_sketch.quantiles.items():
+                car_data[max_dd_pctl_key(quantile)] = max_dd
+        monte_carlo_sims_df = pd.DataFrame(monte_carlo_sims_data + [car_data])
 
         if print_dataframe:
             print(monte_carlo_sims_df.to_string())
         if plot_fig:
             monte_carlo_simulations_plot(
-                symbol, equity_curves_list, max_drawdowns_list, final_equity_list,
+                symbol, equity_curves, max_drawdowns_list, final_equity_list,
                 capital_fraction, car25, car75
             )
+        if equity_curves is not None:
+            equity_curves.close()
 
         return monte_carlo_sims_df
 
     def __call__(
         self, position_list: list[Position], num_of_periods, 
         persistant_safe_f=None, capital=10000, forecast_data_fraction=0.66,
-        **kwargs
+        streaming_quantiles=False, **kwargs
     ):
         position_list.sort(key=lambda pos: pos.entry_dt)
 
         monte_carlo_sims_df: pd.DataFrame = self._monte_carlo_simulate_pos_sequence(
             position_list, num_of_periods, capital, 
             data_fraction_used=forecast_data_fraction,
+            streaming_quantiles=streaming_quantiles,
+            max_dd_quantiles=(self.__max_dd_pctl_threshold,),
             **kwargs
         )
 
-        max_dds = sorted(monte_carlo_sims_df[TradingSystemMetrics.MAX_DRAWDOWN].to_list())
-        dd_at_tolerated_threshold = max_dds[int(len(max_dds) * self.__max_dd_pctl_threshold)]
+        if streaming_quantiles:
+            dd_at_tolerated_threshold = \
+                monte_carlo_sims_df.iloc[-1][max_dd_pctl_key(self.__max_dd_pctl_threshold)]
+        else:
+            max_dds = sorted(monte_carlo_sims_df[TradingSystemMetrics.MAX_DRAWDOWN].to_list())
+            dd_at_tolerated_threshold = max_dds[int(len(max_dds) * self.__max_dd_pctl_threshold)]
         if dd_at_tolerated_threshold < 1:
             dd_at_tolerated_threshold = 1
 
@@ -0,0 +1,83 @@
+import numpy as np
+
+from trading.position.position import Position
+from trading.utils.metric_functions import calculate_cagr
+from trading.utils.monte_carlo_functions import monte_carlo_simulate_portfolio
+from trading.utils.resampling import ResamplingMethod
+
+from trading_systems.position_sizer.position_sizer import PositionSizer
+
+
+class PortfolioPositionSizer(PositionSizer):
+    """
+    Calculates a system level safe-F by simulating the positions of
+    all instruments as one portfolio on a shared capital base, see
+    monte_carlo_simulate_portfolio. Unlike ExtPositionSizer, which
+    trades the pooled positions one after another, concurrent positions
+    are kept together so their overlapping exposure is accounted for.
+
+    Parameters
+    ----------
+    tolerated_pct_max_drawdown : 'int/float'
+        The percentage amount of drawdown that will be tolerated.
+    max_drawdown_percentile_threshold : 'float'
+        The percentile of the distribution of maximum drawdowns
+        to act as a threshold for the tolerated maximum drawdown.
+    """
+
+    __POSITION_SIZE_METRIC_STR = 'safe-f'
+    __CAPITAL_FRACTION = 'capital_fraction'
+    __PERSISTANT_SAFE_F = 'persistant_safe_f'
+    __CAR25 = 'car25'
+    __CAR75 = 'car75'
+
+    def __init__(self, tolerated_pct_max_drawdown, max_drawdown_percentile_threshold):
+        self.__tol_pct_max_dd = tolerated_pct_max_drawdown
+        self.__max_dd_pctl_threshold = max_drawdown_percentile_threshold
+        self.__position_sizer_data_dict = {}
+
+    @property
+    def position_size_metric_str(self):
+        return self.__POSITION_SIZE_METRIC_STR
+
+    @property
+    def position_sizer_data_dict(self) -> dict:
+        return self.__position_sizer_data_dict
+
+    def get_position_sizer_data_dict(self) -> dict:
+        return self.__position_sizer_data_dict
+
+    def __call__(
+        self, position_list: list[Position], num_of_periods,
+        persistant_safe_f=None, capital=None, forecast_data_fraction=0.66,
+        num_of_sims=2500, resampling_method=ResamplingMethod.STATIONARY,
+        block_len=None, rng=None, **kwargs
+    ):
+        position_list = [pos for pos in position_list if pos.entry_dt and pos.exit_dt]
+        if not position_list:
+            return
+
+        final_equity, max_dds, capital, sim_periods = monte_carlo_simulate_portfolio(
+            position_list, start_capital=capital, num_of_sims=num_of_sims,
+            data_fraction_used=forecast_data_fraction, resampling_method=resampling_method,
+            block_len=block_len, rng=rng
+        )
+        final_equity = np.sort(final_equity)
+        max_dds = np.sort(max_dds)
+
+        dd_at_tolerated_threshold = max_dds[int(len(max_dds) * self.__max_dd_pctl_threshold)]
+        if dd_at_tolerated_threshold < 1:
+            dd_at_tolerated_threshold = 1
+
+        safe_f = persistant_safe_f if persistant_safe_f else \
+            self.__tol_pct_max_dd / dd_at_tolerated_threshold
+
+        self.__position_sizer_data_dict[self.__POSITION_SIZE_METRIC_STR] = safe_f
+        self.__position_sizer_data_dict[self.__CAPITAL_FRACTION] = safe_f
+        self.__position_sizer_data_dict[self.__PERSISTANT_SAFE_F] = safe_f
+        self.__position_sizer_data_dict[self.__CAR25] = calculate_cagr(
+            capital, final_equity[int(len(final_equity) * 0.25)], sim_periods
+        )
+        self.__position_sizer_data_dict[self.__CAR75] = calculate_cagr(
+            capital, final_equity[int(len(final_equity) * 0.75)], sim_periods
+        )
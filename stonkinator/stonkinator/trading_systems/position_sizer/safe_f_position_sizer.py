@@ -1,13 +1,15 @@
-import random
-
 import pandas as pd
 
 from trading.data.metadata.trading_system_attributes import TradingSystemAttributes
 from trading.data.metadata.trading_system_metrics import TradingSystemMetrics
 from trading.position.position import Position
 from trading.position.position_manager import PositionManager
+from trading.utils.equity_curve_store import EquityCurveStore, max_equity_curve_len
 from trading.utils.metric_functions import calculate_cagr
-from trading.utils.monte_carlo_functions import monte_carlo_simulations_plot
+from trading.utils.monte_carlo_functions import monte_carlo_simulations_plot, max_dd_pctl_key, \
+    monte_carlo_simulate_positions_batch
+from trading.utils.quantile_sketches import QuantileSketch
+from trading.utils.resampling import ResamplingMethod, iter_resampled_indices
 
 from trading_systems.position_sizer.position_sizer import PositionSizer
 
@@ -53,64 +55,105 @@ class SafeFPositionSizer(PositionSizer):
     def _monte_carlo_simulate_pos_sequence(
         self, positions: list[Position], num_testing_periods, start_capital, instrument_id,
         capital_fraction=1.0, num_of_sims=1000, data_fraction_used=0.66,
-        print_dataframe=False, plot_fig=False, **kwargs
+        print_dataframe=False, plot_fig=False,
+        streaming_quantiles=False, max_dd_quantiles=(), plot_sample_size=100,
+        resampling_method=ResamplingMethod.SHUFFLE, block_len=None, rng=None,
+        retain_equity_curves=False, equity_curves_path=None, **kwargs
     ):
-        monte_carlo_sims_df = pd.DataFrame()
+        if retain_equity_curves and equity_curves_path is None:
+            raise ValueError('equity_curves_path is required to retain equity curves')
+        sequence_len = max(len(positions), int(len(positions) * data_fraction_used + 0.5))
+        equity_curves = None
+        if retain_equity_curves or plot_fig:
+            equity_curves = EquityCurveStore(
+                min(num_of_sims, plot_sample_size) if streaming_quantiles else num_of_sims,
+                max_equity_curve_len(positions, min(sequence_len, int(sequence_len * data_fraction_used + 0.5))),
+                path=equity_curves_path
+            )
+
+        monte_carlo_sims_data = []
         final_equity_list = []
         max_drawdowns_list = []
-        equity_curves_list = []
         sim_positions = None
 
         def generate_position_sequence(position_list, **kw):
             for pos in position_list[:int(len(position_list) * data_fraction_used + 0.5)]:
                 yield pos
 
-        for _ in range(num_of_sims):
+        if streaming_quantiles:
+            final_equity_sketch = QuantileSketch((0.25, 0.75))
+            max_drawdown_sketch = QuantileSketch(max_dd_quantiles)
+
+        sim_indices = iter_resampled_indices(
+            resampling_method, len(positions), num_of_sims,
+            length=sequence_len, block_len=block_len, rng=rng
+        )
+        for n, indices in enumerate(sim_indices):
             sim_positions = PositionManager(
                 instrument_id, int(num_testing_periods * data_fraction_used + 0.5), start_capital,
                 capital_fraction
             )
 
-            pos_list = random.sample(positions, len(positions))
+            pos_list = [positions[i] for i in indices]
             sim_positions.generate_positions(generate_position_sequence, pos_list)
-            monte_carlo_sims_df: pd.DataFrame = pd.concat(
-                [monte_carlo_sims_df, pd.DataFrame([sim_positions.metrics.summary_data_dict])], 
-                ignore_index=True
-            )
-            final_equity_list.append(float(sim_positions.metrics.equity_list[-1]))
-            max_drawdowns_list.append(sim_positions.metrics.max_drawdown)
-            equity_curves_list.append(sim_positions.metrics.equity_list)
+            final_equity = float(sim_positions.metrics.equity_list[-1])
+            max_drawdown = sim_positions.metrics.max_drawdown
+
+            if streaming_quantiles:
+                final_equity_sketch.update(final_equity)
+                max_drawdown_sketch.update(max_drawdown)
+                if n >= plot_sample_size:
+                    continue
+
+            monte_carlo_sims_data.append(sim_positions.metrics.summary_data_dict)
+            final_equity_list.append(final_equity)
+            max_drawdowns_list.append(max_drawdown)
+            if equity_curves is not None:
+                equity_curves.append(sim_positions.metrics.equity_list)
 
         final_equity_list = sorted(final_equity_list)
 
+        if streaming_quantiles:
+            final_equity_pctl25 = final_equity_sketch[0.25]
+            final_equity_pctl75 = final_equity_sketch[0.75]
+        else:
+            final_equity_pctl25 = final_equity_list[(int(len(final_equity_list) * 0.25))]
+            final_equity_pctl75 = final_equity_list[(int(len(final_equity_list) * 0.75))]
+
         car25 = calculate_cagr(
             sim_positions.metrics.start_capital,
-            final_equity_list[(int(len(final_equity_list) * 0.25))],
+            final_equity_pctl25,
             sim_positions.metrics.num_testing_periods
         )
         car75 = calculate_cagr(
             sim_positions.metrics.start_capital,
-            final_equity_list[(int(len(final_equity_list) * 0.75))],
+            final_equity_pctl75,
             sim_positions.metrics.num_testing_periods
         )
 
-        car_df = pd.DataFrame.from_dict({'car25': [car25], 'car75': [car75]})
-        monte_carlo_sims_df = pd.concat([monte_carlo_sims_df, car_df], ignore_index=True)
+        car_data = {'car25': car25, 'car75': car75}
+        if streaming_quantiles:
+            for quantile, max_dd in max_drawdown_sketch.quantiles.items():
+                car_data[max_dd_pctl_key(quantile)] = max_dd
+        monte_carlo_sims_df = pd.DataFrame(monte_carlo_sims_data + [car_data])
 
         if print_dataframe:
             print(monte_carlo_sims_df.to_string())
         if plot_fig:
             monte_carlo_simulations_plot(
-                instrument_id, equity_curves_list, max_drawdowns_list, final_equity_list,
+                instrument_id, equity_curves, max_drawdowns_list, final_equity_list,
                 capital_fraction, car25, car75
             )
+        if equity_curves is not None:
+            equity_curves.close()
 
         return monte_carlo_sims_df
 
     def __call__(
         self, position_list: list[Position], num_of_periods, instrument_id,
         avg_yearly_periods=251, years_to_forecast=2, persistant_safe_f=None,
-        capital=10000, num_of_sims=2500, plot_fig=False, 
+        capital=10000, num_of_sims=2500, plot_fig=False, streaming_quantiles=False,
+        resampling_method=ResamplingMethod.SHUFFLE, block_len=None,
         **kwargs
     ):
         position_list = position_list if position_list[-1].entry_dt else position_list[:-1]
@@ -129,15 +172,21 @@ class SafeFPositionSizer(PositionSizer):
         monte_carlo_sims_df: pd.DataFrame = self._monte_carlo_simulate_pos_sequence(
             position_list, num_of_periods, capital, instrument_id,
             capital_fraction=persistant_safe_f[instrument_id] if instrument_id in persistant_safe_f else 1.0,
-            num_of_sims=num_of_sims, data_fraction_used=forecast_data_fraction, plot_fig=plot_fig 
+            num_of_sims=num_of_sims, data_fraction_used=forecast_data_fraction, plot_fig=plot_fig,
+            streaming_quantiles=streaming_quantiles, max_dd_quantiles=(self.__max_dd_pctl_threshold,),
+            resampling_method=resampling_method, block_len=block_len
         )
 
-        # sort the Max drawdown column and convert to a list
-        max_dds = sorted(monte_carlo_sims_df[TradingSystemMetrics.MAX_DRAWDOWN].to_list())
-        # get the drawdown value at the percentile set to be the threshold at which to limit the 
-        # probability of getting a max drawdown of that magnitude at when simulating sequences 
-        # of the best estimate positions
-        dd_at_tolerated_threshold = max_dds[int(len(max_dds) * self.__max_dd_pctl_threshold)]
+        if streaming_quantiles:
+            dd_at_tolerated_threshold = \
+                monte_carlo_sims_df.iloc[-1][max_dd_pctl_key(self.__max_dd_pctl_threshold)]
+        else:
+            # sort the Max drawdown column and convert to a list
+            max_dds = sorted(monte_carlo_sims_df[TradingSystemMetrics.MAX_DRAWDOWN].to_list())
+            # get the drawdown value at the percentile set to be the threshold at which to limit the 
+            # probability of getting a max drawdown of that magnitude at when simulating sequences 
+            # of the best estimate positions
+            dd_at_tolerated_threshold = max_dds[int(len(max_dds) * self.__max_dd_pctl_threshold)]
         if dd_at_tolerated_threshold < 1:
             dd_at_tolerated_threshold = 1
 
@@ -151,3 +200,115 @@ class SafeFPositionSizer(PositionSizer):
         self.__position_sizer_data_dict[self.__PERSISTANT_SAFE_F][instrument_id] = safe_f
         self.__position_sizer_data_dict[self.__CAR25][instrument_id] = monte_carlo_sims_df.iloc[-1][self.__CAR25]
         self.__position_sizer_data_dict[self.__CAR75][instrument_id] = monte_carlo_sims_df.iloc[-1][self.__CAR75]
+
+    def size_batch(
+        self, positions_dict: dict[str, list[Position]], num_of_periods_dict: dict[str, int],
+        avg_yearly_periods=251, years_to_forecast=2, persistant_safe_f=None,
+        capital=10000, num_of_sims=2500, resampling_method=ResamplingMethod.SHUFFLE,
+        block_len=None, rng=None, num_workers=4, **kwargs
+    ) -> pd.DataFrame:
+        """
+        Sizes the positions of many instruments in a single vectorized
+        Monte Carlo simulation, see monte_carlo_simulate_positions_batch.
+        The results are stored per instrument the same way as when
+        calling the position sizer once per instrument.
+
+        Parameters
+        ----------
+        :param positions_dict:
+            'dict' : Position objects keyed by instrument id.
+        :param num_of_periods_dict:
+            'dict' : The number of periods in the data that the positions
+            were generated from, keyed by instrument id.
+        :param avg_yearly_periods:
+            Keyword arg 'int' : The number of periods in a trading year.
+            Default value=251
+        :param years_to_forecast:
+            Keyword arg 'int' : The number of years to forecast.
+            Default value=2
+        :param persistant_safe_f:
+            Keyword arg 'None/dict' : Safe-F values keyed by instrument id
+            that should be kept instead of being recalculated.
+            Default value=None
+        :param capital:
+            Keyword arg 'int/float' : The amount of starting capital.
+            Default value=10000
+        :param num_of_sims:
+            Keyword arg 'int' : The number of simulations per instrument.
+            Default value=2500
+        :param resampling_method:
+            Keyword arg 'ResamplingMethod/str' : How to resample the
+            sequences of positions. Default value=ResamplingMethod.SHUFFLE
+        :param block_len:
+            Keyword arg 'None/int' : The (mean) block length of the
+            bootstrap resampling methods. Default value=None
+        :param rng:
+            Keyword arg 'None/numpy Generator' : Random number generator.
+            Default value=None
+        :param num_workers:
+            Keyword arg 'None/int' : The number of worker threads.
+            Default value=4
+
+        :return:
+            'Pandas DataFrame' : The safe-F, CAR25 and CAR75 of each
+            instrument, indexed by instrument id.
+        """
+
+        persistant_safe_f = {} if persistant_safe_f is None else persistant_safe_f
+        instrument_ids, positions_list, num_of_sim_positions, num_of_sim_periods = [], [], [], []
+        for instrument_id, position_list in positions_dict.items():
+            num_of_periods = num_of_periods_dict.get(instrument_id)
+            if not position_list or not num_of_periods:
+                continue
+            position_list = position_list if position_list[-1].entry_dt else position_list[:-1]
+            if not position_list:
+                continue
+
+            avg_yearly_positions = len(position_list) / (num_of_periods / avg_yearly_periods)
+            forecast_positions = avg_yearly_positions * (years_to_forecast * 1.5)
+            forecast_data_fraction = (avg_yearly_positions * years_to_forecast) / forecast_positions
+
+            position_list.sort(key=lambda pos: pos.entry_dt)
+            instrument_ids.append(instrument_id)
+            positions_list.append(position_list)
+            num_of_sim_positions.append(max(1, int(len(position_list) * forecast_data_fraction + 0.5)))
+            num_of_sim_periods.append(int(num_of_periods * forecast_data_fraction + 0.5))
+
+        if not instrument_ids:
+            return pd.DataFrame(columns=[self.__POSITION_SIZE_METRIC_STR, self.__CAR25, self.__CAR75])
+
+        final_equity, max_dds = monte_carlo_simulate_positions_batch(
+            positions_list, num_of_sim_positions, start_capital=capital,
+            num_of_sims=num_of_sims, resampling_method=resampling_method,
+            block_len=block_len, rng=rng, num_workers=num_workers
+        )
+        final_equity.sort(axis=1)
+        max_dds.sort(axis=1)
+
+        for i, instrument_id in enumerate(instrument_ids):
+            dd_at_tolerated_threshold = max_dds[i, int(num_of_sims * self.__max_dd_pctl_threshold)]
+            if dd_at_tolerated_threshold < 1:
+                dd_at_tolerated_threshold = 1
+
+            if not instrument_id in persistant_safe_f:
+                safe_f = self.__tol_pct_max_dd / dd_at_tolerated_threshold
+            else:
+                safe_f = persistant_safe_f[instrument_id]
+
+            self.__position_sizer_data_dict[self.__POSITION_SIZE_METRIC_STR][instrument_id] = safe_f
+            self.__position_sizer_data_dict[self.__CAPITAL_FRACTION][instrument_id] = safe_f
+            self.__position_sizer_data_dict[self.__PERSISTANT_SAFE_F][instrument_id] = safe_f
+            self.__position_sizer_data_dict[self.__CAR25][instrument_id] = calculate_cagr(
+                capital, final_equity[i, int(num_of_sims * 0.25)], num_of_sim_periods[i]
+            )
+            self.__position_sizer_data_dict[self.__CAR75][instrument_id] = calculate_cagr(
+                capital, final_equity[i, int(num_of_sims * 0.75)], num_of_sim_periods[i]
+            )
+
+        return pd.DataFrame(
+            {
+                metric: [self.__position_sizer_data_dict[metric][instrument_id] for instrument_id in instrument_ids]
+                for metric in (self.__POSITION_SIZE_METRIC_STR, self.__CAR25, self.__CAR75)
+            },
+            index=pd.Index(instrument_ids, name=TradingSystemAttributes.INSTRUMENT_ID)
+        )
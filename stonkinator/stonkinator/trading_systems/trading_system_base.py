@@ -9,6 +9,8 @@ from persistance.persistance_meta_classes.securities_service import SecuritiesSe
 from persistance.persistance_meta_classes.trading_systems_persister import TradingSystemsPersisterBase
 
 from trading_systems.model_creation.model_creation import SKModel
+from trading_systems.model_creation.model_cache import ModelCache
+from trading_systems.model_creation.prediction_cache import PredictionCache
 from trading_systems.trading_system_properties import TradingSystemProperties
 
 
@@ -76,6 +78,18 @@ class MLTradingSystemBase(TradingSystemBase):
     def target_period(cls) -> int:
         ...
 
+    @classproperty
+    def incremental_training(cls) -> bool:
+        # Systems with models implementing partial_fit can override this to
+        # update their models with newly labeled rows between full runs.
+        return False
+
+    @classproperty
+    def full_refit_interval(cls) -> int | None:
+        # The number of incremental updates after which the daily run refits
+        # the models on the full history with operate_models.
+        return None
+
     @staticmethod
     @abstractmethod
     def create_backtest_models() -> dict[tuple[str, str], pd.DataFrame] | pd.DataFrame:
@@ -95,7 +109,9 @@ class MLTradingSystemBase(TradingSystemBase):
         data_dict: dict[tuple[str, str], pd.DataFrame],
         features: list[str] | pd.DataFrame,
         model_class: SKModel,
-        params: dict
+        params: dict,
+        model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ) -> dict[tuple[str, str], pd.DataFrame] | pd.DataFrame:
         ...
 
@@ -110,6 +126,16 @@ class MLTradingSystemBase(TradingSystemBase):
     ) -> dict[tuple[str, str], pd.DataFrame]:
         ...
 
+    @classmethod
+    def update_models(
+        cls,
+        trading_system_id: str,
+        trading_systems_persister: TradingSystemsPersisterBase,
+        data_dict: dict[tuple [str, str], pd.DataFrame],
+        features: list[str] | pd.DataFrame
+    ) -> bool:
+        raise NotImplementedError("should implement 'update_models()' if 'incremental_training' is True")
+
     @staticmethod
     @abstractmethod
     def preprocess_data() -> tuple[dict[tuple[str, str], pd.DataFrame], list[str] | pd.DataFrame]:
@@ -30,8 +30,10 @@ from trading_systems.trading_system_properties import MLTradingSystemProperties
 from trading_systems.trading_system_handler import TradingSystemProcessor
 from trading_systems.position_sizer.safe_f_position_sizer import SafeFPositionSizer
 from trading_systems.model_creation.model_creation import (
-    SKModel, create_backtest_models, create_inference_model
+    SKModel, create_backtest_models, create_inference_model, predict_latest_rows
 )
+from trading_systems.model_creation.model_cache import ModelCache
+from trading_systems.model_creation.prediction_cache import PredictionCache
 
 from data_frame_service import meta_labeling_example
 
@@ -109,13 +111,14 @@ class MetaLabelingExample(MLTradingSystemBase):
         model_class: SKModel, param_grid: dict,
         pipeline_args: tuple[tuple] | None=None, 
         optimization_metric_func: Callable=f1_score,
-        verbose=False
+        verbose=False, model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ) -> pd.DataFrame:
         model_data, selected_params = create_backtest_models(
             data, features, target, model_class, param_grid,
             pipeline_args=pipeline_args,
             optimization_metric_func=optimization_metric_func,
-            verbose=verbose
+            verbose=verbose, model_cache=model_cache, prediction_cache=prediction_cache
         )
         if verbose == True:
             # TODO: do something with selected_params to determine which params to use for inference models
@@ -126,22 +129,28 @@ class MetaLabelingExample(MLTradingSystemBase):
     def create_inference_models(
         data: pd.DataFrame, features: list[str], target: str,
         model_class: SKModel, params: dict,
-        pipeline_args: tuple[tuple] | None=None
+        pipeline_args: tuple[tuple] | None=None, model_cache: ModelCache | None=None
     ) -> SKModel:
         return create_inference_model(
             data, features, target, model_class, params,
-            pipeline_args=pipeline_args
+            pipeline_args=pipeline_args, model_cache=model_cache
         )
 
     @classmethod
     def operate_models(
         cls, trading_system_id: str, trading_systems_persister: TradingSystemsPersisterBase,
-        _, data: pd.DataFrame, model_class: SKModel, params: dict
+        _, data: pd.DataFrame, model_class: SKModel, params: dict,
+        model_cache: ModelCache | None=None, prediction_cache: PredictionCache | None=None
     ) -> pd.DataFrame:
         features = meta_labeling_example.FEATURES
         target = cls.target
-        model_data = cls.create_backtest_models(data, features, target, model_class, params)
-        inference_model = cls.create_inference_models(data, features, target, model_class, params)
+        model_data = cls.create_backtest_models(
+            data, features, target, model_class, params, model_cache=model_cache,
+            prediction_cache=prediction_cache
+        )
+        inference_model = cls.create_inference_models(
+            data, features, target, model_class, params, model_cache=model_cache
+        )
         trading_systems_persister.insert_trading_system_model(trading_system_id, inference_model)
         return model_data
 
@@ -160,22 +169,16 @@ class MetaLabelingExample(MLTradingSystemBase):
 
         features = meta_labeling_example.FEATURES
         entry_label_true_symbols = data[TradingSystemAttributes.SYMBOL].unique()
+        models_dict = {}
         for instrument in data_dict.keys():
             _, symbol = instrument
             if symbol in entry_label_true_symbols:
-                symbol_data = data_dict.get(instrument)
-                latest_data_point = symbol_data.iloc[-1].copy()
-                pred_data = latest_data_point[features].to_numpy()
-                latest_data_point[TradingSystemAttributes.PRED_COL] = (
-                    model_pipeline.predict(pred_data.reshape(1, -1))[0]
-                )
-                latest_data_point_df = pd.DataFrame(latest_data_point).transpose()
-                data_dict[instrument] = pd.concat(
-                    [data_dict[instrument].iloc[:-1], latest_data_point_df]
-                )
+                models_dict[instrument] = model_pipeline
             else:
                 data_dict[instrument][TradingSystemAttributes.PRED_COL] = False
-        return data_dict
+        return predict_latest_rows(
+            data_dict, features, models_dict, TradingSystemAttributes.PRED_COL
+        )
 
     @staticmethod
     def add_entry_signal_label(data_dict: dict[tuple[str, str], pd.DataFrame], model_data: pd.DataFrame):
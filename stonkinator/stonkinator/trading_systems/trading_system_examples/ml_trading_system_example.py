@@ -26,8 +26,11 @@ from trading_systems.trading_system_properties import MLTradingSystemProperties
 from trading_systems.trading_system_handler import TradingSystemProcessor
 from trading_systems.position_sizer.safe_f_position_sizer import SafeFPositionSizer
 from trading_systems.model_creation.model_creation import (
-    SKModel, create_backtest_models, create_inference_model
+    SKModel, IncrementalModel, create_backtest_models_batch, create_inference_model,
+    predict_latest_rows
 )
+from trading_systems.model_creation.model_cache import ModelCache
+from trading_systems.model_creation.prediction_cache import PredictionCache
 
 from data_frame_service import ml_trading_system_example
 
@@ -96,27 +99,30 @@ class MLTradingSystemExample(MLTradingSystemBase):
     def create_backtest_models(
         data_dict: dict[tuple[str, str], pd.DataFrame], features: list[str], target: str,
         model_class: SKModel, param_grid: dict,
-        verbose=False
+        verbose=False, num_workers=None, model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ) -> dict[tuple[str, str], pd.DataFrame]:
-        models_data_dict = {}
-        for instrument, data in data_dict.items():
-            models_data_dict[instrument], selected_params = create_backtest_models(
-                data, features, target, model_class, param_grid,
-                verbose=verbose
-            )
-            if verbose == True:
-                # TODO: do something with selected_params to determine which params to use for inference models
-                print('selected_params', selected_params)
+        models_data_dict, selected_params_dict = create_backtest_models_batch(
+            data_dict, features, target, model_class, param_grid,
+            verbose=verbose, num_workers=num_workers, model_cache=model_cache,
+            prediction_cache=prediction_cache
+        )
+        if verbose == True:
+            # TODO: do something with selected_params to determine which params to use for inference models
+            for instrument, selected_params in selected_params_dict.items():
+                print('selected_params', instrument, selected_params)
         return models_data_dict
 
     @staticmethod
     def create_inference_models(
         data_dict: dict[tuple[str, str], pd.DataFrame], features: list[str], target: str,
-        model_class: SKModel, params: dict
+        model_class: SKModel, params: dict, model_cache: ModelCache | None=None
     ) -> dict[tuple[str, str], SKModel]:
         models_dict = {}
         for instrument, data in data_dict.items():
-            model = create_inference_model(data, features, target, model_class, params)
+            model = create_inference_model(
+                data, features, target, model_class, params, model_cache=model_cache
+            )
             if model:
                 models_dict[instrument] = model
         return models_dict
@@ -125,11 +131,25 @@ class MLTradingSystemExample(MLTradingSystemBase):
     def operate_models(
         cls, trading_system_id: str, trading_systems_persister: TradingSystemsPersisterBase, 
         data_dict: dict[tuple[str, str], pd.DataFrame], features: list[str],
-        model_class: SKModel, params: dict
+        model_class: SKModel, params: dict, model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ) -> dict[tuple[str, str], pd.DataFrame]:
         target = cls.target
-        models_data_dict = cls.create_backtest_models(data_dict, features, target, model_class, params)
-        inference_models_dict = cls.create_inference_models(data_dict, features, target, model_class, params)
+        models_data_dict = cls.create_backtest_models(
+            data_dict, features, target, model_class, params, model_cache=model_cache,
+            prediction_cache=prediction_cache
+        )
+        inference_models_dict = cls.create_inference_models(
+            data_dict, features, target, model_class, params, model_cache=model_cache
+        )
+        if cls.incremental_training == True:
+            # The last target_period rows have placeholder targets, their
+            # labels are fed to the model by partial_fit once known
+            last_labeled_pos = -cls.target_period - 1 if cls.target_period > 0 else -1
+            inference_models_dict = {
+                instrument: IncrementalModel(model, data_dict[instrument].index[last_labeled_pos])
+                for instrument, model in inference_models_dict.items()
+            }
         for (instrument_id, _), model in inference_models_dict.items():
             trading_systems_persister.insert_trading_system_model(
                 trading_system_id, model, optional_identifier=instrument_id
@@ -141,7 +161,8 @@ class MLTradingSystemExample(MLTradingSystemBase):
         cls, trading_system_id: str, trading_systems_persister: TradingSystemsPersisterBase, 
         data_dict: dict[tuple [str, str], pd.DataFrame], features: list[str]
     ) -> dict[tuple[str, str], pd.DataFrame]:
-        for instrument, data in data_dict.items():
+        models_dict = {}
+        for instrument in data_dict.keys():
             instrument_id, _ = instrument
             model_pipeline: SKModel = trading_systems_persister.get_trading_system_model(
                 trading_system_id, instrument_id
@@ -152,17 +173,46 @@ class MLTradingSystemExample(MLTradingSystemBase):
                     "failed to get model pipeline - "
                     f"input: ({trading_system_id}, {instrument_id})"
                 )
+                continue
+            models_dict[instrument] = model_pipeline
 
-            pred_data = data[features].to_numpy()
-            latest_data_point = data.iloc[-1].copy()
-            latest_data_point[TradingSystemAttributes.PRED_COL] = (
-                model_pipeline.predict(pred_data[-1].reshape(1, -1))[0]
-            )
-            latest_data_point_df = pd.DataFrame(latest_data_point).transpose()
-            data_dict[instrument] = pd.concat(
-                [data.iloc[:-1], latest_data_point_df]
+        return predict_latest_rows(
+            data_dict, features, models_dict, TradingSystemAttributes.PRED_COL
+        )
+
+    @classmethod
+    def update_models(
+        cls, trading_system_id: str, trading_systems_persister: TradingSystemsPersisterBase,
+        data_dict: dict[tuple [str, str], pd.DataFrame], features: list[str]
+    ) -> bool:
+        full_refit_due = False
+        for instrument, data in data_dict.items():
+            instrument_id, _ = instrument
+            model: IncrementalModel = trading_systems_persister.get_trading_system_model(
+                trading_system_id, instrument_id
             )
-        return data_dict
+            if not isinstance(model, IncrementalModel):
+                logger.error(
+                    "MLTradingSystemExample.update_models - "
+                    "failed to get incremental model - "
+                    f"input: ({trading_system_id}, {instrument_id})"
+                )
+                continue
+
+            num_of_rows = model.partial_fit(data, features, cls.target, cls.target_period)
+            if num_of_rows > 0:
+                insert_res = trading_systems_persister.insert_trading_system_model(
+                    trading_system_id, model, optional_identifier=instrument_id
+                )
+                logger.info(
+                    "MLTradingSystemExample.update_models - "
+                    f"input: ({trading_system_id}, {instrument_id}) - "
+                    f"number of rows: {num_of_rows} - "
+                    f"result: {insert_res}"
+                )
+            if cls.full_refit_interval is not None and model.num_of_updates >= cls.full_refit_interval:
+                full_refit_due = True
+        return full_refit_due
 
     @staticmethod
     def preprocess_data(
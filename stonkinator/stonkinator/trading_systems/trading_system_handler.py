@@ -14,6 +14,10 @@ from trading_systems.logger import create_timed_rotating_logger
 from trading_systems.trading_system_base import TradingSystemBase, MLTradingSystemBase
 from trading_systems.trading_system_properties import TradingSystemProperties, MLTradingSystemProperties
 from trading_systems.position_sizer.ext_position_sizer import ExtPositionSizer
+from trading_systems.position_sizer.portfolio_position_sizer import PortfolioPositionSizer
+from trading_systems.position_sizer.safe_f_position_sizer import SafeFPositionSizer
+from trading_systems.model_creation.model_cache import ModelCache
+from trading_systems.model_creation.prediction_cache import PredictionCache
 
 from data_frame.data_frame_service_client import DataFrameServiceClient
 from persistance.persistance_meta_classes.securities_service import SecuritiesServiceBase
@@ -21,12 +25,18 @@ from persistance.persistance_meta_classes.trading_systems_persister import Tradi
 from persistance.persistance_services.securities_grpc_service import SecuritiesGRPCService
 from persistance.persistance_services.securities_service_pb2 import Price
 from persistance.persistance_services.trading_systems_grpc_service import TradingSystemsGRPCService
+from persistance.persistance_services.model_registry import ModelRegistry
 
 
 LOG_DIR_PATH = os.environ.get("LOG_DIR_PATH")
+MODEL_CACHE_DIR_PATH = os.environ.get("MODEL_CACHE_DIR_PATH")
+PREDICTION_CACHE_DIR_PATH = os.environ.get("PREDICTION_CACHE_DIR_PATH")
+MODEL_REGISTRY_DIR_PATH = os.environ.get("MODEL_REGISTRY_DIR_PATH")
 logger_name = pathlib.Path(__file__).stem
 logger = create_timed_rotating_logger(LOG_DIR_PATH, logger_name, 1, 14)
 
+SYSTEM_LEVEL_POSITION_SIZERS = (ExtPositionSizer, PortfolioPositionSizer)
+
 
 class TradingSystemProcessor:
 
@@ -37,11 +47,14 @@ class TradingSystemProcessor:
         securities_service: SecuritiesServiceBase,
         trading_systems_persister: TradingSystemsPersisterBase,
         start_dt: dt.datetime, end_dt: dt.datetime,
-        full_run=False, step_through=False
+        full_run=False, step_through=False, model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ):
         self.__system_name = ts_class.name
         self.__ts_properties: TradingSystemProperties = ts_class.get_properties(securities_service)
         self.__trading_systems_persister = trading_systems_persister
+        self.__model_cache = model_cache
+        self.__prediction_cache = prediction_cache
 
         logger.info(
             "TradingSystemProcessor.__init__ - "
@@ -179,13 +192,40 @@ class TradingSystemProcessor:
         if full_run == True:
             self.__data = ts_class.operate_models(
                 self.__trading_system_id, self.__trading_systems_persister, self.__data, features,
-                self.__ts_properties.model_class, self.__ts_properties.params
+                self.__ts_properties.model_class, self.__ts_properties.params,
+                model_cache=self.__model_cache, prediction_cache=self.__prediction_cache
             )
         else:
+            all_features = features
             if isinstance(features, pd.DataFrame):
                 end_dt = pd.to_datetime(self.__current_dt).normalize()
                 features = features[features.index == end_dt] 
 
+            if isinstance(self.__trading_systems_persister, ModelRegistry):
+                num_of_fetched_models = self.__trading_systems_persister.prefetch(self.__trading_system_id)
+                logger.info(
+                    "ModelRegistry.prefetch - "
+                    f"input: ({self.__trading_system_id}) - "
+                    f"result: {num_of_fetched_models}"
+                )
+
+            if ts_class.incremental_training == True:
+                full_refit_due = ts_class.update_models(
+                    self.__trading_system_id, self.__trading_systems_persister, self.__data, features
+                )
+                if full_refit_due == True:
+                    # Replace the incrementally updated models with models
+                    # fitted on the full history before predicting
+                    logger.info(
+                        "TradingSystemProcessor.process_models - "
+                        f"full refit of the models of {self.__system_name}"
+                    )
+                    ts_class.operate_models(
+                        self.__trading_system_id, self.__trading_systems_persister, self.__data,
+                        all_features, self.__ts_properties.model_class, self.__ts_properties.params,
+                        model_cache=self.__model_cache, prediction_cache=self.__prediction_cache
+                    )
+
             # TODO: Skip making predictions if there is an active position for the instrument.
             self.__data = ts_class.make_predictions(
                 self.__trading_system_id, self.__trading_systems_persister, self.__data, features
@@ -275,7 +315,7 @@ class TradingSystemProcessor:
                 **kwargs
             )
 
-            if isinstance(self.__ts_properties.position_sizer, ExtPositionSizer):
+            if isinstance(self.__ts_properties.position_sizer, SYSTEM_LEVEL_POSITION_SIZERS):
                 self._run_ext_pos_sizer()
             else:
                 self._run_pos_sizer()
@@ -284,7 +324,7 @@ class TradingSystemProcessor:
                 break
 
         if insert_into_db == True:
-            if isinstance(self.__ts_properties.position_sizer, ExtPositionSizer):
+            if isinstance(self.__ts_properties.position_sizer, SYSTEM_LEVEL_POSITION_SIZERS):
                 pos_sizer_data_dict = self.__ts_properties.position_sizer.get_position_sizer_data_dict()
                 self.__trading_systems_persister.update_trading_system_metrics(
                     self.__trading_system_id, pos_sizer_data_dict
@@ -301,6 +341,10 @@ class TradingSystemProcessor:
         market_states = self.__trading_systems_persister.get_market_states(
             self.__trading_system_id, MarketState.ENTRY.value
         )
+        if isinstance(self.__ts_properties.position_sizer, SafeFPositionSizer):
+            self._run_pos_sizer_batch(market_states)
+            return
+
         for market_state in market_states:
             instrument_id = market_state.instrument_id
             positions = self.__trading_systems_persister.get_positions(
@@ -315,6 +359,28 @@ class TradingSystemProcessor:
                     **self.__ts_properties.position_sizer.position_sizer_data_dict
                 )
 
+    def _run_pos_sizer_batch(self, market_states):
+        positions = self.__trading_systems_persister.get_trading_system_instruments_positions(
+            self.__trading_system_id
+        )
+        if not positions:
+            return
+        num_of_periods = {
+            market_state.instrument_id:
+                json.loads(market_state.metrics).get(TradingSystemAttributes.NUMBER_OF_PERIODS)
+            for market_state in market_states
+        }
+        entry_positions = {
+            instrument_id: positions[instrument_id]
+            for instrument_id in num_of_periods if instrument_id in positions
+        }
+        self.__ts_properties.position_sizer.size_batch(
+            entry_positions, num_of_periods,
+            *self.__ts_properties.position_sizer_call_args,
+            **self.__ts_properties.position_sizer_call_kwargs,
+            **self.__ts_properties.position_sizer.position_sizer_data_dict
+        )
+
     def _run_ext_pos_sizer(self):
         trading_system_metrics = self.__trading_systems_persister.get_trading_system_metrics(self.__trading_system_id)
         if trading_system_metrics is None:
@@ -371,7 +437,8 @@ class TradingSystemHandler:
         securities_service: SecuritiesServiceBase,
         trading_systems_persister: TradingSystemsPersisterBase, 
         start_dt: dt.datetime, end_dt: dt.datetime, 
-        full_run=False, step_through=False
+        full_run=False, step_through=False, model_cache: ModelCache | None=None,
+        prediction_cache: PredictionCache | None=None
     ):
         self.__trading_systems: list[TradingSystemProcessor] = []
         for ts_class in trading_system_classes:
@@ -379,7 +446,8 @@ class TradingSystemHandler:
                 TradingSystemProcessor(
                     ts_class, data_frame_service, securities_service, 
                     trading_systems_persister, start_dt, end_dt,
-                    full_run=full_run, step_through=step_through
+                    full_run=full_run, step_through=step_through,
+                    model_cache=model_cache, prediction_cache=prediction_cache
                 )
             )
 
@@ -412,6 +480,8 @@ if __name__ == '__main__':
     TRADING_SYSTEMS_GRPC_SERVICE = TradingSystemsGRPCService(
         f"{os.environ.get('RPC_SERVICE_HOST')}:{os.environ.get('RPC_SERVICE_PORT')}"
     )
+    if MODEL_REGISTRY_DIR_PATH is not None:
+        TRADING_SYSTEMS_GRPC_SERVICE = ModelRegistry(TRADING_SYSTEMS_GRPC_SERVICE, dir_path=MODEL_REGISTRY_DIR_PATH)
 
     arg_parser = argparse.ArgumentParser(description='trading_system_handler CLI argument parser')
     arg_parser.add_argument(
@@ -450,6 +520,15 @@ if __name__ == '__main__':
     ]
     logger.info(f"TRADING_SYSTEM_CLASSES: {TRADING_SYSTEM_CLASSES}")
 
+    MODEL_CACHE = None
+    if MODEL_CACHE_DIR_PATH is not None:
+        # Evict fitted models after 30 days or when exceeding 2 GB
+        MODEL_CACHE = ModelCache(MODEL_CACHE_DIR_PATH, max_bytes=2 * 1024 ** 3, max_age=30 * 24 * 60 * 60)
+    PREDICTION_CACHE = None
+    if PREDICTION_CACHE_DIR_PATH is not None:
+        # Evict the least recently used predictions when exceeding 1 GB
+        PREDICTION_CACHE = PredictionCache(PREDICTION_CACHE_DIR_PATH, max_bytes=1024 ** 3)
+
     # start_dt = dt.datetime(1999, 1, 1)
     # end_dt = dt.datetime(2011, 1, 1)
     start_dt = dt.datetime(2015, 9, 16)
@@ -463,17 +542,17 @@ if __name__ == '__main__':
                 TRADING_SYSTEM_CLASSES, DATA_FRAME_SERVICE,
                 SECURITIES_GRPC_SERVICE, TRADING_SYSTEMS_GRPC_SERVICE,
                 start_dt, end_dt,
-                full_run=full_run, step_through=step_through
+                full_run=full_run, step_through=step_through,
+                model_cache=MODEL_CACHE, prediction_cache=PREDICTION_CACHE
             )
             ts_handler.run_trading_systems(end_dt, full_run, retain_history, print_data=print_data)
             start_dt = end_dt
             end_dt += dt.timedelta(days=1)
-            full_run = False
     else:
         ts_handler = TradingSystemHandler(
             TRADING_SYSTEM_CLASSES, DATA_FRAME_SERVICE,
             SECURITIES_GRPC_SERVICE, TRADING_SYSTEMS_GRPC_SERVICE,
             start_dt, end_dt,
-            full_run=full_run
+            full_run=full_run, model_cache=MODEL_CACHE, prediction_cache=PREDICTION_CACHE
         )
         ts_handler.run_trading_systems(end_dt, full_run, retain_history, print_data=print_data)
\ No newline at end of file